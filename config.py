@@ -50,3 +50,8 @@ WINDOW_HEIGHT = 800
 # 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FILE = 'system.log'
+
+# 数据库调用耗时统计：启用后超过阈值（毫秒）的调用写入日志，退出时导出统计结果
+PROFILE_QUERIES = False
+SLOW_QUERY_MS = 200
+PROFILE_FILE = 'query_profile.json'
@@ -0,0 +1,127 @@
+"""
+往年归档
+
+往年入营（按入营时间，没有时按离营时间的年份）的青年连同其全部记录，
+可以移到按年份划分的归档库 archives/youth_records_<年份>.db，本库只保留近期批次的数据。
+归档库由 DatabaseManager 创建并迁移，结构与本库相同；界面上选择已归档的年份时
+才打开对应的归档库，本库的查询不再扫描往年的数据。
+
+移动时把归档库 ATTACH 为 archive，在一个事务中按集合复制到归档库后再从本库删除；
+要移动的青年记在临时表 deleting_youth 中（与批量删除共用）。
+再次归档同一年份时，归档库中这些青年的旧记录先被替换。
+
+用法：
+    python -m database.archive 年份 [数据库路径]
+"""
+import os
+import re
+import sys
+
+from .merge import merge_columns
+
+
+ARCHIVE_FOLDER = 'archives'
+ARCHIVE_SCHEMA = 'archive'
+_FILE_PATTERN = re.compile(r'^youth_records_(\d{4})\.db$')
+
+# 入营年份为 ? 的青年（参数为四位年份）
+SELECT_INTAKE_SQL = '''
+    INSERT INTO temp.deleting_youth (id_card, id)
+    SELECT id_card, id FROM main.youth
+    WHERE substr(COALESCE(camp_entry_time_iso, leave_time_iso), 1, 4) = ?
+'''
+
+# 新复制到归档库的青年接在归档库最大 id 之后
+ASSIGN_YOUTH_ID_SQL = (f"UPDATE {ARCHIVE_SCHEMA}.youth "
+                       f"SET id = (SELECT COALESCE(MAX(id), 0) FROM {ARCHIVE_SCHEMA}.youth) + rowid "
+                       f"WHERE id IS NULL")
+
+
+def file_name(year):
+    return f"youth_records_{int(year)}.db"
+
+
+def list_years(archive_dir):
+    """目录中已有归档库的年份，从新到旧排列"""
+    if not os.path.isdir(archive_dir):
+        return []
+    years = [int(match.group(1)) for match in map(_FILE_PATTERN.match, os.listdir(archive_dir)) if match]
+    return sorted(years, reverse=True)
+
+
+def _youth_ids_sql(schema):
+    """deleting_youth 中青年在 schema 库中的 id"""
+    if schema == 'main':
+        return "SELECT id FROM temp.deleting_youth"
+    return f"SELECT id FROM {schema}.youth WHERE id_card IN (SELECT id_card FROM temp.deleting_youth)"
+
+
+def owned_condition(dependents, table, schema):
+    """table 中属于 deleting_youth 中青年的记录；dependents 为 (表名, 引用字段, 对应的 youth 字段)"""
+    conditions = []
+    for table_name, column, youth_column in dependents:
+        if table_name != table:
+            continue
+        if youth_column == 'id':
+            conditions.append(f"{column} IN ({_youth_ids_sql(schema)})")
+        else:
+            conditions.append(f"{column} IN (SELECT {youth_column} FROM temp.deleting_youth)")
+    return ' OR '.join(conditions)
+
+
+def _mapped_expr(dependents, table, column):
+    """引用青年 id 的字段换算为归档库中的 id"""
+    for table_name, reference, youth_column in dependents:
+        if table_name == table and reference == column and youth_column == 'id':
+            return (f"(SELECT ay.id FROM {ARCHIVE_SCHEMA}.youth ay "
+                    f"JOIN temp.deleting_youth d ON d.id_card = ay.id_card WHERE d.id = t.{column})")
+    return f"t.{column}"
+
+
+def copy_statements(dependents, source_columns, target_columns):
+    """复制到归档库的语句，source_columns / target_columns 为 {表名: 字段列表}"""
+    tables = list(dict.fromkeys(table for table, _, _ in dependents))
+    statements = []
+    # 先删除归档库中这些青年的旧记录，记录表要在青年之前删除
+    for table in tables:
+        statements.append(f"DELETE FROM {ARCHIVE_SCHEMA}.{table} "
+                          f"WHERE {owned_condition(dependents, table, ARCHIVE_SCHEMA)}")
+    statements.append(f"DELETE FROM {ARCHIVE_SCHEMA}.youth "
+                      f"WHERE id_card IN (SELECT id_card FROM temp.deleting_youth)")
+
+    columns = merge_columns('youth', source_columns['youth'], target_columns['youth'])
+    statements.append(f"INSERT INTO {ARCHIVE_SCHEMA}.youth ({', '.join(columns)}) "
+                      f"SELECT {', '.join(columns)} FROM main.youth "
+                      f"WHERE id_card IN (SELECT id_card FROM temp.deleting_youth)")
+    statements.append(ASSIGN_YOUTH_ID_SQL)
+
+    for table in tables:
+        columns = merge_columns(table, source_columns[table], target_columns[table])
+        selects = ', '.join(_mapped_expr(dependents, table, column) for column in columns)
+        statements.append(f"INSERT INTO {ARCHIVE_SCHEMA}.{table} ({', '.join(columns)}) "
+                          f"SELECT {selects} FROM main.{table} t "
+                          f"WHERE {owned_condition(dependents, table, 'main')}")
+    return statements
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("用法: python -m database.archive 年份 [数据库路径]")
+        return 2
+    db_manager = DatabaseManager(argv[1] if len(argv) > 1 else 'youth_records.db')
+    try:
+        count = db_manager.archive_intake(int(argv[0]))
+    except ValueError as e:
+        print(f"归档出错: {e}")
+        return 1
+    finally:
+        db_manager.close()
+    print(f"已将 {count} 名 {argv[0]} 年入营青年的数据移到 {db_manager.archive_path(argv[0])}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
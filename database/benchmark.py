@@ -0,0 +1,444 @@
+"""
+DatabaseManager 性能测试
+
+按 1千、1万、10万 名青年等规模生成模拟数据（database/sample_data.py），
+逐个调用 DatabaseManager 的全部公开方法（包括异常统计视图）并计时，
+结果（每个调用的次数、返回行数、p50/p95/p99 耗时）保存为 JSON。
+与上次的结果比较时，列出 p50 耗时变慢超过阈值的调用。
+
+生成的模拟数据库保存在工作目录中，参数相同时下次直接使用；
+每次测试在其副本上进行，写入、删除、合并和归档不影响模拟数据库。
+查询缓存默认关闭，测的是每次实际执行SQL的耗时。
+
+用法：
+    python -m database.benchmark [--sizes 1000 10000 100000] [--days 30] [--repeat 3]
+                                 [--work-dir benchmark_data] [--output benchmark.json]
+                                 [--compare 上次结果.json]
+"""
+import argparse
+import inspect
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from . import sample_data
+from .profiler import MethodStats, row_count
+from .query_builder import DateRange
+
+
+SIZES = (1000, 10000, 100000)
+DEFAULT_DAYS = 30
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 0
+DEFAULT_WORK_DIR = 'benchmark_data'
+DEFAULT_OUTPUT = 'benchmark.json'
+# 分页查询每页行数；不分页的查询按一周的日期范围读取
+PAGE_SIZE = 200
+RANGE_DAYS = 7
+# 合并测试所用来源库的青年人数（与测试库的前若干名青年身份证号相同，会产生冲突）
+MERGE_SOURCE_YOUTHS = 500
+# p50 变慢超过该倍数且至少慢 1 毫秒时视为性能退化
+REGRESSION_RATIO = 1.5
+REGRESSION_MIN_MS = 1.0
+
+# 不测试的公开方法：方法名 -> 原因
+EXCLUDED_METHODS = {
+    'close': '关闭连接',
+    'get_connection': '只返回连接句柄',
+    'transaction': '只返回事务上下文',
+    'init_database': '打开数据库时执行',
+}
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 16
+
+
+class Benchmark:
+    """在一个数据库上调用 DatabaseManager 的方法并计时"""
+
+    def __init__(self, db_manager, repeat=DEFAULT_REPEAT):
+        self.db_manager = db_manager
+        self.repeat = repeat
+        self.stats = {}
+        self.called = set()
+        self.errors = []
+
+    def call(self, label, method_name, *args, **kwargs):
+        """调用方法并按 label 记录耗时，出错时记录错误并返回None"""
+        self.called.add(method_name)
+        method = getattr(self.db_manager, method_name)
+        result = None
+        failed = True
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+            failed = False
+        except Exception as e:
+            self.errors.append(f"{label}: {e}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        stats = self.stats.get(label)
+        if stats is None:
+            stats = self.stats[label] = MethodStats()
+        stats.add(round(elapsed_ms, 3), row_count(result), failed)
+        return result
+
+    def context(self, start_date, days):
+        """测试所用的样本：第一名青年及其各类记录的 id"""
+        conn = self.db_manager.get_connection()
+        try:
+            def scalar(sql, params=()):
+                row = conn.execute(sql, params).fetchone()
+                return row[0] if row else None
+
+            youth = conn.execute(
+                "SELECT id, id_card, name, gender, recruitment_place, company, platoon, squad "
+                "FROM youth ORDER BY id LIMIT 1").fetchone()
+            id_card = youth[1]
+            first = date.fromisoformat(start_date)
+            return {
+                'youth_id': youth[0], 'id_card': id_card, 'name': youth[2], 'gender': youth[3],
+                'unit': youth[4:8],
+                'start': start_date,
+                'end': (first + timedelta(days=days - 1)).isoformat(),
+                'range_end': (first + timedelta(days=min(days, RANGE_DAYS) - 1)).isoformat(),
+                'first_free_date': first + timedelta(days=days),
+                'youths': scalar("SELECT COUNT(*) FROM youth"),
+                'unit_id_cards': [row[0] for row in conn.execute(
+                    "SELECT id_card FROM youth WHERE recruitment_place = ? AND company = ? ORDER BY id",
+                    (youth[4], youth[5]))],
+                'town_id': scalar("SELECT MIN(id) FROM town_interview"),
+                'leader_id': scalar("SELECT MIN(id) FROM leader_interview"),
+                'visit_id': scalar("SELECT MIN(id) FROM visit_survey"),
+                'assessment_date': scalar("SELECT assessment_date FROM political_assessment "
+                                          "WHERE youth_id_card = ?", (id_card,)),
+                'exam_date': scalar("SELECT district_date FROM physical_examination "
+                                    "WHERE youth_id_card = ?", (id_card,)),
+                'latest_seq': scalar("SELECT MAX(seq) FROM change_log") or 0,
+            }
+        finally:
+            conn.close()
+
+    def run_reads(self, ctx):
+        place, company, _, _ = ctx['unit']
+        id_card, start, end, range_end = ctx['id_card'], ctx['start'], ctx['end'], ctx['range_end']
+        week = (start, range_end)
+        calls = [
+            ('authenticate_user', ('admin', 'admin123'), {}),
+            ('build_where', (DateRange('d.record_date', start, end),), {}),
+            ('check_camp_verification_exists', (id_card,), {}),
+            ('check_political_assessment_exists', (id_card, ctx['name'], ctx['assessment_date']), {}),
+            ('filter_daily_stats_by_date_range', week, {}),
+            ('filter_daily_stats_by_date_range', (start, end), {'page_size': PAGE_SIZE}),
+            ('get_all_daily_stats_with_youth_info', (week,), {}),
+            ('get_all_daily_stats_with_youth_info', ((start, end),), {'page_size': PAGE_SIZE}),
+            ('get_all_youth_detailed', (), {}),
+            ('get_all_youth_detailed', (), {'page_size': PAGE_SIZE}),
+            ('get_camp_verifications_by_user_id', (id_card,), {}),
+            ('get_camp_verifications_by_username_and_id', (ctx['name'], id_card), {}),
+            ('get_changes_since', (max(ctx['latest_seq'] - 1000, 0),), {}),
+            ('get_changes_since', (0, ('youth',), True), {'limit': PAGE_SIZE}),
+            ('get_daily_stat_by_id_card_and_date', (id_card, start), {}),
+            ('get_daily_stats_for_chart', (ctx['youth_id'],), {}),
+            ('get_exception_rollup', (start, end), {}),
+            ('get_exception_rollup', (start, end), {'group_by': ('recruitment_place', 'company')}),
+            ('get_exception_statistics_summary', (start, end), {}),
+            ('get_timeseries', (ctx['unit_id_cards'], start, end), {}),
+            ('get_timeseries', (ctx['unit_id_cards'], start, end), {'dimensions': ('total',)}),
+            ('get_exception_statistics_view_data', week, {}),
+            ('get_exception_statistics_view_data', (start, end), {'company': company}),
+            ('get_exception_statistics_view_data', (start, end), {'page_size': PAGE_SIZE}),
+            ('get_latest_change_seq', (), {}),
+            ('get_leader_interview_by_id_card_and_date', (id_card, start), {}),
+            ('get_leader_interview_image', (ctx['leader_id'],), {}),
+            ('get_medical_screening_by_id_card_and_date', (id_card, start), {}),
+            ('get_module_data', ('daily_stat', ctx['youth_id']), {}),
+            ('get_physical_examination_by_id_card_and_date', (id_card, ctx['exam_date']), {}),
+            ('get_political_assessment_by_id_card_and_date', (id_card, ctx['assessment_date']), {}),
+            ('get_political_assessments_by_id_card', (id_card,), {}),
+            ('get_town_interview_by_id_card_and_date', (id_card, start), {}),
+            ('get_town_interview_image', (ctx['town_id'],), {}),
+            ('get_unit_options', ('company', place), {}),
+            ('get_visit_survey_image', (ctx['visit_id'],), {}),
+            ('get_youth_by_id_card', (id_card,), {}),
+            ('get_youth_in_unit', (place, company), {}),
+            ('get_youth_options', (), {}),
+            ('get_youth_options_for_daily_stat', (), {}),
+            ('query_daily_stats', (DateRange('d.record_date', start, range_end),), {'page_size': PAGE_SIZE}),
+            ('search_daily_stats_with_youth_info', ('', '', place, company), {}),
+            ('search_leader_interviews', (), {'date_range': (start, end), 'keyword': '焦虑'}),
+            ('search_town_interviews', (), {'date_range': week}),
+            ('search_town_interviews', (), {'keyword': '担心', 'page_size': PAGE_SIZE}),
+            ('search_visit_surveys', (), {'id_card': id_card}),
+            ('search_youth', (ctx['name'],), {}),
+            ('archived_years', (), {}),
+            ('archive_path', (2000,), {}),
+        ]
+        for _ in range(self.repeat):
+            for method_name, args, kwargs in calls:
+                self.call(_label(method_name, args, kwargs), method_name, *args, **kwargs)
+
+    def run_writes(self, ctx):
+        """新增、修改、删除各类记录，每轮使用新的青年和模拟数据之外的日期"""
+        place, company, platoon, squad = ctx['unit']
+        for round_index in range(self.repeat):
+            id_card = sample_data.id_card_for(ctx['youths'] + round_index)
+            name, gender = '测试', '男'
+            day = (ctx['first_free_date'] + timedelta(days=round_index * 2)).isoformat()
+            next_day = (ctx['first_free_date'] + timedelta(days=round_index * 2 + 1)).isoformat()
+            youth = [id_card, name, gender] + [''] * 26 + [company, platoon, squad, '', '在营', '', '']
+            youth[12] = place
+            call = self.call
+
+            call('insert_youth', 'insert_youth', tuple(youth))
+            youth_id = self.db_manager.youth_directory.youth_id(id_card)
+            statuses = ('正常', '正常', '正常', '正常', '正常')
+            first = call('insert_daily_stat_by_id_card', 'insert_daily_stat_by_id_card',
+                         id_card, day, *statuses, '')
+            second = call('insert_daily_stat', 'insert_daily_stat', youth_id, next_day, *statuses, '')
+            call('update_daily_stat', 'update_daily_stat', first, day, '异常', '正常', '正常', '正常', '正常', '想家')
+            call('batch_update_daily_stats', 'batch_update_daily_stats', [first, second], {'training': '异常'})
+            rows = [{'youth_id': other_id, 'record_date': day, 'mood': '正常'}
+                    for other_id in range(1, min(ctx['youths'], PAGE_SIZE) + 1)]
+            call('bulk_upsert', 'bulk_upsert', 'daily_stat', rows, 'overwrite')
+            call('delete_daily_stat', 'delete_daily_stat', first)
+            call('delete_daily_stats', 'delete_daily_stats', [second])
+
+            for table in ('town', 'leader'):
+                record_id = call(f'insert_{table}_interview', f'insert_{table}_interview',
+                                 id_card, name, gender, day, IMAGE, '思想稳定', '精神饱满')
+                call(f'update_{table}_interview', f'update_{table}_interview',
+                     record_id, id_card, name, gender, day, IMAGE, '担心家里', '焦虑')
+                call(f'delete_{table}_interviews', f'delete_{table}_interviews', [record_id])
+
+            record_id = call('insert_visit_survey', 'insert_visit_survey', id_card, name, gender, day, IMAGE, '稳定', '良好')
+            call('update_visit_survey', 'update_visit_survey', record_id, id_card, name, gender, day, IMAGE, '稳定', '一般')
+            call('delete_visit_survey', 'delete_visit_survey', record_id)
+            record_id = call('insert_visit_survey', 'insert_visit_survey', id_card, name, gender, next_day, IMAGE, '稳定', '良好')
+            call('delete_visit_surveys', 'delete_visit_surveys', [record_id])
+
+            assessment = ('父母健在', '已走访', '合格', '')
+            record_id = call('insert_political_assessment', 'insert_political_assessment',
+                             id_card, name, gender, id_card, *assessment, day, '稳定', '良好')
+            call('update_political_assessment', 'update_political_assessment',
+                 record_id, *assessment, day, '稳定', '一般')
+            call('update_political_assessment_by_unique_key', 'update_political_assessment_by_unique_key',
+                 id_card, name, day, *assessment, '稳定', '良好')
+            call('delete_political_assessment', 'delete_political_assessment', record_id)
+            record_id = call('insert_political_assessment', 'insert_political_assessment',
+                             id_card, name, gender, id_card, *assessment, next_day, '稳定', '良好')
+            call('delete_political_assessments', 'delete_political_assessments', [record_id])
+
+            record_id = call('add_camp_verification', 'add_camp_verification', name, id_card, '手机', '个人使用', '统一保管', day)
+            call('update_camp_verification', 'update_camp_verification', record_id, '手机', '个人使用', '已发还', day)
+            call('delete_camp_verification', 'delete_camp_verification', record_id)
+            record_id = call('add_camp_verification', 'add_camp_verification', name, id_card, '药品', '个人使用', '统一保管', day)
+            call('delete_camp_verifications', 'delete_camp_verifications', [record_id])
+            call('add_camp_verification', 'add_camp_verification', name, id_card, '现金', '个人使用', '统一保管', day)
+            call('delete_camp_verification_by_user_id', 'delete_camp_verification_by_user_id', id_card)
+
+            call('store_image', 'store_image', IMAGE)
+            call('delete_youths', 'delete_youths', [id_card])
+
+    def run_maintenance(self, ctx, merge_source, merge_blob_dir):
+        """维护操作各执行一次，最后合并来源库、归档全部数据（会改变数据库，放在最后）"""
+        call = self.call
+        call('refresh_exception_statistics', 'refresh_exception_statistics')
+        call('refresh_exception_statistics[full]', 'refresh_exception_statistics', True)
+        call('create_exception_statistics_view', 'create_exception_statistics_view')
+        call('reclassify_interview_keywords', 'reclassify_interview_keywords')
+        call('sync_recruitment_fields_for_physical_examination', 'sync_recruitment_fields_for_physical_examination')
+        call('rebuild_fulltext_indexes', 'rebuild_fulltext_indexes')
+        call('remove_unused_images', 'remove_unused_images')
+        call('clear_query_cache', 'clear_query_cache')
+        call('prune_change_log', 'prune_change_log', max(ctx['latest_seq'] - 1000, 0))
+        call('merge_database', 'merge_database', merge_source, 'newest', merge_blob_dir)
+
+        year = int(ctx['start'][:4])
+        if year < datetime.now().year:
+            call('archive_intake', 'archive_intake', year)
+            call('use_archive', 'use_archive', year)
+            call('get_all_youth_detailed[archive]', 'get_all_youth_detailed', None, PAGE_SIZE)
+            call('use_archive', 'use_archive', None)
+
+    def not_covered(self):
+        """没有测试到的公开方法（新增方法后应补充到测试中）"""
+        public = {name for name, _ in inspect.getmembers(type(self.db_manager), inspect.isfunction)
+                  if not name.startswith('_')}
+        return sorted(public - self.called - set(EXCLUDED_METHODS))
+
+    def report(self):
+        return {label: stats.to_dict() for label, stats in sorted(self.stats.items())}
+
+
+def _label(method_name, args, kwargs):
+    """调用的名称：分页、按单位筛选等不同用法分别统计"""
+    if kwargs.get('page_size'):
+        return f"{method_name}[page]"
+    extras = sorted(key for key in kwargs if key != 'page_size')
+    return f"{method_name}[{','.join(extras)}]" if extras else method_name
+
+
+def _copy_database(source, target):
+    """用在线备份接口复制数据库（不需要处理 -wal 文件）"""
+    for path in (target, target + '-wal', target + '-shm'):
+        if os.path.exists(path):
+            os.remove(path)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def prepare_sample(work_dir, youths, days, seed):
+    """生成（或沿用）模拟数据库，返回 (路径, 图片目录, 生成耗时秒数，沿用时为None)"""
+    from .db_manager import DatabaseManager
+
+    name = f"sample_{youths}_{days}_{seed}"
+    path = os.path.join(work_dir, name + '.db')
+    blob_dir = os.path.join(work_dir, name + '_blobs')
+    if os.path.exists(path):
+        return path, blob_dir, None
+    temp_path = path + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    start = time.perf_counter()
+    db_manager = DatabaseManager(temp_path, blob_dir=blob_dir)
+    try:
+        sample_data.generate(db_manager, youths, days, seed)
+    finally:
+        db_manager.close()
+    _copy_database(temp_path, path)
+    os.remove(temp_path)
+    return path, blob_dir, round(time.perf_counter() - start, 3)
+
+
+def run_size(youths, days=DEFAULT_DAYS, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED,
+             work_dir=DEFAULT_WORK_DIR, cache=False):
+    """在 youths 名青年的模拟数据上测试，返回该规模的结果"""
+    from .db_manager import DatabaseManager
+    from .query_cache import DEFAULT_MAX_BYTES
+
+    os.makedirs(work_dir, exist_ok=True)
+    sample_path, sample_blobs, generate_seconds = prepare_sample(work_dir, youths, days, seed)
+    source_path, source_blobs, _ = prepare_sample(work_dir, min(youths, MERGE_SOURCE_YOUTHS), days, seed + 1)
+
+    # 在副本上测试：副本单独放在 run 目录中，归档库、图片也都写在这里
+    run_dir = os.path.join(work_dir, 'run')
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    db_path = os.path.join(run_dir, 'youth_records.db')
+    blob_dir = os.path.join(run_dir, 'blobs')
+    _copy_database(sample_path, db_path)
+    shutil.copytree(sample_blobs, blob_dir)
+
+    db_manager = DatabaseManager(db_path, blob_dir=blob_dir, cache_bytes=DEFAULT_MAX_BYTES if cache else 0)
+    benchmark = Benchmark(db_manager, repeat)
+    try:
+        ctx = benchmark.context(sample_data.DEFAULT_START_DATE, days)
+        conn = db_manager.get_connection()
+        try:
+            rows = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in ('youth', 'daily_stat', 'town_interview', 'leader_interview', 'visit_survey',
+                                  'medical_screening', 'political_assessment', 'physical_examination',
+                                  'camp_verification', 'exception_statistics', 'change_log')}
+        finally:
+            conn.close()
+        benchmark.run_reads(ctx)
+        benchmark.run_writes(ctx)
+        benchmark.run_maintenance(ctx, source_path, source_blobs)
+    finally:
+        db_manager.close()
+
+    return {
+        'youths': youths,
+        'days': days,
+        'rows': rows,
+        'db_bytes': os.path.getsize(sample_path),
+        'generate_seconds': generate_seconds,
+        'methods': benchmark.report(),
+        'errors': benchmark.errors,
+        'not_covered': benchmark.not_covered(),
+    }
+
+
+def run(sizes=SIZES, days=DEFAULT_DAYS, repeat=DEFAULT_REPEAT, seed=DEFAULT_SEED,
+        work_dir=DEFAULT_WORK_DIR, cache=False, progress=print):
+    results = {}
+    for youths in sizes:
+        progress(f"测试 {youths} 名青年...")
+        results[str(youths)] = run_size(youths, days, repeat, seed, work_dir, cache)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'python_version': platform.python_version(),
+        'sqlite_version': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'days': days,
+        'repeat': repeat,
+        'seed': seed,
+        'query_cache': cache,
+        'sizes': results,
+    }
+
+
+def compare(previous, current, ratio=REGRESSION_RATIO, min_ms=REGRESSION_MIN_MS):
+    """p50 耗时变慢的调用：[(规模, 调用, 上次 p50, 本次 p50)]"""
+    regressions = []
+    for size, result in current['sizes'].items():
+        old_methods = previous.get('sizes', {}).get(size, {}).get('methods', {})
+        for label, stats in result['methods'].items():
+            old = old_methods.get(label, {}).get('p50_ms')
+            new = stats['p50_ms']
+            if old is None or new is None:
+                continue
+            if new > old * ratio and new - old >= min_ms:
+                regressions.append((size, label, old, new))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m database.benchmark', description='DatabaseManager 性能测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES), help='青年人数')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='每日情况统计的天数')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='每个调用的重复次数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='随机种子')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR, help='模拟数据库目录')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='结果 JSON 文件')
+    parser.add_argument('--compare', help='与上次结果 JSON 比较')
+    parser.add_argument('--cache', action='store_true', help='启用查询缓存')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    report = run(args.sizes, args.days, args.repeat, args.seed, args.work_dir, args.cache)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for size, result in report['sizes'].items():
+        slowest = sorted(result['methods'].items(), key=lambda item: item[1]['p50_ms'] or 0, reverse=True)[:10]
+        print(f"{size} 名青年，最慢的调用（p50）：")
+        for label, stats in slowest:
+            print(f"  {label}: {stats['p50_ms']}ms（{stats['rows'] // max(stats['calls'], 1)} 行）")
+        for error in result['errors']:
+            print(f"  出错 {error}")
+        if result['not_covered']:
+            print(f"  未测试的方法: {', '.join(result['not_covered'])}")
+    print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare(previous, report)
+        for size, label, old, new in regressions:
+            print(f"变慢 {size} 名青年 {label}: {old}ms -> {new}ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
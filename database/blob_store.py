@@ -0,0 +1,80 @@
+"""
+按内容寻址的图片文件存储
+
+图片按 SHA-256 摘要保存为 <根目录>/<前两位>/<摘要>，相同内容只保存一份。
+数据库中只记录摘要和大小。
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+
+
+class BlobStore:
+    def __init__(self, root):
+        self.root = root
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def path_for(self, blob_hash):
+        return os.path.join(self.root, blob_hash[:2], blob_hash)
+
+    def exists(self, blob_hash):
+        return bool(blob_hash) and os.path.exists(self.path_for(blob_hash))
+
+    def put(self, data):
+        """保存数据，返回摘要；内容已存在时直接返回"""
+        blob_hash = self.digest(data)
+        path = self.path_for(blob_hash)
+        if os.path.exists(path):
+            return blob_hash
+
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # 先写临时文件再重命名，避免中断时留下不完整的文件
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return blob_hash
+
+    def get(self, blob_hash):
+        """读取数据，不存在时返回None"""
+        if not blob_hash:
+            return None
+        path = self.path_for(blob_hash)
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b''
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return mapped[:]
+        except FileNotFoundError:
+            print(f"图片文件不存在: {path}")
+            return None
+
+    def delete(self, blob_hash):
+        path = self.path_for(blob_hash)
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    def iter_hashes(self):
+        """遍历已保存的所有摘要"""
+        if not os.path.isdir(self.root):
+            return
+        for prefix in os.listdir(self.root):
+            directory = os.path.join(self.root, prefix)
+            if len(prefix) != 2 or not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith('.tmp'):
+                    yield name
@@ -0,0 +1,110 @@
+"""
+数据变更日志
+
+各数据表上的触发器在增删改时向 change_log 追加一条记录：
+序号、表名、rowid、自然键、操作类型（INSERT/UPDATE/DELETE）和时间（UTC）。
+序号由 AUTOINCREMENT 分配，只增不减，删除旧日志后也不会重复使用，
+导出、同步只需记住处理到的序号，下次读取之后的变更即可。
+
+多个字段组成的自然键以 "|" 连接；修改了自然键的记录先记一条旧键的 DELETE，
+再记一条新键的 UPDATE，下游按 UPDATE 不存在即插入处理。
+日期规范字段、单位 id、谈话关键字判定等由触发器维护的派生字段变化时不记录。
+"""
+from . import dates, keywords
+
+
+# 记录变更的数据表：表名 -> 自然键字段
+TRACKED_TABLES = {
+    'youth': ('id_card',),
+    'daily_stat': ('youth_id', 'record_date'),
+    'town_interview': ('youth_id_card', 'interview_date'),
+    'leader_interview': ('youth_id_card', 'interview_date'),
+    'visit_survey': ('youth_id_card', 'survey_date'),
+    'medical_history': ('youth_id_card', 'file_path'),
+    'medical_screening': ('id_card', 'screening_date'),
+    'abnormal_stat': ('youth_id_card', 'abnormal_type', 'record_date'),
+    'health_screening': ('youth_id_card', 'screening_type', 'screening_date'),
+    'camp_verification': ('user_id', 'item'),
+    'political_assessment': ('youth_id_card', 'assessment_date'),
+    'physical_examination': ('youth_id_card', 'district_date', 'city_date', 'special_date'),
+}
+
+KEY_SEPARATOR = '|'
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        natural_key TEXT,
+        operation TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+'''
+
+INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_change_log_table_seq ON change_log(table_name, seq)"
+
+# 某张表最近一次变更的序号（按 idx_change_log_table_seq 直接定位）
+LATEST_SEQ_SQL = "SELECT MAX(seq) FROM change_log WHERE table_name = ?"
+
+
+def derived_columns(table):
+    """由触发器维护的派生字段"""
+    columns = {dates.iso_column(column) for column in dates.DATE_COLUMNS.get(table, ())}
+    if table == 'youth':
+        columns.add('unit_id')
+    if table in keywords.INTERVIEW_TABLES:
+        for column in keywords.TEXT_COLUMNS:
+            columns.add(keywords.keywords_column(column))
+            columns.add(keywords.flag_column(column))
+    return columns
+
+
+def key_sql(table, row):
+    """自然键表达式，row 为 NEW/OLD"""
+    parts = [f"{row}.{column}" for column in TRACKED_TABLES[table]]
+    if len(parts) == 1:
+        return f"CAST({parts[0]} AS TEXT)"
+    return f" || '{KEY_SEPARATOR}' || ".join(f"IFNULL({part}, '')" for part in parts)
+
+
+def _log_sql(table, row, operation, where=''):
+    return (f"INSERT INTO change_log (table_name, row_id, natural_key, operation) "
+            f"SELECT '{table}', {row}.rowid, {key_sql(table, row)}, '{operation}'{where}")
+
+
+def trigger_sql(table, columns):
+    """变更日志触发器：(触发器名, 语句)，columns 为表的全部字段，修改派生字段时不触发"""
+    derived = derived_columns(table)
+    data_columns = [column for column in columns if column not in derived]
+    key_changed = f" WHERE {key_sql(table, 'OLD')} IS NOT {key_sql(table, 'NEW')}"
+    return [
+        (f'trg_{table}_log_ins',
+         f"CREATE TRIGGER IF NOT EXISTS trg_{table}_log_ins AFTER INSERT ON {table} "
+         f"BEGIN {_log_sql(table, 'NEW', 'INSERT')}; END"),
+        (f'trg_{table}_log_upd',
+         f"CREATE TRIGGER IF NOT EXISTS trg_{table}_log_upd AFTER UPDATE OF {', '.join(data_columns)} ON {table} "
+         f"BEGIN {_log_sql(table, 'OLD', 'DELETE', key_changed)}; {_log_sql(table, 'NEW', 'UPDATE')}; END"),
+        (f'trg_{table}_log_del',
+         f"CREATE TRIGGER IF NOT EXISTS trg_{table}_log_del AFTER DELETE ON {table} "
+         f"BEGIN {_log_sql(table, 'OLD', 'DELETE')}; END"),
+    ]
+
+
+def changes_sql(tables=None, latest_only=False, limit=None):
+    """读取序号之后变更的查询（参数为起始序号，tables 不为空时再接表名）
+
+    latest_only 为 True 时每条记录（按 rowid 和自然键区分）只返回最后一次变更。
+    """
+    conditions = ["seq > ?"]
+    if tables:
+        conditions.append(f"table_name IN ({', '.join('?' * len(tables))})")
+    where = ' AND '.join(conditions)
+    if latest_only:
+        where = (f"seq IN (SELECT MAX(seq) FROM change_log WHERE {where} "
+                 f"GROUP BY table_name, row_id, natural_key)")
+    sql = (f"SELECT seq, table_name, row_id, natural_key, operation, changed_at "
+           f"FROM change_log WHERE {where} ORDER BY seq")
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    return sql
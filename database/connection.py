@@ -0,0 +1,244 @@
+"""
+数据库连接管理器
+
+每个线程持有一个长连接，打开时一次性设置PRAGMA。
+get_connection() 返回的是连接句柄，调用方沿用 conn.close() 的写法即可：
+关闭句柄只会回滚未提交的事务，不会真正关闭底层连接。
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from . import dates, keywords
+
+
+# 连接打开时执行的PRAGMA（顺序执行）
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -65536),         # 约64MB页缓存
+    ('mmap_size', 268435456),       # 256MB内存映射
+    ('temp_store', 'MEMORY'),
+    ('busy_timeout', 5000),         # 毫秒
+)
+
+# 每个连接缓存的预编译语句数；查询条件构造器对同一组筛选条件生成相同的SQL，可以复用
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionHandle:
+    """连接句柄，代理到线程共享的sqlite3连接
+
+    句柄自己保存 row_factory，避免一个调用方设置的行工厂影响其他调用方。
+    """
+
+    def __init__(self, manager, conn):
+        self._manager = manager
+        self._conn = conn
+        self._closed = False
+        self.row_factory = None
+
+    def cursor(self):
+        cursor = self._conn.cursor()
+        if self.row_factory is not None:
+            cursor.row_factory = self.row_factory
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        self._manager._before_commit(self._conn)
+        self._conn.commit()
+        self._manager._transaction_finished()
+
+    def rollback(self):
+        self._conn.rollback()
+        self._manager._transaction_finished()
+
+    def close(self):
+        """释放句柄；最外层句柄释放时回滚未提交的事务"""
+        if self._closed:
+            return
+        self._closed = True
+        self._manager._release(self._conn)
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    @property
+    def total_changes(self):
+        return self._conn.total_changes
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 与 sqlite3.Connection 一致：成功提交，异常回滚，不关闭
+        if exc_type is None:
+            self._manager._before_commit(self._conn)
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        self._manager._transaction_finished()
+        return False
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionManager:
+    """按线程维护长连接"""
+
+    def __init__(self, db_path, pragmas=CONNECTION_PRAGMAS):
+        self.db_path = db_path
+        self.pragmas = pragmas
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all_connections = []
+        # 新连接打开后、提交前、事务结束（提交或回滚）后调用的回调
+        self._open_hooks = []
+        self._commit_hooks = []
+        self._transaction_hooks = []
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        for name, value in self.pragmas:
+            try:
+                conn.execute(f"PRAGMA {name}={value}")
+            except sqlite3.DatabaseError as e:
+                print(f"设置PRAGMA {name} 时出错: {e}")
+        # 日期规范字段、谈话异常关键字的触发器依赖这些函数
+        dates.register(conn)
+        keywords.register(conn)
+        for hook in self._open_hooks:
+            hook(conn)
+        with self._lock:
+            self._all_connections.append(conn)
+        return conn
+
+    def add_open_hook(self, hook):
+        """注册连接回调 hook(conn)，对已打开的连接立即执行一次"""
+        self._open_hooks.append(hook)
+        with self._lock:
+            connections = list(self._all_connections)
+        for conn in connections:
+            hook(conn)
+
+    def add_commit_hook(self, hook):
+        """注册提交前的回调 hook(conn)，在要提交的事务中执行，可以继续写入"""
+        self._commit_hooks.append(hook)
+
+    def _before_commit(self, conn):
+        if not conn.in_transaction:
+            return
+        for hook in self._commit_hooks:
+            hook(conn)
+
+    def add_transaction_hook(self, hook):
+        """注册事务结束（提交或回滚）后的回调 hook()，在该事务的线程中执行"""
+        self._transaction_hooks.append(hook)
+
+    def _transaction_finished(self):
+        for hook in self._transaction_hooks:
+            hook()
+
+    def _state(self):
+        local = self._local
+        if getattr(local, 'conn', None) is None:
+            local.conn = self._open()
+            local.depth = 0
+        return local
+
+    def raw_connection(self):
+        """返回当前线程的底层sqlite3连接"""
+        return self._state().conn
+
+    def acquire(self):
+        """获取当前线程连接的句柄"""
+        local = self._state()
+        if local.depth == 0 and local.conn.in_transaction:
+            # 上一个调用方遗留的未提交事务
+            local.conn.rollback()
+            self._transaction_finished()
+        local.depth += 1
+        return ConnectionHandle(self, local.conn)
+
+    def _release(self, conn):
+        local = self._local
+        if getattr(local, 'conn', None) is not conn:
+            return
+        local.depth = max(local.depth - 1, 0)
+        if local.depth == 0 and conn.in_transaction:
+            conn.rollback()
+            self._transaction_finished()
+
+    @contextmanager
+    def transaction(self):
+        """事务上下文，返回游标
+
+        最外层使用 BEGIN IMMEDIATE，嵌套时使用SAVEPOINT；
+        正常退出提交，异常时回滚并继续抛出。
+        """
+        local = self._state()
+        conn = local.conn
+        local.depth += 1
+        local.savepoints = getattr(local, 'savepoints', 0)
+        nested = conn.in_transaction
+        savepoint = None
+        try:
+            if nested:
+                local.savepoints += 1
+                savepoint = f"sp_{local.savepoints}"
+                conn.execute(f"SAVEPOINT {savepoint}")
+            else:
+                conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            try:
+                yield cursor
+            except BaseException:
+                if savepoint:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    conn.rollback()
+                self._transaction_finished()
+                raise
+            else:
+                if savepoint:
+                    conn.execute(f"RELEASE {savepoint}")
+                else:
+                    self._before_commit(conn)
+                    conn.commit()
+                    self._transaction_finished()
+        finally:
+            if savepoint:
+                local.savepoints -= 1
+            local.depth = max(local.depth - 1, 0)
+
+    def close_all(self):
+        """关闭所有线程的连接（程序退出时调用）"""
+        with self._lock:
+            connections, self._all_connections = self._all_connections, []
+        for conn in connections:
+            try:
+                # 让SQLite按需更新索引统计信息
+                conn.execute("PRAGMA optimize")
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
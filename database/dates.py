@@ -0,0 +1,166 @@
+"""
+日期规范化
+
+日期字段保存的是录入或导入时的原始文本（2025-08-08、2025/8/8、2025年8月8日、
+Excel日期序列号等），直接按字符串比较范围并不正确。
+每个日期字段另有一个 <字段>_iso 规范字段，保存 YYYY-MM-DD 格式的日期，
+由本程序在提交前调用 normalize_date() 计算（见 database/derived.py），范围筛选统一使用规范字段。
+"""
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+
+
+SQL_FUNCTION = 'normalize_date'
+ISO_SUFFIX = '_iso'
+
+# 需要规范化的日期字段：表名 -> 字段
+DATE_COLUMNS = {
+    'youth': ('birth_date', 'camp_entry_time', 'leave_time'),
+    'daily_stat': ('record_date',),
+    'town_interview': ('interview_date',),
+    'leader_interview': ('interview_date',),
+    'visit_survey': ('survey_date',),
+    'medical_screening': ('screening_date',),
+    'political_assessment': ('assessment_date',),
+    'physical_examination': ('district_date', 'city_date', 'special_date'),
+}
+
+# Excel 日期序列号的起点（兼容 Excel 的1900年闰年错误）
+EXCEL_EPOCH = date(1899, 12, 30)
+# 只把五位及以上的数字当作序列号（10000 为 1927-05-18），四位数字是年份
+EXCEL_MIN_SERIAL = 10000
+EXCEL_MAX_SERIAL = 2958465  # 9999-12-31
+
+_DATE_PATTERN = re.compile(r'^(\d{4})\s*[-/.年]\s*(\d{1,2})\s*(?:[-/.月]\s*(\d{1,2})\s*日?)?')
+_COMPACT_PATTERN = re.compile(r'^(\d{4})(\d{2})(\d{2})$')
+_YEAR_PATTERN = re.compile(r'^(\d{4})\s*年?$')
+_NUMBER_PATTERN = re.compile(r'^\d+(?:\.\d+)?$')
+
+
+def _from_excel_serial(serial):
+    if EXCEL_MIN_SERIAL <= serial <= EXCEL_MAX_SERIAL:
+        return EXCEL_EPOCH + timedelta(days=int(serial))
+    return None
+
+
+def _month_end(year, month):
+    if month == 12:
+        return date(year, 12, 31)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def parse_date(value):
+    """解析日期，返回 (第一天, 最后一天)，无法识别时返回None
+
+    只有年月（如 2025-09、2025年9月）或只有年份（如 2025）的日期是一个区间，
+    两端分别为该月、该年的第一天和最后一天；完整的日期两端相同。
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date(), value.date()
+    if isinstance(value, date):
+        return value, value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+
+    text = str(value).strip()
+    if not text:
+        return None
+
+    match = _DATE_PATTERN.match(text) or _COMPACT_PATTERN.match(text)
+    try:
+        if match:
+            year, month, day = (int(part) if part else None for part in match.groups())
+            if day is None:
+                return date(year, month, 1), _month_end(year, month)
+            return date(year, month, day), date(year, month, day)
+        match = _YEAR_PATTERN.match(text)
+        if match:
+            year = int(match.group(1))
+            return date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        return None
+    if _NUMBER_PATTERN.match(text):
+        day = _from_excel_serial(float(text))
+        return (day, day) if day else None
+    return None
+
+
+def normalize_date(value):
+    """把各种格式的日期转换为 YYYY-MM-DD，无法识别时返回None
+
+    只有年月、只有年份的日期按当月、当年的第一天处理。
+    """
+    parsed = parse_date(value)
+    return parsed[0].isoformat() if parsed else None
+
+
+def _is_empty(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def normalize_range(start_date, end_date):
+    """规范化范围筛选的起止日期
+
+    结束日期只有年月或年份时取该月、该年的最后一天；
+    为空的一端表示不限，原样返回；无法识别的日期抛出 ValueError。
+    """
+    bounds = []
+    for value, side in ((start_date, 0), (end_date, 1)):
+        if _is_empty(value):
+            bounds.append(value)
+            continue
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValueError(f"无法识别的日期: {value}")
+        bounds.append(parsed[side].isoformat())
+    return tuple(bounds)
+
+
+def iso_column(column):
+    """日期字段对应的规范字段名（column 可以带表别名）"""
+    return f"{column}{ISO_SUFFIX}"
+
+
+def register(conn):
+    """在连接上注册 normalize_date() SQL函数"""
+    try:
+        conn.create_function(SQL_FUNCTION, 1, normalize_date, deterministic=True)
+    except (sqlite3.NotSupportedError, TypeError):
+        # SQLite 3.8.3 以下不支持 deterministic
+        conn.create_function(SQL_FUNCTION, 1, normalize_date)
+
+
+def assignments(columns, row=''):
+    return ', '.join(f"{iso_column(column)} = {SQL_FUNCTION}({row}{column})" for column in columns)
+
+
+def trigger_sql(table, columns):
+    """规范字段的维护触发器：插入时计算全部字段，更新日期字段时重新计算
+
+    （迁移 5 使用；迁移 12 起改由 derived 模块的队列维护，这些触发器已删除）
+    """
+    assignments = ', '.join(f"{iso_column(column)} = {SQL_FUNCTION}(NEW.{column})" for column in columns)
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_dates_ins AFTER INSERT ON {table} "
+        f"BEGIN UPDATE {table} SET {assignments} WHERE rowid = NEW.rowid; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_dates_upd AFTER UPDATE OF {', '.join(columns)} ON {table} "
+        f"BEGIN UPDATE {table} SET {assignments} WHERE rowid = NEW.rowid; END",
+    ]
+
+
+def backfill_sql(table, columns):
+    return f"UPDATE {table} SET {assignments(columns)}"
+
+
+def renormalize_sql(table, columns):
+    """按当前规则重新计算规范字段（只更新结果有变化的行）"""
+    changed = ' OR '.join(f"{iso_column(column)} IS NOT {SQL_FUNCTION}({column})" for column in columns)
+    return f"{backfill_sql(table, columns)} WHERE {changed}"
+
+
+def index_sql(table, column):
+    return (f"CREATE INDEX IF NOT EXISTS idx_{table}_{iso_column(column)} "
+            f"ON {table}({iso_column(column)})")
@@ -1,25 +1,175 @@
 """
 数据库管理器
 """
+import os
 import sqlite3
 import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from .models import Youth, User
+from config import UPLOAD_FOLDER
+from . import archive, changelog, dates, derived, exception_statistics, fulltext, keywords, merge, timeseries, units
+from .blob_store import BlobStore
+from .connection import ConnectionManager
+from .migrations import SchemaMigrator
+from .pagination import Keyset, fetch_page
+from .query_builder import Contains, DateRange, Equals, Filters, Unit
+from .query_cache import QueryCache
+from .youth_directory import YouthDirectory
+from .models import CampVerification, Youth, User
+
+
+class _Store:
+    """一个数据库（本库或某年的归档库）的连接、查询缓存和全文检索表"""
+
+    def __init__(self, year, connections, query_cache, writable=True):
+        self.year = year
+        self.connections = connections
+        self.query_cache = query_cache
+        self.writable = writable
+        self.fulltext_tables = set()
+
+
+def _set_query_only(conn):
+    conn.execute("PRAGMA query_only = ON")
 
 
 class DatabaseManager:
-    def __init__(self, db_path='youth_records.db'):
+    # 走访调查图片所在的表
+    IMAGE_TABLES = ('town_interview', 'leader_interview', 'visit_survey')
+
+    # 列表查询的分页排序键：(SQL表达式, 方向, 在结果行中的位置)
+    YOUTH_KEYSET = Keyset(('id', 'ASC', 27), ('id_card', 'ASC', 0))
+    YOUTH_DETAILED_KEYSET = Keyset(('id', 'ASC', 36), ('id_card', 'ASC', 0))
+    TOWN_INTERVIEW_KEYSET = Keyset(('t.interview_date', 'DESC', 4), ('t.youth_id_card', 'ASC', 1), ('t.id', 'ASC', 0))
+    LEADER_INTERVIEW_KEYSET = Keyset(('l.interview_date', 'DESC', 4), ('l.youth_id_card', 'ASC', 1), ('l.id', 'ASC', 0))
+    VISIT_SURVEY_KEYSET = Keyset(('youth_id_card', 'ASC', 1), ('survey_date', 'ASC', 4), ('id', 'ASC', 0))
+    DAILY_STAT_KEYSET = Keyset(('d.record_date', 'DESC', 8), ('y.id_card', 'ASC', 1), ('d.id', 'ASC', 0))
+    EXCEPTION_STATISTICS_KEYSET = Keyset(('date', 'DESC', 14), ('name', 'ASC', 1), ('id_card', 'ASC', 0))
+
+    def __init__(self, db_path='youth_records.db', blob_dir=None, cache_bytes=0):
         self.db_path = db_path
+        base_dir = os.getcwd() if db_path == ':memory:' else os.path.dirname(os.path.abspath(db_path))
+        if blob_dir is None:
+            blob_dir = os.path.join(base_dir, UPLOAD_FOLDER, 'blobs')
+        self.blob_store = BlobStore(blob_dir)
+        self.archive_dir = os.path.join(base_dir, archive.ARCHIVE_FOLDER)
+        
+        # 当前使用的库（本库或 use_archive() 选择的归档库）；各线程可用 using_store() 固定自己的库
+        # 查询结果缓存 cache_bytes 为 0 时关闭
+        self._local = threading.local()
+        self._store = _Store(None, ConnectionManager(db_path), QueryCache(cache_bytes))
         self.init_database()
-    
+        # 表结构就绪后再安装表版本触发器
+        self._install_store_hooks(self._store)
+        # 按身份证号查找青年的内存目录，youth 表修改后自动重新加载
+        self.youth_directory = YouthDirectory(self)
+        
+        # 已打开的库：(归档年份, 是否可写) -> _Store，本库为 (None, True)
+        self._stores = {(None, True): self._store}
+
+    def _install_store_hooks(self, store):
+        """表结构就绪后注册连接回调：查询缓存的表版本，以及提交前刷新异常统计表"""
+        store.connections.add_open_hook(store.query_cache.install)
+        store.connections.add_commit_hook(self._flush_before_commit)
+        store.connections.add_transaction_hook(store.query_cache.transaction_finished)
+        if not store.writable:
+            # 在其他回调创建临时触发器之后再设置只读
+            store.connections.add_open_hook(_set_query_only)
+
+    @property
+    def store(self):
+        """当前线程使用的库：using_store() 固定的库，否则为 use_archive() 选择的库"""
+        return getattr(self._local, 'store', None) or self._store
+
+    @contextmanager
+    def using_store(self, store):
+        """在当前线程固定使用 store（取自 self.store），期间 use_archive() 不影响本线程
+
+        后台任务在提交时取得当前的库，执行时固定使用，切换归档库不会让导入写入另一个库。
+        """
+        previous = getattr(self._local, 'store', None)
+        self._local.store = store
+        try:
+            yield store
+        finally:
+            self._local.store = previous
+
+    @property
+    def connections(self):
+        return self.store.connections
+
+    @property
+    def query_cache(self):
+        return self.store.query_cache
+
+    @property
+    def archive_year(self):
+        """当前使用的归档年份，使用本库时为 None"""
+        return self.store.year
+
+    @property
+    def _fulltext_tables(self):
+        return self.store.fulltext_tables
+
+    @_fulltext_tables.setter
+    def _fulltext_tables(self, tables):
+        self.store.fulltext_tables = tables
+
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """获取当前线程长连接的句柄（close()只释放句柄）"""
+        return self.connections.acquire()
+
+    def transaction(self):
+        """事务上下文：with db_manager.transaction() as cursor: ..."""
+        return self.connections.transaction()
     
+    def clear_query_cache(self):
+        """清空查询结果缓存和青年目录（外部程序修改了数据库文件时使用）"""
+        self.query_cache.clear()
+        self.youth_directory.invalidate()
+
+    def close(self):
+        """关闭所有数据库连接（包括已打开的归档库）"""
+        for store in self._stores.values():
+            store.connections.close_all()
+
     def init_database(self):
-        """初始化数据库表"""
+        """初始化数据库表：执行尚未执行的结构迁移"""
+        SchemaMigrator(self.connections, self._schema_migrations()).migrate()
+        
+        # 创建默认管理员账户（按用户名唯一索引查询，开销很小）
         conn = self.get_connection()
         cursor = conn.cursor()
+        self._create_default_admin(cursor)
+        conn.commit()
         
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '%_fts'")
+        self._fulltext_tables = {row[0] for row in cursor.fetchall()}
+        self._derived_flush_sql = self._derived_column_plans(cursor)
+        conn.close()
+        self._flush_pending_derived_data(self.connections)
+
+    def _schema_migrations(self):
+        """结构迁移步骤，按版本号递增排列，只能追加不能修改已发布的步骤"""
+        return [
+            (1, '基础表结构', self._create_base_schema),
+            (2, '常用查询索引', self._create_indexes),
+            (3, '全文检索索引', self._create_fulltext_indexes),
+            (4, '图片移出数据库', self._move_images_to_blob_store),
+            (5, '日期规范字段', self._add_normalized_date_columns),
+            (6, '自然键唯一索引', self._add_unique_keys),
+            (7, '单位层级表', self._create_unit_hierarchy),
+            (8, '谈话异常关键字', self._add_interview_keyword_flags),
+            (9, '异常统计汇总表', self._create_exception_rollup),
+            (10, '数据变更日志', self._create_change_log),
+            (11, '日期规范规则修正', self._renormalize_dates),
+            (12, '派生字段改由队列维护', self._queue_derived_columns),
+        ]
+
+    def _create_base_schema(self, cursor):
+        """创建基础表结构并升级旧版本数据库"""
         # 用户表
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS users (
@@ -303,20 +453,303 @@ class DatabaseManager:
         except Exception as e:
             print(f"迁移physical_examination表字段时出错: {e}")
         
-        conn.commit()
-        
         # 升级youth表结构
         self._update_youth_table(cursor)
         
-        # 创建默认管理员账户
-        self._create_default_admin(cursor)
-        
         # 创建异常统计视图
         self._create_exception_statistics_view_if_not_exists(cursor)
-        
-        conn.commit()
-        conn.close()
     
+    # 常用查询索引：(索引名, 表名, 字段)
+    INDEXES = [
+        ('idx_youth_id', 'youth', 'id'),
+        ('idx_daily_stat_youth_date', 'daily_stat', 'youth_id, record_date'),
+        ('idx_daily_stat_date', 'daily_stat', 'record_date'),
+        ('idx_town_interview_youth_date', 'town_interview', 'youth_id_card, interview_date'),
+        ('idx_town_interview_date', 'town_interview', 'interview_date'),
+        ('idx_leader_interview_youth_date', 'leader_interview', 'youth_id_card, interview_date'),
+        ('idx_leader_interview_date', 'leader_interview', 'interview_date'),
+        ('idx_visit_survey_youth_date', 'visit_survey', 'youth_id_card, survey_date'),
+        ('idx_medical_screening_id_card_date', 'medical_screening', 'id_card, screening_date'),
+        ('idx_medical_screening_youth', 'medical_screening', 'youth_id_card'),
+        ('idx_political_assessment_youth_date', 'political_assessment', 'youth_id_card, assessment_date'),
+        ('idx_physical_examination_youth', 'physical_examination', 'youth_id_card'),
+        ('idx_physical_examination_district_date', 'physical_examination', 'district_date'),
+        ('idx_physical_examination_city_date', 'physical_examination', 'city_date'),
+        ('idx_physical_examination_special_date', 'physical_examination', 'special_date'),
+        ('idx_camp_verification_user_id', 'camp_verification', 'user_id'),
+    ]
+
+    # 引用青年的记录表：(表名, 引用字段, 对应的 youth 字段)
+    YOUTH_DEPENDENTS = [
+        ('daily_stat', 'youth_id', 'id'),
+        ('town_interview', 'youth_id_card', 'id_card'),
+        ('leader_interview', 'youth_id_card', 'id_card'),
+        ('visit_survey', 'youth_id_card', 'id_card'),
+        ('medical_screening', 'id_card', 'id_card'),
+        ('medical_screening', 'youth_id_card', 'id_card'),
+        ('medical_history', 'youth_id_card', 'id_card'),
+        ('abnormal_stat', 'youth_id_card', 'id_card'),
+        ('health_screening', 'youth_id_card', 'id_card'),
+        ('political_assessment', 'youth_id_card', 'id_card'),
+        ('physical_examination', 'youth_id_card', 'id_card'),
+        ('camp_verification', 'user_id', 'id_card'),
+    ]
+
+    # 按人员、日期记录的表的自然键：表名 -> (唯一索引名, 键字段, 被唯一索引替代的普通索引)
+    UNIQUE_KEYS = {
+        'daily_stat': ('uq_daily_stat_youth_date', ('youth_id', 'record_date'), 'idx_daily_stat_youth_date'),
+        'town_interview': ('uq_town_interview_youth_date', ('youth_id_card', 'interview_date'),
+                           'idx_town_interview_youth_date'),
+        'leader_interview': ('uq_leader_interview_youth_date', ('youth_id_card', 'interview_date'),
+                             'idx_leader_interview_youth_date'),
+        'political_assessment': ('uq_political_assessment_youth_date', ('youth_id_card', 'assessment_date'),
+                                 'idx_political_assessment_youth_date'),
+        'physical_examination': ('uq_physical_examination_youth_dates',
+                                 ('youth_id_card', 'district_date', 'city_date', 'special_date'),
+                                 'idx_physical_examination_youth'),
+    }
+
+    def _create_indexes(self, cursor):
+        """创建常用查询索引"""
+        for index_name, table_name, columns in self.INDEXES:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name}({columns})")
+        cursor.execute("ANALYZE")
+    
+    def _create_fulltext_indexes(self, cursor):
+        """创建全文检索索引及同步触发器（SQLite不支持trigram分词时跳过）"""
+        if not fulltext.trigram_supported(cursor):
+            print("当前SQLite不支持FTS5 trigram分词，搜索将继续使用LIKE")
+            return
+        for index in fulltext.FULLTEXT_INDEXES.values():
+            cursor.execute(index.create_sql())
+            for trigger_sql in index.trigger_sql():
+                cursor.execute(trigger_sql)
+            cursor.execute(index.rebuild_sql())
+    
+    def rebuild_fulltext_indexes(self):
+        """重建全文检索索引（升级SQLite后或索引损坏时使用）"""
+        with self.transaction() as cursor:
+            for index in fulltext.FULLTEXT_INDEXES.values():
+                for sql in index.drop_sql():
+                    cursor.execute(sql)
+            self._create_fulltext_indexes(cursor)
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '%_fts'")
+            self._fulltext_tables = {row[0] for row in cursor.fetchall()}
+    
+    def _add_unique_keys(self, cursor):
+        """为自然键创建唯一索引
+
+        已有的重复记录只保留最后写入的一条，其余的移到 <表名>_duplicates 表，不直接删除。
+        """
+        for table_name, (index_name, key_columns, replaced_index) in self.UNIQUE_KEYS.items():
+            keys = ', '.join(key_columns)
+            # 键字段含 NULL 的记录不受唯一索引约束，不合并
+            not_null = ' AND '.join(f"{column} IS NOT NULL" for column in key_columns)
+            duplicate = (f"{not_null} AND rowid NOT IN ("
+                         f"SELECT MAX(rowid) FROM {table_name} WHERE {not_null} GROUP BY {keys})")
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {duplicate}")
+            duplicate_count = cursor.fetchone()[0]
+            if duplicate_count > 0:
+                duplicates_table = self.duplicates_table(table_name)
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS {duplicates_table} AS "
+                               f"SELECT * FROM {table_name} WHERE 0")
+                cursor.execute(f"INSERT INTO {duplicates_table} SELECT * FROM {table_name} WHERE {duplicate}")
+                cursor.execute(f"DELETE FROM {table_name} WHERE {duplicate}")
+                print(f"{table_name}表中有 {duplicate_count} 条重复记录，已移到 {duplicates_table} 表，"
+                      f"只保留最后写入的一条")
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table_name}({keys})")
+            cursor.execute(f"DROP INDEX IF EXISTS {replaced_index}")
+        
+        # 重建异常统计触发器，使其在 UPSERT 语句中不产生唯一约束冲突
+        for trigger_name, trigger_sql in exception_statistics.build_trigger_sql():
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+            cursor.execute(trigger_sql)
+    
+    @staticmethod
+    def duplicates_table(table_name):
+        """创建唯一索引时保存被合并的重复记录的表"""
+        return f"{table_name}_duplicates"
+
+    def _create_unit_hierarchy(self, cursor):
+        """创建单位层级表及维护触发器，并由已有青年的单位字段生成节点"""
+        cursor.execute(units.CREATE_TABLE_SQL)
+        cursor.execute("PRAGMA table_info(youth)")
+        if 'unit_id' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE youth ADD COLUMN unit_id INTEGER")
+        for sql in units.INDEX_SQL:
+            cursor.execute(sql)
+        for _, trigger_sql in units.trigger_sql():
+            cursor.execute(trigger_sql)
+        
+        ensure_statements, update_sql = units.backfill_sql()
+        cursor.execute(f"SELECT DISTINCT {', '.join(units.LEVELS)} FROM youth")
+        for row in cursor.fetchall():
+            names = {column: value or '' for column, value in zip(units.LEVELS, row)}
+            for sql in ensure_statements:
+                cursor.execute(sql, names)
+        cursor.execute(update_sql)
+        cursor.execute("ANALYZE")
+    
+    def _add_interview_keyword_flags(self, cursor):
+        """为谈心谈话表添加异常关键字判定字段及维护触发器，并判定已有记录"""
+        for table_name in keywords.INTERVIEW_TABLES:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            existing = [column[1] for column in cursor.fetchall()]
+            for column in keywords.TEXT_COLUMNS:
+                if keywords.keywords_column(column) not in existing:
+                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {keywords.keywords_column(column)} TEXT")
+                if keywords.flag_column(column) not in existing:
+                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {keywords.flag_column(column)} INTEGER")
+            for trigger_sql in keywords.trigger_sql(table_name):
+                cursor.execute(trigger_sql)
+            cursor.execute(keywords.backfill_sql(table_name))
+    
+    def _create_exception_rollup(self, cursor):
+        """创建按日期、单位汇总的异常统计表及维护触发器，已有数据在第一次读取时汇总"""
+        cursor.execute(exception_statistics.CREATE_ROLLUP_TABLE_SQL)
+        cursor.execute(exception_statistics.CREATE_ROLLUP_DIRTY_TABLE_SQL)
+        cursor.execute(exception_statistics.CREATE_ROLLUP_INDEX_SQL)
+        for _, trigger_sql in exception_statistics.build_rollup_trigger_sql():
+            cursor.execute(trigger_sql)
+        cursor.execute(exception_statistics.MARK_ALL_ROLLUP_DIRTY_SQL)
+    
+    def _create_change_log(self, cursor):
+        """创建数据变更日志表及各数据表上的记录触发器（已有数据不补记）"""
+        cursor.execute(changelog.CREATE_TABLE_SQL)
+        cursor.execute(changelog.INDEX_SQL)
+        self._create_change_log_triggers(cursor)
+    
+    def _create_change_log_triggers(self, cursor):
+        """重建变更日志触发器；之后的迁移给数据表添加字段后需要再调用一次"""
+        for table_name in changelog.TRACKED_TABLES:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            columns = [column[1] for column in cursor.fetchall()]
+            for trigger_name, trigger_sql in changelog.trigger_sql(table_name, columns):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name}")
+                cursor.execute(trigger_sql)
+    
+    def reclassify_interview_keywords(self):
+        """按当前关键字重新判定谈心谈话记录（调整关键字后使用），返回 {表名: 变化的记录数}
+
+        判定结果变化的记录由触发器标记，下次读取异常统计时重新计算。
+        """
+        counts = {}
+        with self.transaction() as cursor:
+            for table_name in keywords.INTERVIEW_TABLES:
+                cursor.execute(keywords.backfill_sql(table_name))
+                counts[table_name] = cursor.rowcount
+        return counts
+    
+    def build_where(self, *filters):
+        """把筛选条件编译为 (条件SQL, 参数)，子串条件优先使用全文检索索引
+
+        示例：
+            where, params = db_manager.build_where(Contains('youth', 'y', 'name', name),
+                                                   DateRange('d.record_date', start, end))
+        """
+        return Filters(*filters).compile(getattr(self, '_fulltext_tables', ()))
+    
+    def _move_images_to_blob_store(self, cursor):
+        """为图片表添加摘要字段，并把表中已有的图片移到文件存储"""
+        for table_name in self.IMAGE_TABLES:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            columns = [column[1] for column in cursor.fetchall()]
+            if 'image_hash' not in columns:
+                cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN image_hash TEXT")
+            if 'image_size' not in columns:
+                cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN image_size INTEGER")
+
+            # 逐条读取，避免一次把所有图片读入内存
+            cursor.execute(f"SELECT id FROM {table_name} WHERE visit_survey_image IS NOT NULL")
+            record_ids = [row[0] for row in cursor.fetchall()]
+            for record_id in record_ids:
+                cursor.execute(f"SELECT visit_survey_image FROM {table_name} WHERE id = ?", (record_id,))
+                image_hash, image_size = self.store_image(cursor.fetchone()[0])
+                cursor.execute(f'''
+                    UPDATE {table_name}
+                    SET image_hash = ?, image_size = ?, visit_survey_image = NULL
+                    WHERE id = ?
+                ''', (image_hash, image_size, record_id))
+            if record_ids:
+                print(f"已将{table_name}表中的 {len(record_ids)} 张图片移到文件存储")
+
+    def _add_normalized_date_columns(self, cursor):
+        """为日期字段添加规范字段、维护触发器和索引，并回填已有数据"""
+        for table_name, columns in dates.DATE_COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            existing = [column[1] for column in cursor.fetchall()]
+            columns = [column for column in columns if column in existing]
+            if not columns:
+                continue
+            for column in columns:
+                if dates.iso_column(column) not in existing:
+                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {dates.iso_column(column)} TEXT")
+            for trigger_sql in dates.trigger_sql(table_name, columns):
+                cursor.execute(trigger_sql)
+            cursor.execute(dates.backfill_sql(table_name, columns))
+            for column in columns:
+                cursor.execute(dates.index_sql(table_name, column))
+        
+        cursor.execute("PRAGMA table_info(exception_statistics)")
+        if 'date_iso' not in [column[1] for column in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE exception_statistics ADD COLUMN date_iso TEXT")
+        cursor.execute(dates.backfill_sql('exception_statistics', ('date',)))
+        cursor.execute(exception_statistics.CREATE_DATE_ISO_INDEX_SQL)
+        cursor.execute("ANALYZE")
+    
+    def _queue_derived_columns(self, cursor):
+        """删除调用自定义函数的日期、关键字触发器，改为纯SQL的队列触发器（见 database/derived.py）"""
+        cursor.execute(derived.CREATE_TABLE_SQL)
+        for table_name in derived.TABLES:
+            for sql in derived.drop_function_triggers_sql(table_name):
+                cursor.execute(sql)
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            date_columns, text_columns = derived.source_columns(table_name, [column[1] for column in cursor.fetchall()])
+            if date_columns or text_columns:
+                for sql in derived.trigger_sql(table_name, date_columns, text_columns):
+                    cursor.execute(sql)
+    
+    def _derived_column_plans(self, cursor):
+        """各表重新计算派生字段的语句：表名 -> [SQL]"""
+        plans = {}
+        for table_name in derived.TABLES:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            date_columns, text_columns = derived.source_columns(table_name, [column[1] for column in cursor.fetchall()])
+            if date_columns or text_columns:
+                plans[table_name] = derived.flush_sql(table_name, date_columns, text_columns)
+        return plans
+    
+    def _flush_derived_columns(self, cursor):
+        """重新计算队列中各行的日期规范字段和关键字判定"""
+        cursor.execute(derived.PENDING_TABLES_SQL)
+        for (table_name,) in cursor.fetchall():
+            for sql in self._derived_flush_sql.get(table_name, ()):
+                cursor.execute(sql)
+    
+    def _flush_pending_derived_data(self, connections):
+        """打开数据库时处理其他程序写入后留下的派生字段队列和异常统计标记"""
+        conn = connections.acquire()
+        try:
+            pending = any(conn.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone() is not None
+                          for table_name in ('derived_dirty', 'exception_statistics_dirty',
+                                             'exception_rollup_dirty'))
+        finally:
+            conn.close()
+        if pending:
+            with connections.transaction() as cursor:
+                self._flush_derived_columns(cursor)
+                self._flush_exception_statistics(cursor)
+    
+    def _renormalize_dates(self, cursor):
+        """四位数字改按年份、五位以下的数字不再按 Excel 序列号处理后，重新计算已有的规范字段"""
+        tables = dict(dates.DATE_COLUMNS, exception_statistics=('date',), exception_rollup=('date',))
+        for table_name, columns in tables.items():
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            existing = [column[1] for column in cursor.fetchall()]
+            columns = [column for column in columns if dates.iso_column(column) in existing]
+            if columns:
+                cursor.execute(dates.renormalize_sql(table_name, columns))
+        
     def _update_youth_table(self, cursor):
         """更新youth表结构，添加完整的青年基本情况统计表字段"""
         try:
@@ -649,6 +1082,7 @@ class DatabaseManager:
     def authenticate_user(self, username, password):
         """用户认证"""
         conn = self.get_connection()
+        conn.row_factory = User.row_factory
         cursor = conn.cursor()
         password_hash = hashlib.sha256(password.encode()).hexdigest()
         
@@ -658,146 +1092,85 @@ class DatabaseManager:
         )
         result = cursor.fetchone()
         conn.close()
-        
-        if result:
-            return User(id=result[0], username=result[1], role=result[2], unit=result[3])
-        return None
+        return result
     
-    def search_youth(self, name='', id_card='', school='', phone='', district='', street='', company='', platoon='', squad=''):
-        """搜索青年信息（旧结构）"""
+    def search_youth(self, name='', id_card='', school='', phone='', district='', street='', company='', platoon='', squad='',
+                     page_size=None, after=None):
+        """搜索青年信息（旧结构）
+
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        where, params = self.build_where(
+            Contains('youth', 'youth', 'name', name),
+            Contains('youth', 'youth', 'id_card', id_card),
+            Contains('youth', 'youth', 'school', school),
+            Contains('youth', 'youth', 'phone', phone),
+            Contains('youth', 'youth', 'district', district),
+            Contains('youth', 'youth', 'street', street),
+            Unit('youth', company=company, platoon=platoon, squad=squad),
+        )
+
         conn = self.get_connection()
         cursor = conn.cursor()
-        
+
         # 明确指定字段顺序（旧结构）
-        query = """
+        query = f"""
             SELECT id_card, name, gender, nation, political_status,
                    school, education_level, major, study_status, study_type,
                    phone, household_address, residence_address, family_info,
                    district, street, company, platoon, squad, squad_leader,
-                   camp_status, leave_time, situation_note, parent_phone, 
+                   camp_status, leave_time, situation_note, parent_phone,
                    personal_experience, reference_person, reference_phone, id
-            FROM youth WHERE 1=1
+            FROM youth WHERE {where}
         """
-        params = []
-        
-        if name:
-            query += " AND name LIKE ?"
-            params.append(f'%{name}%')
-        if id_card:
-            query += " AND id_card LIKE ?"
-            params.append(f'%{id_card}%')
-        if school:
-            query += " AND school LIKE ?"
-            params.append(f'%{school}%')
-        if phone:
-            query += " AND phone LIKE ?"
-            params.append(f'%{phone}%')
-        if district:
-            query += " AND district LIKE ?"
-            params.append(f'%{district}%')
-        if street:
-            query += " AND street LIKE ?"
-            params.append(f'%{street}%')
-        if company:
-            query += " AND company LIKE ?"
-            params.append(f'%{company}%')
-        if platoon:
-            query += " AND platoon LIKE ?"
-            params.append(f'%{platoon}%')
-        if squad:
-            query += " AND squad LIKE ?"
-            params.append(f'%{squad}%')
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        results = fetch_page(cursor, query, params, self.YOUTH_KEYSET, page_size, after,
+                             cache=self.query_cache, tables=('youth',))
         conn.close()
-        
+
         return results
-    
+
+    def get_all_youth_detailed(self, date_range=None, page_size=None, after=None, filters=()):
+        """获取青年详细信息（新结构），结果行为 sqlite3.Row
+
+        Args:
+            date_range: 入营时间范围 (开始, 结束)，None 表示不限
+            filters: 其他筛选条件（youth 表别名为 youth）
+            page_size: 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        where, params = self.build_where(DateRange.of('camp_entry_time', date_range), *filters)
+
+        conn = self.get_connection()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+
+        query = f"""
+            SELECT id_card, name, gender, birth_date, nation, political_status,
+                   religion, native_place, education_level, study_status, study_type,
+                   camp_entry_time, recruitment_place, residence_address, household_address,
+                   postal_code, personal_phone, family_phone, school, major,
+                   enrollment_time, initial_hospital, initial_conclusion, initial_time,
+                   physical_conclusion, physical_time, physical_disqualification,
+                   chief_doctor_opinion, graduation_time, company, platoon, squad,
+                   squad_leader, camp_status, leave_time, leave_reason, id
+            FROM youth WHERE {where}
+        """
+        results = fetch_page(cursor, query, params, self.YOUTH_DETAILED_KEYSET, page_size, after,
+                             cache=self.query_cache, tables=('youth',))
+        conn.close()
+
+        return results
+
     def get_youth_by_id_card(self, id_card):
         """根据身份证号获取青年信息，返回Youth对象"""
         conn = self.get_connection()
-        conn.row_factory = sqlite3.Row
+        conn.row_factory = Youth.row_factory
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM youth WHERE id_card=?
         """, (id_card,))
         result = cursor.fetchone()
         conn.close()
-        
-        if result:
-            # 辅助函数来安全获取字段值
-            def get_field(field_name, default=''):
-                try:
-                    return result[field_name] if result[field_name] is not None else default
-                except (KeyError, IndexError):
-                    return default
-            
-            return Youth(
-                id_card=get_field('id_card'),
-                name=get_field('name'),
-                gender=get_field('gender'),
-                birth_date=get_field('birth_date'),
-                nation=get_field('nation'),
-                political_status=get_field('political_status'),
-                religion=get_field('religion'),
-                native_place=get_field('native_place'),
-                education_level=get_field('education_level'),
-                study_status=get_field('study_status'),
-                study_type=get_field('study_type'),
-                camp_entry_time=get_field('camp_entry_time'),
-                recruitment_place=get_field('recruitment_place'),
-                residence_address=get_field('residence_address'),
-                household_address=get_field('household_address'),
-                postal_code=get_field('postal_code'),
-                personal_phone=get_field('personal_phone') or get_field('phone'),
-                family_phone=get_field('family_phone') or get_field('parent_phone'),
-                school=get_field('school'),
-                major=get_field('major'),
-                enrollment_time=get_field('enrollment_time'),
-                initial_hospital=get_field('initial_hospital'),
-                initial_conclusion=get_field('initial_conclusion'),
-                initial_time=get_field('initial_time'),
-                physical_conclusion=get_field('physical_conclusion'),
-                physical_time=get_field('physical_time'),
-                physical_disqualification=get_field('physical_disqualification'),
-                chief_doctor_opinion=get_field('chief_doctor_opinion'),
-                graduation_time=get_field('graduation_time'),
-                physical_examination=get_field('physical_examination'),
-                medical_history_survey=get_field('medical_history_survey'),
-                political_assessment=get_field('political_assessment'),
-                company=get_field('company'),
-                platoon=get_field('platoon'),
-                squad=get_field('squad'),
-                squad_leader=get_field('squad_leader'),
-                information=get_field('information'),
-                item_verification=get_field('item_verification'),
-                special_reexamination=get_field('special_reexamination'),
-                camp_status=get_field('camp_status'),
-                leave_time=get_field('leave_time'),
-                leave_reason=get_field('leave_reason') or get_field('situation_note'),
-                district_positive=get_field('district_positive'),
-                city_positive=get_field('city_positive'),
-                special_screening_positive=get_field('special_screening_positive'),
-                psychological_test_type=get_field('psychological_test_type'),
-                tracking_opinion=get_field('tracking_opinion'),
-                implementation_status=get_field('implementation_status'),
-                district_medical_survey=get_field('district_medical_survey'),
-                city_medical_survey=get_field('city_medical_survey'),
-                province_medical_survey=get_field('province_medical_survey'),
-                family_member_info=get_field('family_member_info') or get_field('family_info'),
-                visit_survey=get_field('visit_survey'),
-                political_assessment2=get_field('political_assessment2'),
-                key_attention=get_field('key_attention'),
-                items=get_field('items'),
-                usage=get_field('usage'),
-                disposal_measures=get_field('disposal_measures'),
-                reexamination_time=get_field('reexamination_time'),
-                existing_situation=get_field('existing_situation'),
-                reexamination_conclusion=get_field('reexamination_conclusion'),
-                id=get_field('id')
-            )
-        return None
+        return result
     
     def get_module_data(self, table_name, youth_id):
         """获取指定模块的数据"""
@@ -871,45 +1244,73 @@ class DatabaseManager:
         conn.close()
         return id_card
     
+    def delete_youths(self, id_cards):
+        """删除青年及其所有相关记录，返回删除的青年人数
+
+        在一个事务中按集合删除：要删除的身份证号先写入临时表，
+        每张相关表只执行一条 DELETE。删除后清理不再被引用的图片文件。
+        """
+        id_cards = [(id_card,) for id_card in dict.fromkeys(id_cards) if id_card]
+        if not id_cards:
+            return 0
+        
+        with self.transaction() as cursor:
+            self._prepare_deleting_youth(cursor)
+            cursor.executemany("INSERT INTO temp.deleting_youth (id_card) VALUES (?)", id_cards)
+            cursor.execute('''
+                UPDATE temp.deleting_youth
+                SET id = (SELECT youth.id FROM youth WHERE youth.id_card = deleting_youth.id_card)
+            ''')
+            deleted_count = self._delete_youth_rows(cursor)
+        
+        self.remove_unused_images()
+        return deleted_count
+    
+    @staticmethod
+    def _prepare_deleting_youth(cursor):
+        """创建（清空）记录待删除青年的临时表"""
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS deleting_youth (id_card TEXT PRIMARY KEY, id INTEGER)")
+        cursor.execute("DELETE FROM temp.deleting_youth")
+    
+    def _delete_youth_rows(self, cursor):
+        """删除 deleting_youth 中的青年及其相关记录，返回删除的青年人数"""
+        for table_name, column, youth_column in self.YOUTH_DEPENDENTS:
+            cursor.execute(f"DELETE FROM {table_name} WHERE {column} IN (SELECT {youth_column} FROM temp.deleting_youth)")
+        cursor.execute("DELETE FROM youth WHERE id_card IN (SELECT id_card FROM temp.deleting_youth)")
+        deleted_count = cursor.rowcount
+        cursor.execute("DELETE FROM temp.deleting_youth")
+        return deleted_count
+    
     def insert_daily_stat(self, youth_id, record_date, mood, physical_condition, mental_state, training, management, notes):
         """插入每日统计"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO daily_stat (youth_id, record_date, mood, physical_condition, 
-                                   mental_state, training, management, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id, record_date, mood, physical_condition, mental_state, training, management, notes))
-        
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self._writing_record(f"该青年在 {record_date} 已有记录，请使用修改功能") as cursor:
+            cursor.execute('''
+                INSERT INTO daily_stat (youth_id, record_date, mood, physical_condition, 
+                                       mental_state, training, management, notes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (youth_id, record_date, mood, physical_condition, mental_state, training, management, notes))
+            record_id = cursor.lastrowid
         
         return record_id
     
     def update_daily_stat(self, record_id, record_date, mood, physical_condition, mental_state, training, management, notes):
         """更新每日统计"""
-        # 先获取原记录信息用于同步
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT y.id_card, d.record_date 
-            FROM daily_stat d
-            JOIN youth y ON d.youth_id = y.id
-            WHERE d.id = ?
-        ''', (record_id,))
-        old_record = cursor.fetchone()
-        
-        # 更新记录
-        cursor.execute('''
-            UPDATE daily_stat 
-            SET record_date=?, mood=?, physical_condition=?, mental_state=?, training=?, management=?, notes=?
-            WHERE id=?
-        ''', (record_date, mood, physical_condition, mental_state, training, management, notes, record_id))
-        
-        conn.commit()
-        conn.close()
+        with self._writing_record(f"该青年在 {record_date} 已有其他记录") as cursor:
+            # 先获取原记录信息用于同步
+            cursor.execute('''
+                SELECT y.id_card, d.record_date 
+                FROM daily_stat d
+                JOIN youth y ON d.youth_id = y.id
+                WHERE d.id = ?
+            ''', (record_id,))
+            old_record = cursor.fetchone()
+            
+            # 更新记录
+            cursor.execute('''
+                UPDATE daily_stat 
+                SET record_date=?, mood=?, physical_condition=?, mental_state=?, training=?, management=?, notes=?
+                WHERE id=?
+            ''', (record_date, mood, physical_condition, mental_state, training, management, notes, record_id))
         
         return True
     
@@ -981,7 +1382,7 @@ class DatabaseManager:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('''
-            SELECT record_date, mood, physical_condition, training_status
+            SELECT record_date, mood, physical_condition, training
             FROM daily_stat
             WHERE youth_id=?
             ORDER BY record_date DESC
@@ -991,105 +1392,90 @@ class DatabaseManager:
         conn.close()
         return results
     
-    def search_town_interviews(self, name='', id_card='', recruitment_place='', company='', platoon='', squad='', time_condition='', time_params=None):
-        """搜索镇街谈心谈话记录"""
+    def search_town_interviews(self, name='', id_card='', recruitment_place='', company='', platoon='', squad='',
+                               date_range=None, keyword='', page_size=None, after=None):
+        """搜索镇街谈心谈话记录，keyword 在思想、精神内容中检索
+
+        date_range 为谈话日期范围 (开始, 结束)；
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        return self._search_interviews('town_interview', 't', self.TOWN_INTERVIEW_KEYSET, name, id_card,
+                                       Unit('y', recruitment_place, company, platoon, squad),
+                                       date_range, keyword, page_size, after)
+
+    def _search_interviews(self, table_name, alias, keyset, name, id_card, unit, date_range, keyword, page_size, after):
+        """镇街、领导谈心谈话记录的搜索（两张表结构相同）"""
+        where, params = self.build_where(
+            DateRange.of(f'{alias}.interview_date', date_range),
+            Contains(table_name, alias, 'youth_name', name),
+            Contains(table_name, alias, 'youth_id_card', id_card),
+            Contains(table_name, alias, ('thoughts', 'spirit'), keyword),
+            unit,
+        )
+
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        query = """
-            SELECT t.id, t.youth_id_card, t.youth_name, t.gender, t.interview_date, 
+
+        query = f"""
+            SELECT {alias}.id, {alias}.youth_id_card, {alias}.youth_name, {alias}.gender, {alias}.interview_date,
                    y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader,
-                   t.thoughts, t.spirit, t.created_at
-            FROM town_interview t
-            LEFT JOIN youth y ON t.youth_id_card = y.id_card
-            WHERE 1=1
+                   {alias}.thoughts, {alias}.spirit, {alias}.created_at
+            FROM {table_name} {alias}
+            LEFT JOIN youth y ON {alias}.youth_id_card = y.id_card
+            WHERE {where}
         """
-        params = []
-        
-        # 添加时间筛选条件
-        if time_condition:
-            query += f" AND {time_condition.replace('interview_date', 't.interview_date')}"
-            params.extend(time_params or [])
-        
-        if name:
-            query += " AND t.youth_name LIKE ?"
-            params.append(f'%{name}%')
-        if id_card:
-            query += " AND t.youth_id_card LIKE ?"
-            params.append(f'%{id_card}%')
-        if recruitment_place:
-            query += " AND y.recruitment_place LIKE ?"
-            params.append(f'%{recruitment_place}%')
-        if company:
-            query += " AND y.company LIKE ?"
-            params.append(f'%{company}%')
-        if platoon:
-            query += " AND y.platoon LIKE ?"
-            params.append(f'%{platoon}%')
-        if squad:
-            query += " AND y.squad LIKE ?"
-            params.append(f'%{squad}%')
-        
-        query += " ORDER BY t.interview_date DESC, t.youth_id_card ASC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        results = fetch_page(cursor, query, params, keyset, page_size, after,
+                             cache=self.query_cache, tables=(table_name, 'youth'))
         conn.close()
-        
+
         return results
     
     def insert_town_interview(self, youth_id_card, youth_name, gender, interview_date, 
                              visit_survey_image, thoughts, spirit):
         """插入镇街谈心谈话记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO town_interview (youth_id_card, youth_name, gender, interview_date,
-                                      visit_survey_image, thoughts, spirit)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id_card, youth_name, gender, interview_date, visit_survey_image, thoughts, spirit))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        conn.close()
+        image_hash, image_size = self.image_key(visit_survey_image)
+        with self._writing_record(f"该青年在 {interview_date} 已有镇街谈心谈话记录，请使用修改功能",
+                                  visit_survey_image) as cursor:
+            cursor.execute('''
+                INSERT INTO town_interview (youth_id_card, youth_name, gender, interview_date,
+                                          image_hash, image_size, thoughts, spirit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (youth_id_card, youth_name, gender, interview_date, image_hash, image_size, thoughts, spirit))
+            record_id = cursor.lastrowid
         
         return record_id
     
     def update_town_interview(self, record_id, youth_id_card, youth_name, gender, 
                              interview_date, visit_survey_image, thoughts, spirit):
         """更新镇街谈心谈话记录"""
-        # 先获取原记录信息用于同步
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT youth_id_card, interview_date 
-            FROM town_interview 
-            WHERE id = ?
-        ''', (record_id,))
-        old_record = cursor.fetchone()
-        
-        # 更新记录
-        if visit_survey_image is not None:
-            cursor.execute('''
-                UPDATE town_interview 
-                SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
-                    visit_survey_image=?, thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, interview_date, 
-                  visit_survey_image, thoughts, spirit, record_id))
-        else:
+        with self._writing_record(f"该青年在 {interview_date} 已有其他镇街谈心谈话记录",
+                                  visit_survey_image) as cursor:
+            # 先获取原记录信息用于同步
             cursor.execute('''
-                UPDATE town_interview 
-                SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
-                    thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, interview_date, 
-                  thoughts, spirit, record_id))
-        
-        conn.commit()
-        conn.close()
+                SELECT youth_id_card, interview_date 
+                FROM town_interview 
+                WHERE id = ?
+            ''', (record_id,))
+            old_record = cursor.fetchone()
+            
+            # 更新记录
+            if visit_survey_image is not None:
+                image_hash, image_size = self.image_key(visit_survey_image)
+                cursor.execute('''
+                    UPDATE town_interview 
+                    SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
+                        visit_survey_image=NULL, image_hash=?, image_size=?, thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, interview_date, 
+                      image_hash, image_size, thoughts, spirit, record_id))
+            else:
+                cursor.execute('''
+                    UPDATE town_interview 
+                    SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
+                        thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, interview_date, 
+                      thoughts, spirit, record_id))
         
         return True
     
@@ -1125,125 +1511,69 @@ class DatabaseManager:
     
     def get_town_interview_image(self, record_id):
         """获取镇街谈心谈话记录的图片数据"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT visit_survey_image FROM town_interview WHERE id=?', (record_id,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result[0] if result else None
+        return self._read_image('town_interview', record_id)
     
     def get_youth_options(self):
         """获取所有青年的姓名和身份证号选项"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT id_card, name, gender FROM youth ORDER BY name')
-        results = cursor.fetchall()
-        conn.close()
-        
-        return results
+        return self.youth_directory.options()
     
-    def search_leader_interviews(self, name='', id_card='', recruitment_place='', company='', platoon='', squad='', time_condition='', time_params=None):
-        """搜索领导谈心谈话记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT l.id, l.youth_id_card, l.youth_name, l.gender, l.interview_date, 
-                   y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader,
-                   l.thoughts, l.spirit, l.created_at
-            FROM leader_interview l
-            LEFT JOIN youth y ON l.youth_id_card = y.id_card
-            WHERE 1=1
+    def search_leader_interviews(self, name='', id_card='', recruitment_place='', company='', platoon='', squad='',
+                                 date_range=None, keyword='', page_size=None, after=None):
+        """搜索领导谈心谈话记录，keyword 在思想、精神内容中检索
+
+        date_range 为谈话日期范围 (开始, 结束)；
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
         """
-        params = []
-        
-        # 添加时间筛选条件
-        if time_condition:
-            query += f" AND {time_condition.replace('interview_date', 'l.interview_date')}"
-            params.extend(time_params or [])
-        
-        if name:
-            query += " AND l.youth_name LIKE ?"
-            params.append(f'%{name}%')
-        if id_card:
-            query += " AND l.youth_id_card LIKE ?"
-            params.append(f'%{id_card}%')
-        if recruitment_place:
-            query += " AND y.recruitment_place LIKE ?"
-            params.append(f'%{recruitment_place}%')
-        if company:
-            query += " AND y.company LIKE ?"
-            params.append(f'%{company}%')
-        if platoon:
-            query += " AND y.platoon LIKE ?"
-            params.append(f'%{platoon}%')
-        if squad:
-            query += " AND y.squad LIKE ?"
-            params.append(f'%{squad}%')
-        
-        query += " ORDER BY l.interview_date DESC, l.youth_id_card ASC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-        
-        return results
+        return self._search_interviews('leader_interview', 'l', self.LEADER_INTERVIEW_KEYSET, name, id_card,
+                                       Unit('y', recruitment_place, company, platoon, squad),
+                                       date_range, keyword, page_size, after)
     
     def insert_leader_interview(self, youth_id_card, youth_name, gender, interview_date, 
                                visit_survey_image, thoughts, spirit):
         """插入领导谈心谈话记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO leader_interview (youth_id_card, youth_name, gender, interview_date,
-                                        visit_survey_image, thoughts, spirit)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id_card, youth_name, gender, interview_date, visit_survey_image, thoughts, spirit))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        conn.close()
+        image_hash, image_size = self.image_key(visit_survey_image)
+        with self._writing_record(f"该青年在 {interview_date} 已有领导谈心谈话记录，请使用修改功能",
+                                  visit_survey_image) as cursor:
+            cursor.execute('''
+                INSERT INTO leader_interview (youth_id_card, youth_name, gender, interview_date,
+                                            image_hash, image_size, thoughts, spirit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (youth_id_card, youth_name, gender, interview_date, image_hash, image_size, thoughts, spirit))
+            record_id = cursor.lastrowid
         
         return record_id
     
     def update_leader_interview(self, record_id, youth_id_card, youth_name, gender, 
                                interview_date, visit_survey_image, thoughts, spirit):
         """更新领导谈心谈话记录"""
-        # 先获取原记录信息用于同步
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT youth_id_card, interview_date 
-            FROM leader_interview 
-            WHERE id = ?
-        ''', (record_id,))
-        old_record = cursor.fetchone()
-        
-        # 更新记录
-        if visit_survey_image is not None:
-            cursor.execute('''
-                UPDATE leader_interview 
-                SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
-                    visit_survey_image=?, thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, interview_date, 
-                  visit_survey_image, thoughts, spirit, record_id))
-        else:
+        with self._writing_record(f"该青年在 {interview_date} 已有其他领导谈心谈话记录",
+                                  visit_survey_image) as cursor:
+            # 先获取原记录信息用于同步
             cursor.execute('''
-                UPDATE leader_interview 
-                SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
-                    thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, interview_date, 
-                  thoughts, spirit, record_id))
-        
-        conn.commit()
-        conn.close()
+                SELECT youth_id_card, interview_date 
+                FROM leader_interview 
+                WHERE id = ?
+            ''', (record_id,))
+            old_record = cursor.fetchone()
+            
+            # 更新记录
+            if visit_survey_image is not None:
+                image_hash, image_size = self.image_key(visit_survey_image)
+                cursor.execute('''
+                    UPDATE leader_interview 
+                    SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
+                        visit_survey_image=NULL, image_hash=?, image_size=?, thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, interview_date, 
+                      image_hash, image_size, thoughts, spirit, record_id))
+            else:
+                cursor.execute('''
+                    UPDATE leader_interview 
+                    SET youth_id_card=?, youth_name=?, gender=?, interview_date=?,
+                        thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, interview_date, 
+                      thoughts, spirit, record_id))
         
         return True
     
@@ -1279,88 +1609,70 @@ class DatabaseManager:
     
     def get_leader_interview_image(self, record_id):
         """获取领导谈心谈话记录的图片数据"""
+        return self._read_image('leader_interview', record_id)
+    
+    def search_visit_surveys(self, youth_id_card='', name='', id_card='', page_size=None, after=None):
+        """搜索走访调查记录
+
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        where, params = self.build_where(
+            Equals('youth_id_card', youth_id_card),
+            Contains('visit_survey', 'visit_survey', 'youth_name', name),
+            Contains('visit_survey', 'visit_survey', 'youth_id_card', id_card),
+        )
+
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute('SELECT visit_survey_image FROM leader_interview WHERE id=?', (record_id,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result[0] if result else None
-    
-    def search_visit_surveys(self, youth_id_card='', name='', id_card=''):
-        """搜索走访调查记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        query = """
-            SELECT id, youth_id_card, youth_name, gender, survey_date, 
+
+        query = f"""
+            SELECT id, youth_id_card, youth_name, gender, survey_date,
                    thoughts, spirit, created_at
-            FROM visit_survey WHERE 1=1
+            FROM visit_survey WHERE {where}
         """
-        params = []
-        
-        if youth_id_card:
-            query += " AND youth_id_card = ?"
-            params.append(youth_id_card)
-        if name:
-            query += " AND youth_name LIKE ?"
-            params.append(f'%{name}%')
-        if id_card:
-            query += " AND youth_id_card LIKE ?"
-            params.append(f'%{id_card}%')
-        
-        query += " ORDER BY youth_id_card ASC, survey_date ASC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        results = fetch_page(cursor, query, params, self.VISIT_SURVEY_KEYSET, page_size, after,
+                             cache=self.query_cache, tables=('visit_survey',))
         conn.close()
-        
+
         return results
     
     def insert_visit_survey(self, youth_id_card, youth_name, gender, survey_date, 
                            visit_survey_image, thoughts, spirit):
         """插入走访调查记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO visit_survey (youth_id_card, youth_name, gender, survey_date,
-                                    visit_survey_image, thoughts, spirit)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id_card, youth_name, gender, survey_date, visit_survey_image, thoughts, spirit))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        conn.close()
+        image_hash, image_size = self.image_key(visit_survey_image)
+        with self._writing_record(f"该青年在 {survey_date} 已有走访调查记录，请使用修改功能",
+                                  visit_survey_image) as cursor:
+            cursor.execute('''
+                INSERT INTO visit_survey (youth_id_card, youth_name, gender, survey_date,
+                                        image_hash, image_size, thoughts, spirit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (youth_id_card, youth_name, gender, survey_date, image_hash, image_size, thoughts, spirit))
+            record_id = cursor.lastrowid
         
         return record_id
     
     def update_visit_survey(self, record_id, youth_id_card, youth_name, gender, 
                            survey_date, visit_survey_image, thoughts, spirit):
         """更新走访调查记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        if visit_survey_image is not None:
-            cursor.execute('''
-                UPDATE visit_survey 
-                SET youth_id_card=?, youth_name=?, gender=?, survey_date=?,
-                    visit_survey_image=?, thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, survey_date, 
-                  visit_survey_image, thoughts, spirit, record_id))
-        else:
-            cursor.execute('''
-                UPDATE visit_survey 
-                SET youth_id_card=?, youth_name=?, gender=?, survey_date=?,
-                    thoughts=?, spirit=?
-                WHERE id=?
-            ''', (youth_id_card, youth_name, gender, survey_date, 
-                  thoughts, spirit, record_id))
-        
-        conn.commit()
-        conn.close()
+        with self._writing_record(f"该青年在 {survey_date} 已有其他走访调查记录",
+                                  visit_survey_image) as cursor:
+            if visit_survey_image is not None:
+                image_hash, image_size = self.image_key(visit_survey_image)
+                cursor.execute('''
+                    UPDATE visit_survey 
+                    SET youth_id_card=?, youth_name=?, gender=?, survey_date=?,
+                        visit_survey_image=NULL, image_hash=?, image_size=?, thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, survey_date, 
+                      image_hash, image_size, thoughts, spirit, record_id))
+            else:
+                cursor.execute('''
+                    UPDATE visit_survey 
+                    SET youth_id_card=?, youth_name=?, gender=?, survey_date=?,
+                        thoughts=?, spirit=?
+                    WHERE id=?
+                ''', (youth_id_card, youth_name, gender, survey_date, 
+                      thoughts, spirit, record_id))
         
         return True
     
@@ -1393,14 +1705,92 @@ class DatabaseManager:
     
     def get_visit_survey_image(self, record_id):
         """获取走访调查记录的图片数据"""
+        return self._read_image('visit_survey', record_id)
+
+    # ==================== 图片存储相关方法 ====================
+
+    def store_image(self, image_data):
+        """把图片写入文件存储，返回 (摘要, 大小)；没有图片时返回 (None, None)"""
+        if not image_data:
+            return None, None
+        return self.blob_store.put(bytes(image_data)), len(image_data)
+
+    def image_key(self, image_data):
+        """图片的 (摘要, 大小)，只计算摘要、不写入文件；没有图片时返回 (None, None)"""
+        if not image_data:
+            return None, None
+        return self.blob_store.digest(bytes(image_data)), len(image_data)
+
+    @contextmanager
+    def _writing_record(self, duplicate_message, image_data=None):
+        """写入一条记录的事务，返回游标
+
+        违反自然键唯一约束时回滚并抛出 ValueError(duplicate_message)，只读的归档库中同样抛出 ValueError；
+        图片在语句执行成功后、提交前才写入文件存储，写入被拒绝时不会留下没有记录引用的图片。
+        """
+        if not self.store.writable:
+            raise ValueError("归档库为只读，不能修改")
+        try:
+            with self.transaction() as cursor:
+                yield cursor
+                if image_data:
+                    self.blob_store.put(bytes(image_data))
+        except sqlite3.IntegrityError as e:
+            if 'UNIQUE' not in str(e):
+                raise
+            raise ValueError(duplicate_message) from e
+
+    def _read_image(self, table_name, record_id):
+        """读取记录的图片，兼容仍保存在表中的旧图片"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute('SELECT visit_survey_image FROM visit_survey WHERE id=?', (record_id,))
+
+        cursor.execute(f'SELECT image_hash, visit_survey_image FROM {table_name} WHERE id=?', (record_id,))
         result = cursor.fetchone()
         conn.close()
-        
-        return result[0] if result else None
+
+        if not result:
+            return None
+        if result[0]:
+            return self.blob_store.get(result[0])
+        return result[1]
+
+    def _referenced_images(self, conn):
+        """库中引用的图片摘要（包括合并重复记录时移出的记录）"""
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        tables = list(self.IMAGE_TABLES)
+        tables += [self.duplicates_table(table_name) for table_name in self.IMAGE_TABLES
+                   if self.duplicates_table(table_name) in existing]
+        referenced = set()
+        for table_name in tables:
+            rows = conn.execute(f'SELECT DISTINCT image_hash FROM {table_name} WHERE image_hash IS NOT NULL')
+            referenced.update(row[0] for row in rows)
+        return referenced
+
+    def remove_unused_images(self):
+        """删除已没有记录引用的图片文件（本库和归档库共用图片目录），返回删除的数量"""
+        conn = self.get_connection()
+        try:
+            referenced = self._referenced_images(conn)
+        finally:
+            conn.close()
+                
+        # 当前未使用的其他库（本库或归档库）
+        other_paths = [self.archive_path(year) for year in self.archived_years() if year != self.archive_year]
+        if self.archive_year is not None:
+            other_paths.append(self.db_path)
+        for path in other_paths:
+            other = sqlite3.connect(path)
+            try:
+                referenced.update(self._referenced_images(other))
+            finally:
+                other.close()
+
+        removed = 0
+        for blob_hash in list(self.blob_store.iter_hashes()):
+            if blob_hash not in referenced and self.blob_store.delete(blob_hash):
+                removed += 1
+        return removed
 
     # ==================== 入营点验情况相关方法 ====================
     
@@ -1422,6 +1812,7 @@ class DatabaseManager:
     def get_camp_verifications_by_user_id(self, user_id):
         """根据身份证号获取入营点验记录"""
         conn = self.get_connection()
+        conn.row_factory = CampVerification.row_factory
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1431,28 +1822,14 @@ class DatabaseManager:
             ORDER BY data DESC
         ''', (user_id,))
         
-        results = cursor.fetchall()
+        records = cursor.fetchall()
         conn.close()
-        
-        from .models import CampVerification
-        records = []
-        for row in results:
-            cv = CampVerification(
-                id=row[0],
-                username=row[1],
-                user_id=row[2],
-                item=row[3],
-                usage=row[4],
-                Disposal=row[5],
-                data=row[6]
-            )
-            records.append(cv)
-        
         return records
     
     def get_camp_verifications_by_username_and_id(self, username, user_id):
         """根据用户名和身份证号同时查询入营点验记录"""
         conn = self.get_connection()
+        conn.row_factory = CampVerification.row_factory
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1462,23 +1839,8 @@ class DatabaseManager:
             ORDER BY data DESC
         ''', (username, user_id))
         
-        results = cursor.fetchall()
+        records = cursor.fetchall()
         conn.close()
-        
-        from .models import CampVerification
-        records = []
-        for row in results:
-            cv = CampVerification(
-                id=row[0],
-                username=row[1],
-                user_id=row[2],
-                item=row[3],
-                usage=row[4],
-                Disposal=row[5],
-                data=row[6]
-            )
-            records.append(cv)
-        
         return records
     
     def update_camp_verification(self, record_id, item, usage, Disposal, data):
@@ -1554,138 +1916,96 @@ class DatabaseManager:
     
     def insert_daily_stat_by_id_card(self, id_card, record_date, mood, physical_condition, mental_state, training, management, notes):
         """基于身份证号插入每日统计"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # 先获取youth_id
-        cursor.execute('SELECT id FROM youth WHERE id_card = ?', (id_card,))
-        youth_result = cursor.fetchone()
-        
-        if not youth_result:
-            conn.close()
+        youth_id = self.youth_directory.youth_id(id_card)
+        if youth_id is None:
             raise ValueError(f"未找到身份证号为 {id_card} 的青年信息")
         
-        youth_id = youth_result[0]
-        
-        # 检查是否已存在相同日期的记录
-        cursor.execute('''
-            SELECT id FROM daily_stat 
-            WHERE youth_id = ? AND record_date = ?
-        ''', (youth_id, record_date))
-        
-        existing = cursor.fetchone()
-        if existing:
-            conn.close()
-            raise ValueError(f"该青年在 {record_date} 已有记录，请使用修改功能")
-        
-        # 插入新记录
-        cursor.execute('''
-            INSERT INTO daily_stat (youth_id, record_date, mood, physical_condition, 
-                                   mental_state, training, management, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id, record_date, mood, physical_condition, mental_state, training, management, notes))
-        
-        record_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return record_id
+        # 同一日期已有记录时由唯一索引拒绝
+        return self.insert_daily_stat(youth_id, record_date, mood, physical_condition, mental_state,
+                                      training, management, notes)
     
-    def get_all_daily_stats_with_youth_info(self, time_condition='', time_params=None):
-        """获取所有每日统计数据，包含青年基本信息"""
+    def get_all_daily_stats_with_youth_info(self, date_range=None, page_size=None, after=None):
+        """获取所有每日统计数据，包含青年基本信息
+
+        date_range 为记录日期范围 (开始, 结束)；
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        return self.query_daily_stats(DateRange.of('d.record_date', date_range),
+                                      page_size=page_size, after=after)
+
+    def query_daily_stats(self, *filters, page_size=None, after=None):
+        """按筛选条件查询每日统计数据（d 为 daily_stat，y 为 youth），包含青年基本信息"""
+        where, params = self.build_where(*filters)
+
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        base_query = '''
+
+        query = f'''
             SELECT d.id, y.id_card, y.name, y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader,
                    d.record_date, d.mood, d.physical_condition, d.mental_state, d.training, d.management, d.notes
             FROM daily_stat d
             JOIN youth y ON d.youth_id = y.id
+            WHERE {where}
         '''
-        
-        if time_condition:
-            query = base_query + f" WHERE {time_condition.replace('interview_date', 'd.record_date')} ORDER BY d.record_date DESC, y.id_card ASC"
-            cursor.execute(query, time_params or [])
-        else:
-            query = base_query + " ORDER BY d.record_date DESC, y.id_card ASC"
-            cursor.execute(query)
-        
-        results = cursor.fetchall()
+        results = fetch_page(cursor, query, params, self.DAILY_STAT_KEYSET, page_size, after,
+                             cache=self.query_cache, tables=('daily_stat', 'youth'))
         conn.close()
         return results
     
-    def search_daily_stats_with_youth_info(self, name='', id_card='', recruitment_place='', company='', platoon='', squad=''):
-        """搜索每日统计数据，包含青年基本信息"""
+    def search_daily_stats_with_youth_info(self, name='', id_card='', recruitment_place='', company='', platoon='', squad='',
+                                           page_size=None, after=None):
+        """搜索每日统计数据，包含青年基本信息
+
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        return self.query_daily_stats(
+            Contains('youth', 'y', 'name', name),
+            Contains('youth', 'y', 'id_card', id_card),
+            Unit('y', recruitment_place, company, platoon, squad),
+            page_size=page_size, after=after,
+        )
+    
+    def filter_daily_stats_by_date_range(self, start_date, end_date, page_size=None, after=None):
+        """按日期范围筛选每日统计数据
+
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        return self.query_daily_stats(DateRange('d.record_date', start_date, end_date),
+                                      page_size=page_size, after=after)
+    
+    def get_unit_options(self, level, recruitment_place='', company='', platoon=''):
+        """获取某一级单位中有青年的名称（level 为 units.LEVELS 中的字段名），用于级联下拉框
+
+        上级名称为空表示不限。
+        """
+        index = units.LEVELS.index(level)
+        values = (recruitment_place, company, platoon)[:index]
+        query, params = units.options_sql(index, values)
+        
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        query = '''
-            SELECT d.id, y.id_card, y.name, y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader,
-                   d.record_date, d.mood, d.physical_condition, d.mental_state, d.training, d.management, d.notes
-            FROM daily_stat d
-            JOIN youth y ON d.youth_id = y.id
-            WHERE 1=1
-        '''
-        params = []
-        
-        if name:
-            query += " AND y.name LIKE ?"
-            params.append(f'%{name}%')
-        if id_card:
-            query += " AND y.id_card LIKE ?"
-            params.append(f'%{id_card}%')
-        if recruitment_place:
-            query += " AND y.recruitment_place LIKE ?"
-            params.append(f'%{recruitment_place}%')
-        if company:
-            query += " AND y.company LIKE ?"
-            params.append(f'%{company}%')
-        if platoon:
-            query += " AND y.platoon LIKE ?"
-            params.append(f'%{platoon}%')
-        if squad:
-            query += " AND y.squad LIKE ?"
-            params.append(f'%{squad}%')
-        
-        query += " ORDER BY d.record_date DESC, y.id_card ASC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+        results = self.query_cache.fetchall(cursor, query, params, ('unit', 'youth'))
         conn.close()
-        return results
+        return [row[0] for row in results]
     
-    def filter_daily_stats_by_date_range(self, start_date, end_date):
-        """按日期范围筛选每日统计数据"""
+    def get_youth_in_unit(self, recruitment_place='', company='', platoon='', squad=''):
+        """获取指定单位下的青年 (id, id_card, name)，各级名称为空表示不限"""
+        where, params = self.build_where(
+            Unit('youth', recruitment_place, company, platoon, squad, exact=True))
+        
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT d.id, y.id_card, y.name, y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader,
-                   d.record_date, d.mood, d.physical_condition, d.mental_state, d.training, d.management, d.notes
-            FROM daily_stat d
-            JOIN youth y ON d.youth_id = y.id
-            WHERE d.record_date >= ? AND d.record_date <= ?
-            ORDER BY d.record_date DESC, y.id_card ASC
-        ''', (start_date, end_date))
-        
-        results = cursor.fetchall()
+        query = f"""
+            SELECT id, id_card, name FROM youth WHERE {where}
+            ORDER BY recruitment_place, company, platoon, squad, name
+        """
+        results = self.query_cache.fetchall(cursor, query, params, ('unit', 'youth'))
         conn.close()
         return results
     
     def get_youth_options_for_daily_stat(self):
         """获取青年选项，用于每日统计的下拉框"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT id_card, name 
-            FROM youth 
-            ORDER BY name ASC
-        ''')
-        
-        results = cursor.fetchall()
-        conn.close()
-        return results
+        return [(id_card, name) for id_card, name, _ in self.youth_directory.options()]
     
     def batch_update_daily_stats(self, record_ids, updates):
         """批量更新每日统计记录
@@ -1714,6 +2034,7 @@ class DatabaseManager:
             return 0
         
         # 执行批量更新
+        placeholders = ','.join('?' * len(record_ids))
         params.extend(record_ids)
         update_query = f'''
             UPDATE daily_stat 
@@ -1754,20 +2075,15 @@ class DatabaseManager:
                                    family_member_info, visit_survey, political_assessment, 
                                    key_attention, assessment_date, thoughts, spirit):
         """插入政治考核情况记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO political_assessment (youth_id_card, name, gender, id_card,
-                                            family_member_info, visit_survey, political_assessment,
-                                            key_attention, assessment_date, thoughts, spirit)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (youth_id_card, name, gender, id_card, family_member_info, visit_survey, 
-              political_assessment, key_attention, assessment_date, thoughts, spirit))
-        
-        conn.commit()
-        record_id = cursor.lastrowid
-        conn.close()
+        with self._writing_record(f"该青年在 {assessment_date} 已有政治考核记录，请使用修改功能") as cursor:
+            cursor.execute('''
+                INSERT INTO political_assessment (youth_id_card, name, gender, id_card,
+                                                family_member_info, visit_survey, political_assessment,
+                                                key_attention, assessment_date, thoughts, spirit)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (youth_id_card, name, gender, id_card, family_member_info, visit_survey, 
+                  political_assessment, key_attention, assessment_date, thoughts, spirit))
+            record_id = cursor.lastrowid
         
         return record_id
     
@@ -1775,20 +2091,15 @@ class DatabaseManager:
                                    political_assessment, key_attention, assessment_date, 
                                    thoughts, spirit):
         """更新政治考核情况记录"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE political_assessment 
-            SET family_member_info=?, visit_survey=?, political_assessment=?, 
-                key_attention=?, assessment_date=?, thoughts=?, spirit=?
-            WHERE id=?
-        ''', (family_member_info, visit_survey, political_assessment, key_attention, 
-              assessment_date, thoughts, spirit, record_id))
-        
-        conn.commit()
-        success = cursor.rowcount > 0
-        conn.close()
+        with self._writing_record(f"该青年在 {assessment_date} 已有其他政治考核记录") as cursor:
+            cursor.execute('''
+                UPDATE political_assessment 
+                SET family_member_info=?, visit_survey=?, political_assessment=?, 
+                    key_attention=?, assessment_date=?, thoughts=?, spirit=?
+                WHERE id=?
+            ''', (family_member_info, visit_survey, political_assessment, key_attention, 
+                  assessment_date, thoughts, spirit, record_id))
+            success = cursor.rowcount > 0
         
         return success
     
@@ -1823,14 +2134,14 @@ class DatabaseManager:
         return deleted_count
 
     def check_political_assessment_exists(self, youth_id_card, name, assessment_date):
-        """检查政治考核情况记录是否已存在（根据身份证号、姓名和日期）"""
+        """检查政治考核情况记录是否已存在（根据身份证号和日期，与唯一索引一致；name 仅为兼容保留）"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             SELECT id FROM political_assessment 
-            WHERE youth_id_card = ? AND name = ? AND assessment_date = ?
-        ''', (youth_id_card, name, assessment_date))
+            WHERE youth_id_card = ? AND assessment_date = ?
+        ''', (youth_id_card, assessment_date))
         
         result = cursor.fetchone()
         conn.close()
@@ -1840,17 +2151,17 @@ class DatabaseManager:
     def update_political_assessment_by_unique_key(self, youth_id_card, name, assessment_date,
                                                   family_member_info, visit_survey, political_assessment,
                                                   key_attention, thoughts, spirit):
-        """根据唯一键（身份证号、姓名、日期）更新政治考核情况记录"""
+        """根据唯一键（身份证号、日期）更新政治考核情况记录"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
             UPDATE political_assessment 
-            SET family_member_info=?, visit_survey=?, political_assessment=?, 
+            SET name=?, family_member_info=?, visit_survey=?, political_assessment=?, 
                 key_attention=?, thoughts=?, spirit=?
-            WHERE youth_id_card=? AND name=? AND assessment_date=?
-        ''', (family_member_info, visit_survey, political_assessment, key_attention, 
-              thoughts, spirit, youth_id_card, name, assessment_date))
+            WHERE youth_id_card=? AND assessment_date=?
+        ''', (name, family_member_info, visit_survey, political_assessment, key_attention, 
+              thoughts, spirit, youth_id_card, assessment_date))
         
         conn.commit()
         success = cursor.rowcount > 0
@@ -1858,134 +2169,404 @@ class DatabaseManager:
         
         return success
 
+    # ==================== 批量写入 ====================
+    
+    UPSERT_POLICIES = ('skip', 'overwrite', 'report')
+    # 查询已存在记录时每批的键数量
+    UPSERT_LOOKUP_BATCH = 500
+    
+    def bulk_upsert(self, table_name, rows, policy='overwrite'):
+        """按自然键（UNIQUE_KEYS）批量写入记录，整批在一个事务中用一条语句执行
+        
+        Args:
+            table_name: UNIQUE_KEYS 中的表名
+            rows: 字典列表，各行字段相同且包含全部键字段
+            policy: 键已存在时的处理方式
+                'skip'      跳过，保留已有记录
+                'overwrite' 用新值覆盖已有记录的这些字段
+                'report'    只要有已存在的记录就什么都不写入，由调用方询问用户后
+                            再用 skip 或 overwrite 重新写入；没有时全部插入
+        
+        Returns:
+            dict: {'inserted': 新增数, 'updated': 覆盖数, 'skipped': 跳过数,
+                   'conflicts': 键已存在（或本批中重复）的行}
+        """
+        if policy not in self.UPSERT_POLICIES:
+            raise ValueError(f"未知的写入策略: {policy}")
+        if table_name not in self.UNIQUE_KEYS:
+            raise ValueError(f"{table_name} 表没有定义自然键")
+        
+        rows = list(rows)
+        result = {'inserted': 0, 'updated': 0, 'skipped': 0, 'conflicts': []}
+        if not rows:
+            return result
+        
+        key_columns = self.UNIQUE_KEYS[table_name][1]
+        columns = list(rows[0])
+        
+        with self.transaction() as cursor:
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            table_columns = {column[1] for column in cursor.fetchall()}
+            unknown = [column for column in columns if column not in table_columns]
+            missing = [column for column in key_columns if column not in columns]
+            if unknown or missing:
+                raise ValueError(f"写入 {table_name} 的字段不正确: 未知字段 {unknown}，缺少键字段 {missing}")
+            
+            seen = self._existing_keys(cursor, table_name, key_columns, rows)
+            for row in rows:
+                key = tuple(row[column] for column in key_columns)
+                if None in key:
+                    result['inserted'] += 1
+                elif key in seen:
+                    result['conflicts'].append(row)
+                else:
+                    seen.add(key)
+                    result['inserted'] += 1
+            
+            if policy == 'report' and result['conflicts']:
+                result['inserted'] = 0
+                return result
+            if policy == 'overwrite':
+                result['updated'] = len(result['conflicts'])
+            else:
+                result['skipped'] = len(result['conflicts'])
+            
+            for sql in self._upsert_statements(table_name, columns, key_columns, policy == 'overwrite'):
+                cursor.executemany(sql, rows)
+        
+        return result
+    
+    def _existing_keys(self, cursor, table_name, key_columns, rows):
+        """查询 rows 中已存在于表中的键（按第一个键字段分批查询）"""
+        first_values = list({row[key_columns[0]] for row in rows if row[key_columns[0]] is not None})
+        existing = set()
+        for start in range(0, len(first_values), self.UPSERT_LOOKUP_BATCH):
+            batch = first_values[start:start + self.UPSERT_LOOKUP_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f"SELECT {', '.join(key_columns)} FROM {table_name} "
+                           f"WHERE {key_columns[0]} IN ({placeholders})", batch)
+            existing.update(tuple(row) for row in cursor.fetchall())
+        return existing
+    
+    @staticmethod
+    def _upsert_statements(table_name, columns, key_columns, overwrite):
+        """批量写入使用的语句（参数为行字典）"""
+        values = ', '.join(f":{column}" for column in columns)
+        insert = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({values})"
+        updates = [column for column in columns if column not in key_columns]
+        if not overwrite or not updates:
+            if sqlite3.sqlite_version_info < (3, 24, 0):
+                return [insert.replace('INSERT INTO', 'INSERT OR IGNORE INTO', 1)]
+            return [f"{insert} ON CONFLICT({', '.join(key_columns)}) DO NOTHING"]
+        
+        assignments = ', '.join(f"{column} = excluded.{column}" for column in updates)
+        if sqlite3.sqlite_version_info < (3, 24, 0):
+            # SQLite 3.24 以下不支持 UPSERT：先更新已有记录，再插入其余记录
+            keys = ' AND '.join(f"{column} = :{column}" for column in key_columns)
+            assignments = ', '.join(f"{column} = :{column}" for column in updates)
+            return [f"UPDATE {table_name} SET {assignments} WHERE {keys}",
+                    insert.replace('INSERT INTO', 'INSERT OR IGNORE INTO', 1)]
+        return [f"{insert} ON CONFLICT({', '.join(key_columns)}) DO UPDATE SET {assignments}"]
+
+    # ==================== 往年归档 ====================
+    
+    def archive_path(self, year):
+        return os.path.join(self.archive_dir, archive.file_name(year))
+    
+    def archived_years(self):
+        """已归档的年份，从新到旧排列"""
+        return archive.list_years(self.archive_dir)
+    
+    def archive_intake(self, year):
+        """把 year 年入营的青年及其全部记录移到该年的归档库（做法见 database/archive.py）
+        
+        只能归档往年，且需在使用本库时执行。返回移动的青年人数。
+        """
+        year = int(year)
+        if year >= datetime.now().year:
+            raise ValueError("只能归档往年入营的青年")
+        if self.db_path == ':memory:':
+            raise ValueError("内存数据库不能归档")
+        if self.archive_year is not None:
+            raise ValueError("请先切换回当前数据再归档")
+        
+        # 用本程序创建（或升级）归档库，保证结构与本库一致
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self.archive_path(year)
+        for writable in (False, True):
+            store = self._stores.pop((year, writable), None)
+            if store is not None:
+                store.connections.close_all()
+        DatabaseManager(path, blob_dir=self.blob_store.root, cache_bytes=0).close()
+        
+        conn = self.connections.raw_connection()
+        # ATTACH 不能在事务中执行
+        conn.execute(f"ATTACH DATABASE ? AS {archive.ARCHIVE_SCHEMA}", (path,))
+        try:
+            with self.transaction() as cursor:
+                self._prepare_deleting_youth(cursor)
+                cursor.execute(archive.SELECT_INTAKE_SQL, (f"{year:04d}",))
+                if cursor.rowcount <= 0:
+                    return 0
+                
+                tables = ['youth'] + [table_name for table_name, _, _ in self.YOUTH_DEPENDENTS]
+                source_columns = {}
+                target_columns = {}
+                for table_name in tables:
+                    cursor.execute(f"PRAGMA main.table_info({table_name})")
+                    source_columns[table_name] = [column[1] for column in cursor.fetchall()]
+                    cursor.execute(f"PRAGMA {archive.ARCHIVE_SCHEMA}.table_info({table_name})")
+                    target_columns[table_name] = [column[1] for column in cursor.fetchall()]
+                for sql in archive.copy_statements(self.YOUTH_DEPENDENTS, source_columns, target_columns):
+                    cursor.execute(sql)
+                return self._delete_youth_rows(cursor)
+        finally:
+            conn.execute(f"DETACH DATABASE {archive.ARCHIVE_SCHEMA}")
+    
+    def use_archive(self, year, writable=False):
+        """切换到 year 年的归档库，year 为 None 或没有归档时切换回本库
+        
+        切换后的查询作用于该库，归档库在第一次使用时才打开。归档库默认只读，
+        writable=True 时才允许修改。已提交的后台任务和用 using_store() 固定了库的线程
+        仍使用原来的库。返回是否正在使用归档库。
+        """
+        if year is not None and int(year) not in self.archived_years():
+            year = None
+        year = None if year is None else int(year)
+        key = (year, year is None or bool(writable))
+        if key not in self._stores:
+            self._stores[key] = self._open_archive_store(*key)
+        self._store = self._stores[key]
+        return year is not None
+    
+    def _open_archive_store(self, year, writable):
+        """打开归档库：按需迁移结构，同一年的只读库和可写库共用查询缓存"""
+        path = self.archive_path(year)
+        # 结构迁移和遗留的派生字段、异常统计标记用临时连接处理，只读库打开后不再写入
+        migrating = ConnectionManager(path)
+        try:
+            SchemaMigrator(migrating, self._schema_migrations()).migrate()
+            self._flush_pending_derived_data(migrating)
+            conn = migrating.acquire()
+            try:
+                rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE '%_fts'")
+                fulltext_tables = {row[0] for row in rows}
+            finally:
+                conn.close()
+        finally:
+            migrating.close_all()
+        
+        other = self._stores.get((year, not writable))
+        if other is not None:
+            query_cache = other.query_cache
+        else:
+            query_cache = QueryCache(self._stores[(None, True)].query_cache.max_bytes)
+        store = _Store(year, ConnectionManager(path), query_cache, writable)
+        store.fulltext_tables = fulltext_tables
+        self._install_store_hooks(store)
+        return store
+
+    # ==================== 多站点合并 ====================
+    
+    def merge_database(self, source_path, policy='newest', source_blob_dir=None):
+        """把其他站点的数据库按自然键合并到本库（做法见 database/merge.py）
+        
+        来源库只读打开，复制到临时目录后迁移升级副本，来源库文件和图片目录都不改动；
+        合并在一个事务中完成，之后复制来源库的图片文件（含旧版本内嵌在库中的图片）。
+        
+        Args:
+            policy: 冲突策略 newest / source / target
+            source_blob_dir: 来源库的图片目录，默认为来源库旁的 uploads/blobs
+        
+        Returns:
+            dict: {'tables': {表名: {'inserted': 新增数, 'updated': 更新数,
+                                      'kept': 冲突中保留本库的记录数, 'unchanged': 内容相同的记录数}},
+                   'conflicts': [{'source', 'table', 'key', 'winner', 'source_time', 'target_time'}]}
+        """
+        if policy not in merge.POLICIES:
+            raise ValueError(f"未知的冲突策略: {policy}")
+        if not os.path.exists(source_path):
+            raise ValueError(f"来源数据库不存在: {source_path}")
+        if self.db_path != ':memory:' and os.path.abspath(source_path) == os.path.abspath(self.db_path):
+            raise ValueError("来源数据库不能是本库")
+        
+        if source_blob_dir is None:
+            source_blob_dir = os.path.join(os.path.dirname(os.path.abspath(source_path)), UPLOAD_FOLDER, 'blobs')
+        
+        result = {'tables': {}, 'conflicts': []}
+        with tempfile.TemporaryDirectory() as work_dir:
+            copy_path = os.path.join(work_dir, 'source.db')
+            merge.copy_read_only(source_path, copy_path)
+            # 旧版本内嵌在库中的图片迁移时存到临时目录，合并成功后再复制
+            copy_blob_dir = os.path.join(work_dir, 'blobs')
+            DatabaseManager(copy_path, blob_dir=copy_blob_dir, cache_bytes=0).close()
+            
+            conn = self.connections.raw_connection()
+            # ATTACH 不能在事务中执行
+            conn.execute(f"ATTACH DATABASE ? AS {merge.SOURCE_SCHEMA}", (copy_path,))
+            try:
+                with self.transaction() as cursor:
+                    for sql in merge.CREATE_TEMP_TABLES_SQL:
+                        cursor.execute(sql)
+                    for table_name in merge.MERGE_TABLES:
+                        merged = self._merge_table(cursor, table_name, policy)
+                        if merged is None:
+                            continue
+                        counts, conflicts = merged
+                        result['tables'][table_name] = counts
+                        for key, winner, source_time, target_time in conflicts:
+                            result['conflicts'].append({
+                                'source': source_path, 'table': table_name, 'key': key, 'winner': winner,
+                                'source_time': source_time, 'target_time': target_time,
+                            })
+                    for sql in merge.DROP_TEMP_TABLES_SQL:
+                        cursor.execute(sql)
+            finally:
+                conn.execute(f"DETACH DATABASE {merge.SOURCE_SCHEMA}")
+            
+            for source_blob_store in (BlobStore(source_blob_dir), BlobStore(copy_blob_dir)):
+                for blob_hash in source_blob_store.iter_hashes():
+                    if not self.blob_store.exists(blob_hash):
+                        data = source_blob_store.get(blob_hash)
+                        if data is not None:
+                            self.blob_store.put(data)
+        return result
+    
+    def _merge_table(self, cursor, table_name, policy):
+        """合并一张表，返回 (计数, 冲突记录)；来源库没有该表时返回None"""
+        cursor.execute(f"PRAGMA {merge.SOURCE_SCHEMA}.table_info({table_name})")
+        source_columns = [column[1] for column in cursor.fetchall()]
+        if not source_columns:
+            return None
+        cursor.execute(f"PRAGMA main.table_info({table_name})")
+        target_columns = [column[1] for column in cursor.fetchall()]
+        columns = merge.merge_columns(table_name, source_columns, target_columns)
+        
+        for sql in merge.CLEAR_TEMP_TABLES_SQL:
+            cursor.execute(sql)
+        if policy == 'newest':
+            cursor.execute(merge.times_sql(merge.SOURCE_SCHEMA, 'src'), (table_name,))
+            cursor.execute(merge.times_sql('main', 'dst'), (table_name,))
+        for sql in merge.copy_rows_sql(table_name, columns, source_columns):
+            cursor.execute(sql)
+        cursor.execute(merge.pairs_sql(table_name, columns, policy))
+        
+        cursor.execute('''
+            SELECT COUNT(*), COALESCE(SUM(differs AND source_wins), 0),
+                   COALESCE(SUM(differs AND NOT source_wins), 0)
+            FROM temp.merge_pairs
+        ''')
+        matched, updated, kept = cursor.fetchone()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        row = cursor.fetchone()
+        start_seq = row[0] if row else 0
+        update_sql = merge.update_sql(table_name, columns)
+        if update_sql and updated:
+            cursor.execute(update_sql)
+        cursor.execute(merge.insert_sql(table_name, columns))
+        inserted = cursor.rowcount
+        if table_name == 'youth':
+            cursor.execute(merge.ASSIGN_YOUTH_ID_SQL)
+        cursor.execute(merge.LOG_TIMES_SQL, (start_seq, table_name))
+        
+        cursor.execute(merge.CONFLICTS_SQL)
+        conflicts = cursor.fetchall()
+        counts = {'inserted': inserted, 'updated': updated, 'kept': kept,
+                  'unchanged': matched - updated - kept}
+        return counts, conflicts
+
     # ==================== 异常统计视图相关方法 ====================
     
     def _create_exception_statistics_view_if_not_exists(self, cursor):
-        """创建异常统计视图（如果不存在）"""
+        """创建异常统计表、维护触发器以及兼容视图（如果不存在）"""
         try:
-            # 检查视图是否已存在
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='view' AND name='v_exception_statistics'")
-            if cursor.fetchone():
-                return  # 视图已存在，无需创建
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='exception_statistics'")
+            table_exists = cursor.fetchone() is not None
             
-            # 删除可能存在的旧视图
-            cursor.execute("DROP VIEW IF EXISTS v_exception_statistics")
+            cursor.execute(exception_statistics.CREATE_TABLE_SQL)
+            cursor.execute(exception_statistics.CREATE_DIRTY_TABLE_SQL)
+            cursor.execute(exception_statistics.CREATE_INDEX_SQL)
+            for _, trigger_sql in exception_statistics.build_trigger_sql():
+                cursor.execute(trigger_sql)
             
-            # 创建新的异常统计视图
-            cursor.execute('''
-                CREATE VIEW v_exception_statistics AS
-                WITH all_dates AS (
-                    -- 获取所有相关日期
-                    SELECT DISTINCT assessment_date as date FROM political_assessment WHERE assessment_date IS NOT NULL AND assessment_date != ''
-                    UNION
-                    SELECT DISTINCT screening_date as date FROM medical_screening WHERE screening_date IS NOT NULL AND screening_date != ''
-                    UNION
-                    SELECT DISTINCT district_date as date FROM physical_examination WHERE district_date IS NOT NULL AND district_date != ''
-                    UNION
-                    SELECT DISTINCT city_date as date FROM physical_examination WHERE city_date IS NOT NULL AND city_date != ''
-                    UNION
-                    SELECT DISTINCT special_date as date FROM physical_examination WHERE special_date IS NOT NULL AND special_date != ''
-                    UNION
-                    SELECT DISTINCT record_date as date FROM daily_stat WHERE record_date IS NOT NULL AND record_date != ''
-                    UNION
-                    SELECT DISTINCT interview_date as date FROM town_interview WHERE interview_date IS NOT NULL AND interview_date != ''
-                    UNION
-                    SELECT DISTINCT interview_date as date FROM leader_interview WHERE interview_date IS NOT NULL AND interview_date != ''
-                ),
-                exception_data AS (
-                    SELECT DISTINCT
-                        y.id_card,
-                        y.name,
-                        y.gender,
-                        y.company,
-                        y.platoon,
-                        y.squad,
-                        y.squad_leader,
-                        y.recruitment_place,
-                        dates.date,
-                        
-                        -- 思想异常判断（政治考核、镇街谈话、领导谈话、每日统计）
-                        CASE WHEN 
-                            EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card AND pa.assessment_date = dates.date AND pa.thoughts = '异常') OR
-                            EXISTS(SELECT 1 FROM town_interview ti WHERE ti.youth_id_card = y.id_card AND ti.interview_date = dates.date AND (ti.thoughts LIKE '%异常%' OR ti.thoughts LIKE '%问题%' OR ti.thoughts LIKE '%消极%' OR ti.thoughts LIKE '%抵触%' OR ti.thoughts LIKE '%不良%' OR ti.thoughts LIKE '%困难%' OR ti.thoughts LIKE '%担心%' OR ti.thoughts LIKE '%焦虑%' OR ti.thoughts LIKE '%抑郁%' OR ti.thoughts LIKE '%差%')) OR
-                            EXISTS(SELECT 1 FROM leader_interview li WHERE li.youth_id_card = y.id_card AND li.interview_date = dates.date AND (li.thoughts LIKE '%异常%' OR li.thoughts LIKE '%问题%' OR li.thoughts LIKE '%消极%' OR li.thoughts LIKE '%抵触%' OR li.thoughts LIKE '%不良%' OR li.thoughts LIKE '%困难%' OR li.thoughts LIKE '%担心%' OR li.thoughts LIKE '%焦虑%' OR li.thoughts LIKE '%抑郁%' OR li.thoughts LIKE '%差%')) OR
-                            EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND ds.mood IN ('异常', '差', '很差', '抑郁', '焦虑'))
-                        THEN '异常' ELSE '正常' END AS thought_status,
-                        
-                        -- 身体异常判断（病史筛查、体检、每日统计）
-                        CASE WHEN 
-                            EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card AND ms.screening_date = dates.date AND ms.physical_status = '异常') OR
-                            EXISTS(SELECT 1 FROM physical_examination pe WHERE pe.youth_id_card = y.id_card AND (pe.district_date = dates.date OR pe.city_date = dates.date OR pe.special_date = dates.date) AND pe.body_status = '异常') OR
-                            EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND ds.physical_condition IN ('异常', '差', '很差', '生病', '受伤'))
-                        THEN '异常' ELSE '正常' END AS body_status,
-                        
-                        -- 精神异常判断（病史筛查、政治考核、镇街谈话、领导谈话、每日统计）
-                        CASE WHEN 
-                            EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card AND ms.screening_date = dates.date AND ms.mental_status = '异常') OR
-                            EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card AND pa.assessment_date = dates.date AND pa.spirit = '异常') OR
-                            EXISTS(SELECT 1 FROM town_interview ti WHERE ti.youth_id_card = y.id_card AND ti.interview_date = dates.date AND (ti.spirit LIKE '%异常%' OR ti.spirit LIKE '%问题%' OR ti.spirit LIKE '%抑郁%' OR ti.spirit LIKE '%焦虑%' OR ti.spirit LIKE '%不良%' OR ti.spirit LIKE '%困难%' OR ti.spirit LIKE '%担心%' OR ti.spirit LIKE '%差%')) OR
-                            EXISTS(SELECT 1 FROM leader_interview li WHERE li.youth_id_card = y.id_card AND li.interview_date = dates.date AND (li.spirit LIKE '%异常%' OR li.spirit LIKE '%问题%' OR li.spirit LIKE '%抑郁%' OR li.spirit LIKE '%焦虑%' OR li.spirit LIKE '%不良%' OR li.spirit LIKE '%困难%' OR li.spirit LIKE '%担心%' OR li.spirit LIKE '%差%')) OR
-                            EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND ds.mental_state IN ('异常', '差', '很差', '抑郁', '焦虑', '紧张'))
-                        THEN '异常' ELSE '正常' END AS spirit_status,
-                        
-                        -- 训练异常判断（仅每日统计）
-                        CASE WHEN 
-                            EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND ds.training IN ('异常', '差', '很差', '不合格', '拒绝'))
-                        THEN '异常' ELSE '正常' END AS training_status,
-                        
-                        -- 管理异常判断（仅每日统计）
-                        CASE WHEN 
-                            EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND ds.management IN ('异常', '差', '很差', '违纪', '冲突'))
-                        THEN '异常' ELSE '正常' END AS management_status,
-                        
-                        -- 异常来源统计
-                        (
-                            SELECT GROUP_CONCAT(source, '、') FROM (
-                                SELECT '政治考核' as source WHERE EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card AND pa.assessment_date = dates.date AND (pa.thoughts = '异常' OR pa.spirit = '异常'))
-                                UNION ALL
-                                SELECT '病史筛查' as source WHERE EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card AND ms.screening_date = dates.date AND (ms.physical_status = '异常' OR ms.mental_status = '异常'))
-                                UNION ALL
-                                SELECT '体检' as source WHERE EXISTS(SELECT 1 FROM physical_examination pe WHERE pe.youth_id_card = y.id_card AND (pe.district_date = dates.date OR pe.city_date = dates.date OR pe.special_date = dates.date) AND pe.body_status = '异常')
-                                UNION ALL
-                                SELECT '每日统计' as source WHERE EXISTS(SELECT 1 FROM daily_stat ds JOIN youth y2 ON ds.youth_id = y2.id WHERE y2.id_card = y.id_card AND ds.record_date = dates.date AND (ds.mood IN ('异常', '差', '很差', '抑郁', '焦虑') OR ds.physical_condition IN ('异常', '差', '很差', '生病', '受伤') OR ds.mental_state IN ('异常', '差', '很差', '抑郁', '焦虑', '紧张') OR ds.training IN ('异常', '差', '很差', '不合格', '拒绝') OR ds.management IN ('异常', '差', '很差', '违纪', '冲突')))
-                                UNION ALL
-                                SELECT '镇街谈话' as source WHERE EXISTS(SELECT 1 FROM town_interview ti WHERE ti.youth_id_card = y.id_card AND ti.interview_date = dates.date AND (ti.thoughts LIKE '%异常%' OR ti.thoughts LIKE '%问题%' OR ti.thoughts LIKE '%消极%' OR ti.thoughts LIKE '%抵触%' OR ti.thoughts LIKE '%不良%' OR ti.thoughts LIKE '%困难%' OR ti.thoughts LIKE '%担心%' OR ti.thoughts LIKE '%焦虑%' OR ti.thoughts LIKE '%抑郁%' OR ti.thoughts LIKE '%差%' OR ti.spirit LIKE '%异常%' OR ti.spirit LIKE '%问题%' OR ti.spirit LIKE '%抑郁%' OR ti.spirit LIKE '%焦虑%' OR ti.spirit LIKE '%不良%' OR ti.spirit LIKE '%困难%' OR ti.spirit LIKE '%担心%' OR ti.spirit LIKE '%差%'))
-                                UNION ALL
-                                SELECT '领导谈话' as source WHERE EXISTS(SELECT 1 FROM leader_interview li WHERE li.youth_id_card = y.id_card AND li.interview_date = dates.date AND (li.thoughts LIKE '%异常%' OR li.thoughts LIKE '%问题%' OR li.thoughts LIKE '%消极%' OR li.thoughts LIKE '%抵触%' OR li.thoughts LIKE '%不良%' OR li.thoughts LIKE '%困难%' OR li.thoughts LIKE '%担心%' OR li.thoughts LIKE '%焦虑%' OR li.thoughts LIKE '%抑郁%' OR li.thoughts LIKE '%差%' OR li.spirit LIKE '%异常%' OR li.spirit LIKE '%问题%' OR li.spirit LIKE '%抑郁%' OR li.spirit LIKE '%焦虑%' OR li.spirit LIKE '%不良%' OR li.spirit LIKE '%困难%' OR li.spirit LIKE '%担心%' OR li.spirit LIKE '%差%'))
-                            )
-                        ) AS exception_sources
-                        
-                    FROM youth y
-                    CROSS JOIN all_dates dates
-                )
-                SELECT 
-                    id_card AS 公民身份号码,
-                    name AS 姓名,
-                    gender AS 性别,
-                    company AS 连,
-                    platoon AS 排,
-                    squad AS 班,
-                    squad_leader AS 带训班长,
-                    recruitment_place AS 应征地,
-                    thought_status AS 思想是否异常,
-                    body_status AS 身体是否异常,
-                    spirit_status AS 精神是否异常,
-                    training_status AS 训练是否异常,
-                    management_status AS 管理是否异常,
-                    exception_sources AS 其他,
-                    date AS 日期
-                FROM exception_data
-                WHERE 
-                    thought_status = '异常' OR 
-                    body_status = '异常' OR 
-                    spirit_status = '异常' OR 
-                    training_status = '异常' OR 
-                    management_status = '异常'
-                ORDER BY date DESC, name ASC
-            ''')
+            # 旧版本的视图直接在youth × 日期上计算，替换为基于统计表的视图
+            cursor.execute("SELECT sql FROM sqlite_master WHERE type='view' AND name='v_exception_statistics'")
+            view = cursor.fetchone()
+            if view is None or 'FROM exception_statistics' not in view[0]:
+                cursor.execute("DROP VIEW IF EXISTS v_exception_statistics")
+                cursor.execute(exception_statistics.CREATE_VIEW_SQL)
+            
+            if not table_exists:
+                # 首次创建：标记现有数据的全部单元格，第一次读取时计算
+                # （此时后续迁移添加的判定字段可能还不存在）
+                cursor.execute(exception_statistics.MARK_ALL_DIRTY_SQL)
             
         except Exception as e:
-            print(f"创建异常统计视图时出错: {e}")
+            print(f"创建异常统计表时出错: {e}")
+
+    def _flush_exception_statistics(self, cursor):
+        """重新计算被触发器标记的异常统计单元格，再重新汇总变化的日期"""
+        cursor.execute("SELECT 1 FROM exception_statistics_dirty LIMIT 1")
+        if cursor.fetchone() is not None:
+            cursor.execute(exception_statistics.DELETE_DIRTY_ROWS_SQL)
+            cursor.execute(exception_statistics.REFRESH_SQL)
+            cursor.execute("DELETE FROM exception_statistics_dirty")
+        
+        cursor.execute("SELECT 1 FROM exception_rollup_dirty LIMIT 1")
+        if cursor.fetchone() is not None:
+            for sql in exception_statistics.ROLLUP_REFRESH_SQL:
+                cursor.execute(sql)
+    
+    def _flush_before_commit(self, conn):
+        """在写入事务提交前计算本事务写入行的派生字段，再重新计算标记的异常统计单元格，
+        读取时不再需要写锁
+
+        出错时只回滚刷新本身，队列和标记保留，由下次提交或读取时重新计算。
+        """
+        cursor = conn.cursor()
+        cursor.execute("SAVEPOINT flush_derived_data")
+        try:
+            self._flush_derived_columns(cursor)
+            self._flush_exception_statistics(cursor)
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK TO flush_derived_data")
+            print(f"刷新派生字段和异常统计表时出错: {e}")
+        cursor.execute("RELEASE flush_derived_data")
+
+    def _exception_statistics_pending(self):
+        """是否有待重新计算的单元格或待重新汇总的日期"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            for table_name in ('exception_statistics_dirty', 'exception_rollup_dirty'):
+                if cursor.execute(f"SELECT 1 FROM {table_name} LIMIT 1").fetchone() is not None:
+                    return True
+            return False
+        finally:
+            conn.close()
+
+    def refresh_exception_statistics(self, full=False):
+        """刷新异常统计表
+        
+        本程序的写入在提交前已刷新，这里只处理其他程序写入或迁移后留下的标记：
+        没有标记时只做一次只读检查，不开启写入事务。
+        
+        Args:
+            full: True 时根据全部来源数据重建，否则只处理有变化的单元格
+        """
+        try:
+            if not full and not self._exception_statistics_pending():
+                return True
+
+            with self.transaction() as cursor:
+                if full:
+                    cursor.execute("DELETE FROM exception_statistics")
+                    cursor.execute(exception_statistics.MARK_ALL_DIRTY_SQL)
+                self._flush_exception_statistics(cursor)
+            return True
+        except Exception as e:
+            print(f"刷新异常统计表时出错: {e}")
+            return False
 
     def create_exception_statistics_view(self):
         """创建异常统计视图（保留此方法以兼容现有代码）"""
@@ -1996,54 +2577,32 @@ class DatabaseManager:
         conn.close()
 
     
-    def get_exception_statistics_view_data(self, start_date=None, end_date=None, name=None, id_card=None, recruitment_place=None, company=None, platoon=None, squad=None):
-        """查询异常统计视图数据"""
+    def get_exception_statistics_view_data(self, start_date=None, end_date=None, name=None, id_card=None, recruitment_place=None, company=None, platoon=None, squad=None,
+                                           page_size=None, after=None):
+        """查询异常统计数据（列顺序与 v_exception_statistics 视图一致）
+
+        page_size 不为 None 时分页返回 (本页结果, 下一页游标)，after 传入上一页的游标
+        """
+        self.refresh_exception_statistics()
+
+        where, params = self.build_where(
+            DateRange('e.date', start_date, end_date),
+            Contains('exception_statistics', 'e', 'name', name),
+            Contains('exception_statistics', 'e', 'id_card', id_card),
+            Contains('exception_statistics', 'e', 'recruitment_place', recruitment_place),
+            Contains('exception_statistics', 'e', 'company', company),
+            Contains('exception_statistics', 'e', 'platoon', platoon),
+            Contains('exception_statistics', 'e', 'squad', squad),
+        )
+
         conn = self.get_connection()
         cursor = conn.cursor()
-        
-        query = "SELECT * FROM v_exception_statistics WHERE 1=1"
-        params = []
-        
-        if start_date:
-            query += " AND 日期 >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND 日期 <= ?"
-            params.append(end_date)
-        
-        if name:
-            query += " AND 姓名 LIKE ?"
-            params.append(f'%{name}%')
-        
-        if id_card:
-            query += " AND 公民身份号码 LIKE ?"
-            params.append(f'%{id_card}%')
-        
-        if recruitment_place:
-            query += " AND 应征地 LIKE ?"
-            params.append(f'%{recruitment_place}%')
-        
-        if company:
-            query += " AND 连 LIKE ?"
-            params.append(f'%{company}%')
-        
-        if platoon:
-            query += " AND 排 LIKE ?"
-            params.append(f'%{platoon}%')
-        
-        if squad:
-            query += " AND 班 LIKE ?"
-            params.append(f'%{squad}%')
-            query += " AND 班 LIKE ?"
-            params.append(f'%{squad}%')
-        
-        query += " ORDER BY 日期 DESC, 姓名 ASC"
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
+
+        query = f"SELECT {exception_statistics.SELECT_COLUMNS} FROM exception_statistics e WHERE {where}"
+        results = fetch_page(cursor, query, params, self.EXCEPTION_STATISTICS_KEYSET, page_size, after,
+                             cache=self.query_cache, tables=('exception_statistics',))
         conn.close()
-        
+
         return results
     
     def get_medical_screening_by_id_card_and_date(self, id_card, date):
@@ -2156,38 +2715,143 @@ class DatabaseManager:
         return result
 
     def get_exception_statistics_summary(self, start_date=None, end_date=None):
-        """获取异常统计汇总数据"""
+        """获取异常统计汇总数据（各类异常数读取按日期、单位汇总的统计表）"""
+        self.refresh_exception_statistics()
+        where, params = self.build_where(DateRange('date', start_date, end_date))
+        
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = '''
+        # 涉及人数需跨日期去重，不能由每日汇总相加，按日期索引在统计表中计算
+        query = f'''
             SELECT 
-                COUNT(*) as 总记录数,
-                COUNT(CASE WHEN 思想是否异常 = '异常' THEN 1 END) as 思想异常数,
-                COUNT(CASE WHEN 身体是否异常 = '异常' THEN 1 END) as 身体异常数,
-                COUNT(CASE WHEN 精神是否异常 = '异常' THEN 1 END) as 精神异常数,
-                COUNT(CASE WHEN 训练是否异常 = '异常' THEN 1 END) as 训练异常数,
-                COUNT(CASE WHEN 管理是否异常 = '异常' THEN 1 END) as 管理异常数,
-                COUNT(DISTINCT 公民身份号码) as 涉及人数,
-                COUNT(DISTINCT 日期) as 涉及天数
-            FROM v_exception_statistics
-            WHERE 1=1
+                IFNULL(SUM(record_count), 0) as 总记录数,
+                IFNULL(SUM(thought_count), 0) as 思想异常数,
+                IFNULL(SUM(body_count), 0) as 身体异常数,
+                IFNULL(SUM(spirit_count), 0) as 精神异常数,
+                IFNULL(SUM(training_count), 0) as 训练异常数,
+                IFNULL(SUM(management_count), 0) as 管理异常数,
+                (SELECT COUNT(DISTINCT id_card) FROM exception_statistics WHERE {where}) as 涉及人数,
+                COUNT(DISTINCT date) as 涉及天数
+            FROM exception_rollup
+            WHERE {where}
         '''
-        params = []
+        result = self.query_cache.fetchall(cursor, query, params + params,
+                                           ('exception_rollup', 'exception_statistics'))[0]
+        conn.close()
         
-        if start_date:
-            query += " AND 日期 >= ?"
-            params.append(start_date)
+        return result
+    
+    # 汇总查询可用的分组字段
+    ROLLUP_GROUP_COLUMNS = ('date',) + exception_statistics.ROLLUP_UNIT_COLUMNS
+    
+    def get_exception_rollup(self, start_date=None, end_date=None, group_by=('date',),
+                             recruitment_place='', company='', platoon='', squad=''):
+        """按日期、单位读取异常汇总数，用于单位汇总和趋势图
         
-        if end_date:
-            query += " AND 日期 <= ?"
-            params.append(end_date)
+        Args:
+            group_by: 分组字段，取自 date、recruitment_place、company、platoon、squad
+            recruitment_place 等: 单位名称，为空表示不限（按名称相等匹配）
         
-        cursor.execute(query, params)
-        result = cursor.fetchone()
+        Returns:
+            [(分组字段..., 记录数, 思想异常数, 身体异常数, 精神异常数, 训练异常数, 管理异常数, 异常人次)]，
+            按分组字段排序
+        """
+        invalid = [column for column in group_by if column not in self.ROLLUP_GROUP_COLUMNS]
+        if invalid:
+            raise ValueError(f"不支持的汇总分组字段: {invalid}")
+        
+        self.refresh_exception_statistics()
+        where, params = self.build_where(
+            DateRange('date', start_date, end_date),
+            Equals('recruitment_place', recruitment_place),
+            Equals('company', company),
+            Equals('platoon', platoon),
+            Equals('squad', squad),
+        )
+        
+        # 按日期分组时以规范化日期排序
+        group_columns = ['date_iso' if column == 'date' else column for column in group_by]
+        counts = ', '.join(f"SUM({column})" for column in
+                           ('record_count',) + exception_statistics.ROLLUP_COUNT_COLUMNS + ('people_count',))
+        select = ', '.join(group_columns + [counts])
+        query = f"SELECT {select} FROM exception_rollup WHERE {where}"
+        if group_columns:
+            query += f" GROUP BY {', '.join(group_columns)} ORDER BY {', '.join(group_columns)}"
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        results = self.query_cache.fetchall(cursor, query, params, ('exception_rollup',))
         conn.close()
+        return results
+
+    def get_timeseries(self, id_cards, start_date, end_date, dimensions=None):
+        """多名青年按日期对齐的异常序列，一次查询，用于个人、班、连的趋势图
         
-        return result
+        Args:
+            id_cards: 身份证号列表，结果的行按此顺序排列
+            dimensions: 指标，取自 timeseries.DIMENSIONS（total、各异常状态、各异常来源），None 表示全部
+        
+        Returns:
+            (日期列表, {指标: 青年数 × 日期数的数组})，当天有异常为1，否则为0；
+            安装了 NumPy 时数组为 numpy.ndarray
+        """
+        dimensions = list(timeseries.DIMENSIONS if dimensions is None else dimensions)
+        invalid = [dimension for dimension in dimensions if dimension not in timeseries.DIMENSIONS]
+        if invalid:
+            raise ValueError(f"不支持的时间序列指标: {invalid}")
+        start_date, end_date = dates.normalize_range(start_date, end_date)
+        if not dates.normalize_date(start_date) or not dates.normalize_date(end_date):
+            raise ValueError(f"时间序列需要有效的起止日期: {start_date} - {end_date}")
+        
+        id_cards = list(id_cards)
+        axis = timeseries.date_axis(start_date, end_date)
+        rows = []
+        if id_cards and axis and dimensions:
+            self.refresh_exception_statistics()
+            where, params = self.build_where(DateRange('e.date', start_date, end_date))
+            query = timeseries.select_sql(dimensions, where)
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            rows = self.query_cache.fetchall(cursor, query, [timeseries.id_cards_param(id_cards)] + params,
+                                             ('exception_statistics',))
+            conn.close()
+        return axis, timeseries.dense_arrays(rows, len(id_cards), axis, dimensions)
+
+    def get_changes_since(self, since_seq=0, tables=None, latest_only=False, limit=None):
+        """读取序号 since_seq 之后的数据变更，用于增量导出、同步
+        
+        Args:
+            tables: 只读取这些表的变更，为空表示全部
+            latest_only: 每条记录只返回最后一次变更
+            limit: 最多返回的条数，分批读取时以最后一条的序号作为下一批的 since_seq
+        
+        Returns:
+            [(序号, 表名, rowid, 自然键, 操作, 时间)]，按序号排列
+        """
+        tables = list(tables or ())
+        query = changelog.changes_sql(tables, latest_only, limit)
+        params = [since_seq] + tables
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        results = self.query_cache.fetchall(cursor, query, params, ('change_log',))
+        conn.close()
+        return results
+
+    def get_latest_change_seq(self):
+        """当前最大的变更序号，没有变更时为0；全量导出时记下它作为之后增量读取的起点"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'")
+        result = cursor.fetchone()
+        conn.close()
+        return result[0] if result else 0
+
+    def prune_change_log(self, up_to_seq):
+        """删除序号不超过 up_to_seq 的变更日志（下游都已处理后使用），返回删除的条数"""
+        with self.transaction() as cursor:
+            cursor.execute("DELETE FROM change_log WHERE seq <= ?", (up_to_seq,))
+            return cursor.rowcount
 
     def sync_recruitment_fields_for_physical_examination(self):
         """同步体检情况统计表中所有记录的应征地、连、排、班、带训班长信息字段"""
@@ -2195,14 +2859,14 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
             
-            # 批量更新：从youth表获取应征地、连、排、班、带训班长信息并更新到physical_examination表
+            # 批量更新：每条记录用一个子查询从青年表取得应征地、连、排、班、带训班长
             cursor.execute('''
                 UPDATE physical_examination
-                SET recruitment_place = (SELECT recruitment_place FROM youth WHERE youth.id_card = physical_examination.youth_id_card),
-                    company = (SELECT company FROM youth WHERE youth.id_card = physical_examination.youth_id_card),
-                    platoon = (SELECT platoon FROM youth WHERE youth.id_card = physical_examination.youth_id_card),
-                    squad = (SELECT squad FROM youth WHERE youth.id_card = physical_examination.youth_id_card),
-                    squad_leader = (SELECT squad_leader FROM youth WHERE youth.id_card = physical_examination.youth_id_card)
+                SET (recruitment_place, company, platoon, squad, squad_leader) = (
+                    SELECT y.recruitment_place, y.company, y.platoon, y.squad, y.squad_leader
+                    FROM youth y
+                    WHERE y.id_card = physical_examination.youth_id_card
+                )
                 WHERE youth_id_card IN (SELECT id_card FROM youth)
             ''')
             
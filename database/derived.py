@@ -0,0 +1,71 @@
+"""
+派生字段的维护队列
+
+日期规范字段（dates）和谈话异常关键字判定（keywords）要用 Python 函数计算，
+这些函数只在本程序的连接上注册。数据库中的触发器只用SQL把新增、修改的行记入
+derived_dirty，不调用任何自定义函数，DB Browser、sqlite3 命令行、旧版本程序
+打开数据库也能正常写入。
+
+本程序在每个写入事务提交前按队列重新计算这些行的派生字段，打开数据库时
+再处理一次其他程序写入后留下的队列。同一事务中刚写入的行，提交前读到的
+派生字段还是旧值。
+"""
+from . import dates, keywords
+
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS derived_dirty (
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        PRIMARY KEY (table_name, row_id)
+    ) WITHOUT ROWID
+'''
+
+PENDING_TABLES_SQL = "SELECT DISTINCT table_name FROM derived_dirty"
+
+# 有派生字段的表
+TABLES = tuple(dates.DATE_COLUMNS) + tuple(
+    table for table in keywords.INTERVIEW_TABLES if table not in dates.DATE_COLUMNS)
+
+
+def source_columns(table, existing):
+    """(日期字段, 谈话内容字段)：只包含表中已有规范字段、判定字段的字段"""
+    date_columns = [column for column in dates.DATE_COLUMNS.get(table, ())
+                    if column in existing and dates.iso_column(column) in existing]
+    text_columns = []
+    if table in keywords.INTERVIEW_TABLES and all(
+            keywords.flag_column(column) in existing for column in keywords.TEXT_COLUMNS):
+        text_columns = list(keywords.TEXT_COLUMNS)
+    return date_columns, text_columns
+
+
+def drop_function_triggers_sql(table):
+    """迁移 5、8 创建的、调用自定义函数的触发器"""
+    return [f"DROP TRIGGER IF EXISTS trg_{table}_{kind}_{event}"
+            for kind in ('dates', 'keywords') for event in ('ins', 'upd')]
+
+
+def trigger_sql(table, date_columns, text_columns):
+    """新增记录、修改日期或谈话内容时把行记入队列（纯SQL）"""
+    enqueue = f"INSERT OR IGNORE INTO derived_dirty (table_name, row_id) VALUES ('{table}', NEW.rowid)"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_derived_ins AFTER INSERT ON {table} "
+        f"BEGIN {enqueue}; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_derived_upd "
+        f"AFTER UPDATE OF {', '.join(date_columns + text_columns)} ON {table} "
+        f"BEGIN {enqueue}; END",
+    ]
+
+
+def flush_sql(table, date_columns, text_columns):
+    """重新计算队列中该表各行的派生字段，再清除这些队列记录"""
+    assignments = []
+    if date_columns:
+        assignments.append(dates.assignments(date_columns))
+    if text_columns:
+        assignments.append(keywords.assignments())
+    return [
+        f"UPDATE {table} SET {', '.join(assignments)} "
+        f"WHERE rowid IN (SELECT row_id FROM derived_dirty WHERE table_name = '{table}')",
+        f"DELETE FROM derived_dirty WHERE table_name = '{table}'",
+    ]
@@ -0,0 +1,434 @@
+"""
+异常情况统计表的增量维护
+
+exception_statistics 表只保存存在异常的 (身份证号, 日期) 记录。
+各来源表上的触发器把受影响的 (身份证号, 日期) 写入 exception_statistics_dirty，
+读取前由 DatabaseManager 统一重新计算这些单元格，因此读取只是按日期的索引范围扫描。
+单元格按原始日期文本区分，date_iso 保存规范化后的日期，供范围筛选使用。
+
+exception_rollup 按 (日期, 应征地, 连, 排, 班) 汇总各类异常数，供汇总和趋势统计读取。
+exception_statistics 上的触发器把变化的日期写入 exception_rollup_dirty，
+刷新单元格后只重新汇总这些日期。
+"""
+from .dates import SQL_FUNCTION as NORMALIZE_DATE
+from .keywords import flag_column
+
+ABNORMAL = '异常'
+NORMAL = '正常'
+
+# 每日统计各字段判定为异常的取值
+DAILY_MOOD_VALUES = ('异常', '差', '很差', '抑郁', '焦虑')
+DAILY_PHYSICAL_VALUES = ('异常', '差', '很差', '生病', '受伤')
+DAILY_MENTAL_VALUES = ('异常', '差', '很差', '抑郁', '焦虑', '紧张')
+DAILY_TRAINING_VALUES = ('异常', '差', '很差', '不合格', '拒绝')
+DAILY_MANAGEMENT_VALUES = ('异常', '差', '很差', '违纪', '冲突')
+
+# 来源表：(表名, 身份证号表达式, 日期字段)；{row} 替换为 NEW/OLD
+SOURCE_TABLES = (
+    ('political_assessment', '{row}.youth_id_card', ('assessment_date',)),
+    ('medical_screening', '{row}.id_card', ('screening_date',)),
+    ('physical_examination', '{row}.youth_id_card', ('district_date', 'city_date', 'special_date')),
+    ('daily_stat', '(SELECT id_card FROM youth WHERE id = {row}.youth_id)', ('record_date',)),
+    ('town_interview', '{row}.youth_id_card', ('interview_date',)),
+    ('leader_interview', '{row}.youth_id_card', ('interview_date',)),
+)
+
+# 冗余保存的青年字段
+YOUTH_COLUMNS = ('name', 'gender', 'company', 'platoon', 'squad', 'squad_leader', 'recruitment_place')
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS exception_statistics (
+        id_card TEXT NOT NULL,
+        date TEXT NOT NULL,
+        date_iso TEXT,
+        name TEXT,
+        gender TEXT,
+        company TEXT,
+        platoon TEXT,
+        squad TEXT,
+        squad_leader TEXT,
+        recruitment_place TEXT,
+        thought_status TEXT,
+        body_status TEXT,
+        spirit_status TEXT,
+        training_status TEXT,
+        management_status TEXT,
+        exception_sources TEXT,
+        PRIMARY KEY (id_card, date)
+    )
+'''
+
+CREATE_DIRTY_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS exception_statistics_dirty (
+        id_card TEXT NOT NULL,
+        date TEXT NOT NULL,
+        PRIMARY KEY (id_card, date)
+    ) WITHOUT ROWID
+'''
+
+CREATE_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_exception_statistics_date
+    ON exception_statistics(date, name)
+'''
+
+CREATE_DATE_ISO_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_exception_statistics_date_iso
+    ON exception_statistics(date_iso)
+'''
+
+# 兼容旧代码的视图：列顺序与原 v_exception_statistics 一致
+CREATE_VIEW_SQL = '''
+    CREATE VIEW v_exception_statistics AS
+    SELECT
+        id_card AS 公民身份号码,
+        name AS 姓名,
+        gender AS 性别,
+        company AS 连,
+        platoon AS 排,
+        squad AS 班,
+        squad_leader AS 带训班长,
+        recruitment_place AS 应征地,
+        thought_status AS 思想是否异常,
+        body_status AS 身体是否异常,
+        spirit_status AS 精神是否异常,
+        training_status AS 训练是否异常,
+        management_status AS 管理是否异常,
+        exception_sources AS 其他,
+        date AS 日期
+    FROM exception_statistics
+'''
+
+STATUS_COLUMNS = ('thought_status', 'body_status', 'spirit_status', 'training_status', 'management_status')
+
+# 异常来源：来源表 -> exception_sources 中的名称
+SOURCE_LABELS = {
+    'political_assessment': '政治考核',
+    'medical_screening': '病史筛查',
+    'physical_examination': '体检',
+    'daily_stat': '每日统计',
+    'town_interview': '镇街谈话',
+    'leader_interview': '领导谈话',
+}
+
+# 汇总表的单位字段、各类异常数字段（与 STATUS_COLUMNS 一一对应）
+ROLLUP_UNIT_COLUMNS = ('recruitment_place', 'company', 'platoon', 'squad')
+ROLLUP_COUNT_COLUMNS = ('thought_count', 'body_count', 'spirit_count', 'training_count', 'management_count')
+
+CREATE_ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS exception_rollup (
+        date TEXT NOT NULL,
+        date_iso TEXT,
+        recruitment_place TEXT NOT NULL,
+        company TEXT NOT NULL,
+        platoon TEXT NOT NULL,
+        squad TEXT NOT NULL,
+        record_count INTEGER NOT NULL,
+        thought_count INTEGER NOT NULL,
+        body_count INTEGER NOT NULL,
+        spirit_count INTEGER NOT NULL,
+        training_count INTEGER NOT NULL,
+        management_count INTEGER NOT NULL,
+        people_count INTEGER NOT NULL,
+        PRIMARY KEY (date, recruitment_place, company, platoon, squad)
+    )
+'''
+
+CREATE_ROLLUP_DIRTY_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS exception_rollup_dirty (
+        date TEXT PRIMARY KEY
+    ) WITHOUT ROWID
+'''
+
+CREATE_ROLLUP_INDEX_SQL = '''
+    CREATE INDEX IF NOT EXISTS idx_exception_rollup_date_iso
+    ON exception_rollup(date_iso)
+'''
+
+MARK_ALL_ROLLUP_DIRTY_SQL = '''
+    INSERT OR IGNORE INTO exception_rollup_dirty (date)
+    SELECT DISTINCT date FROM exception_statistics
+'''
+
+
+def _build_rollup_refresh_sql():
+    units = ', '.join(f"IFNULL({column}, '')" for column in ROLLUP_UNIT_COLUMNS)
+    counts = ', '.join(f"SUM(CASE WHEN {column} = '{ABNORMAL}' THEN 1 ELSE 0 END)" for column in STATUS_COLUMNS)
+    dirty_dates = "SELECT date FROM exception_rollup_dirty"
+    return [
+        f"DELETE FROM exception_rollup WHERE date IN ({dirty_dates})",
+        f'''
+        INSERT INTO exception_rollup (
+            date, date_iso, {', '.join(ROLLUP_UNIT_COLUMNS)},
+            record_count, {', '.join(ROLLUP_COUNT_COLUMNS)}, people_count
+        )
+        SELECT date, MAX(date_iso), {units}, COUNT(*), {counts}, COUNT(DISTINCT id_card)
+        FROM exception_statistics
+        WHERE date IN ({dirty_dates})
+        GROUP BY date, {units}
+        ''',
+        "DELETE FROM exception_rollup_dirty",
+    ]
+
+
+# 重新汇总 exception_rollup_dirty 中的日期
+ROLLUP_REFRESH_SQL = _build_rollup_refresh_sql()
+
+_ROLLUP_NOT_MARKED = "NOT EXISTS (SELECT 1 FROM exception_rollup_dirty d WHERE d.date = {date})"
+
+
+def _mark_rollup_dirty(row):
+    return (f"INSERT OR IGNORE INTO exception_rollup_dirty (date) SELECT {row}.date "
+            f"WHERE {_ROLLUP_NOT_MARKED.format(date=f'{row}.date')};")
+
+
+def build_rollup_trigger_sql():
+    """返回 [(触发器名, CREATE TRIGGER语句)]：异常统计单元格变化时标记其日期"""
+    return [
+        ('trg_exception_statistics_rollup_ins', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_exception_statistics_rollup_ins AFTER INSERT ON exception_statistics
+            BEGIN
+            {_mark_rollup_dirty('NEW')}
+            END
+        '''),
+        ('trg_exception_statistics_rollup_upd', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_exception_statistics_rollup_upd AFTER UPDATE ON exception_statistics
+            BEGIN
+            {_mark_rollup_dirty('OLD')}
+            {_mark_rollup_dirty('NEW')}
+            END
+        '''),
+        ('trg_exception_statistics_rollup_del', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_exception_statistics_rollup_del AFTER DELETE ON exception_statistics
+            BEGIN
+            {_mark_rollup_dirty('OLD')}
+            END
+        '''),
+    ]
+
+
+SELECT_COLUMNS = '''
+    id_card, name, gender, company, platoon, squad, squad_leader, recruitment_place,
+    thought_status, body_status, spirit_status, training_status, management_status,
+    exception_sources, date
+'''
+
+
+def _sql_list(values):
+    return ', '.join(f"'{value}'" for value in values)
+
+
+def _flagged(alias, column):
+    """谈话内容写入时已判定的异常标记（见 keywords 模块）"""
+    return f"{alias}.{flag_column(column)} = 1"
+
+
+def _daily_exists(condition):
+    return (f"EXISTS(SELECT 1 FROM daily_stat ds WHERE ds.youth_id = y.id "
+            f"AND ds.record_date = c.date AND {condition})")
+
+
+def _interview_exists(table, alias, condition):
+    return (f"EXISTS(SELECT 1 FROM {table} {alias} WHERE {alias}.youth_id_card = y.id_card "
+            f"AND {alias}.interview_date = c.date AND {condition})")
+
+
+def _status(*conditions):
+    return f"CASE WHEN {' OR '.join(conditions)} THEN '{ABNORMAL}' ELSE '{NORMAL}' END"
+
+
+def _build_conditions():
+    political_thought = ("EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card "
+                         "AND pa.assessment_date = c.date AND pa.thoughts = '异常')")
+    political_spirit = ("EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card "
+                        "AND pa.assessment_date = c.date AND pa.spirit = '异常')")
+    political_any = ("EXISTS(SELECT 1 FROM political_assessment pa WHERE pa.youth_id_card = y.id_card "
+                     "AND pa.assessment_date = c.date AND (pa.thoughts = '异常' OR pa.spirit = '异常'))")
+    screening_physical = ("EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card "
+                          "AND ms.screening_date = c.date AND ms.physical_status = '异常')")
+    screening_mental = ("EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card "
+                        "AND ms.screening_date = c.date AND ms.mental_status = '异常')")
+    screening_any = ("EXISTS(SELECT 1 FROM medical_screening ms WHERE ms.id_card = y.id_card "
+                     "AND ms.screening_date = c.date AND (ms.physical_status = '异常' OR ms.mental_status = '异常'))")
+    examination_body = ("EXISTS(SELECT 1 FROM physical_examination pe WHERE pe.youth_id_card = y.id_card "
+                        "AND (pe.district_date = c.date OR pe.city_date = c.date OR pe.special_date = c.date) "
+                        "AND pe.body_status = '异常')")
+
+    daily_mood = _daily_exists(f"ds.mood IN ({_sql_list(DAILY_MOOD_VALUES)})")
+    daily_physical = _daily_exists(f"ds.physical_condition IN ({_sql_list(DAILY_PHYSICAL_VALUES)})")
+    daily_mental = _daily_exists(f"ds.mental_state IN ({_sql_list(DAILY_MENTAL_VALUES)})")
+    daily_training = _daily_exists(f"ds.training IN ({_sql_list(DAILY_TRAINING_VALUES)})")
+    daily_management = _daily_exists(f"ds.management IN ({_sql_list(DAILY_MANAGEMENT_VALUES)})")
+    daily_any = _daily_exists(
+        f"(ds.mood IN ({_sql_list(DAILY_MOOD_VALUES)}) "
+        f"OR ds.physical_condition IN ({_sql_list(DAILY_PHYSICAL_VALUES)}) "
+        f"OR ds.mental_state IN ({_sql_list(DAILY_MENTAL_VALUES)}) "
+        f"OR ds.training IN ({_sql_list(DAILY_TRAINING_VALUES)}) "
+        f"OR ds.management IN ({_sql_list(DAILY_MANAGEMENT_VALUES)}))")
+
+    town_thought = _interview_exists('town_interview', 'ti', _flagged('ti', 'thoughts'))
+    town_spirit = _interview_exists('town_interview', 'ti', _flagged('ti', 'spirit'))
+    town_any = _interview_exists(
+        'town_interview', 'ti', f"({_flagged('ti', 'thoughts')} OR {_flagged('ti', 'spirit')})")
+    leader_thought = _interview_exists('leader_interview', 'li', _flagged('li', 'thoughts'))
+    leader_spirit = _interview_exists('leader_interview', 'li', _flagged('li', 'spirit'))
+    leader_any = _interview_exists(
+        'leader_interview', 'li', f"({_flagged('li', 'thoughts')} OR {_flagged('li', 'spirit')})")
+
+    statuses = {
+        'thought_status': _status(political_thought, town_thought, leader_thought, daily_mood),
+        'body_status': _status(screening_physical, examination_body, daily_physical),
+        'spirit_status': _status(screening_mental, political_spirit, town_spirit, leader_spirit, daily_mental),
+        'training_status': _status(daily_training),
+        'management_status': _status(daily_management),
+    }
+    sources = (
+        (SOURCE_LABELS['political_assessment'], political_any),
+        (SOURCE_LABELS['medical_screening'], screening_any),
+        (SOURCE_LABELS['physical_examination'], examination_body),
+        (SOURCE_LABELS['daily_stat'], daily_any),
+        (SOURCE_LABELS['town_interview'], town_any),
+        (SOURCE_LABELS['leader_interview'], leader_any),
+    )
+    return statuses, sources
+
+
+def build_refresh_sql():
+    """重新计算 exception_statistics_dirty 中所有单元格的INSERT语句"""
+    statuses, sources = _build_conditions()
+    source_sql = '\n                UNION ALL\n'.join(
+        f"                SELECT '{label}' AS source WHERE {condition}" for label, condition in sources)
+    status_sql = ',\n'.join(f"            {expr} AS {column}" for column, expr in statuses.items())
+    abnormal_filter = ' OR '.join(f"{column} = '{ABNORMAL}'" for column in statuses)
+    return f'''
+        INSERT OR REPLACE INTO exception_statistics (
+            id_card, date, date_iso, {', '.join(YOUTH_COLUMNS)},
+            {', '.join(statuses)}, exception_sources
+        )
+        SELECT * FROM (
+            SELECT
+            y.id_card, c.date, {NORMALIZE_DATE}(c.date), {', '.join('y.' + column for column in YOUTH_COLUMNS)},
+{status_sql},
+            (SELECT GROUP_CONCAT(source, '、') FROM (
+{source_sql}
+            )) AS exception_sources
+            FROM exception_statistics_dirty c
+            JOIN youth y ON y.id_card = c.id_card
+        )
+        WHERE {abnormal_filter}
+    '''
+
+
+REFRESH_SQL = build_refresh_sql()
+
+DELETE_DIRTY_ROWS_SQL = '''
+    DELETE FROM exception_statistics
+    WHERE EXISTS (
+        SELECT 1 FROM exception_statistics_dirty c
+        WHERE c.id_card = exception_statistics.id_card AND c.date = exception_statistics.date
+    )
+'''
+
+
+def _source_pairs_sql(id_card_filter=None):
+    """来源表中所有 (身份证号, 日期) 组合；id_card_filter 为限定身份证号的SQL表达式"""
+    selects = []
+    for table, key_expr, date_columns in SOURCE_TABLES:
+        for date_column in date_columns:
+            if table == 'daily_stat':
+                key = 'y.id_card'
+                from_sql = 'daily_stat JOIN youth y ON daily_stat.youth_id = y.id'
+            else:
+                key = key_expr.format(row=table)
+                from_sql = table
+            where = f"{table}.{date_column} IS NOT NULL AND {table}.{date_column} != ''"
+            if id_card_filter:
+                where += f" AND {key} = {id_card_filter}"
+            selects.append(f"SELECT {key}, {table}.{date_column} FROM {from_sql} WHERE {where}")
+    return '\nUNION\n'.join(selects)
+
+
+MARK_ALL_DIRTY_SQL = f'''
+    INSERT OR IGNORE INTO exception_statistics_dirty (id_card, date)
+    {_source_pairs_sql()}
+'''
+
+
+# 触发器中的 OR IGNORE 会被外层 UPSERT 语句的冲突处理覆盖，
+# 因此写入前先排除已标记的单元格，不依赖 OR IGNORE
+_NOT_MARKED = ("NOT EXISTS (SELECT 1 FROM exception_statistics_dirty d "
+               "WHERE d.id_card = {key} AND d.date = {date})")
+
+
+def _mark_row_dirty(key_expr, date_columns, row):
+    key = key_expr.format(row=row)
+    statements = []
+    for date_column in date_columns:
+        date = f"{row}.{date_column}"
+        statements.append(
+            f"INSERT OR IGNORE INTO exception_statistics_dirty (id_card, date) "
+            f"SELECT {key}, {date} WHERE {key} IS NOT NULL AND {date} IS NOT NULL AND {date} != '' "
+            f"AND {_NOT_MARKED.format(key=key, date=date)};")
+    return '\n            '.join(statements)
+
+
+def _mark_youth_dirty(row):
+    return (f"INSERT OR IGNORE INTO exception_statistics_dirty (id_card, date) "
+            f"SELECT id_card, date FROM ("
+            f"SELECT id_card, date FROM exception_statistics WHERE id_card = {row}.id_card "
+            f"UNION {_source_pairs_sql(f'{row}.id_card')}) p "
+            f"WHERE {_NOT_MARKED.format(key='p.id_card', date='p.date')};")
+
+
+def build_trigger_sql():
+    """返回 [(触发器名, CREATE TRIGGER语句)]"""
+    triggers = []
+    for table, key_expr, date_columns in SOURCE_TABLES:
+        triggers.append((f'trg_{table}_exception_ins', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_exception_ins AFTER INSERT ON {table}
+            BEGIN
+            {_mark_row_dirty(key_expr, date_columns, 'NEW')}
+            END
+        '''))
+        triggers.append((f'trg_{table}_exception_upd', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_exception_upd AFTER UPDATE ON {table}
+            BEGIN
+            {_mark_row_dirty(key_expr, date_columns, 'OLD')}
+            {_mark_row_dirty(key_expr, date_columns, 'NEW')}
+            END
+        '''))
+        triggers.append((f'trg_{table}_exception_del', f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_exception_del AFTER DELETE ON {table}
+            BEGIN
+            {_mark_row_dirty(key_expr, date_columns, 'OLD')}
+            END
+        '''))
+
+    # 青年信息变化：显示字段直接同步，身份变化则重新计算该青年的全部日期
+    set_sql = ', '.join(f"{column} = NEW.{column}" for column in YOUTH_COLUMNS)
+    triggers.append(('trg_youth_exception_info', f'''
+        CREATE TRIGGER IF NOT EXISTS trg_youth_exception_info
+        AFTER UPDATE OF {', '.join(YOUTH_COLUMNS)} ON youth
+        BEGIN
+            UPDATE exception_statistics SET {set_sql} WHERE id_card = NEW.id_card;
+        END
+    '''))
+    triggers.append(('trg_youth_exception_ins', f'''
+        CREATE TRIGGER IF NOT EXISTS trg_youth_exception_ins AFTER INSERT ON youth
+        BEGIN
+            {_mark_youth_dirty('NEW')}
+        END
+    '''))
+    triggers.append(('trg_youth_exception_key', f'''
+        CREATE TRIGGER IF NOT EXISTS trg_youth_exception_key AFTER UPDATE OF id, id_card ON youth
+        BEGIN
+            {_mark_youth_dirty('OLD')}
+            {_mark_youth_dirty('NEW')}
+        END
+    '''))
+    triggers.append(('trg_youth_exception_del', '''
+        CREATE TRIGGER IF NOT EXISTS trg_youth_exception_del AFTER DELETE ON youth
+        BEGIN
+            DELETE FROM exception_statistics WHERE id_card = OLD.id_card;
+        END
+    '''))
+    return triggers
@@ -0,0 +1,125 @@
+"""
+全文检索索引（FTS5 trigram）
+
+为姓名、身份证号、学校、地址、单位以及谈话内容建立外部内容FTS5索引，
+由触发器与原表保持同步。trigram 分词支持任意位置的子串匹配，
+但检索词至少需要3个字符，更短的检索词仍回退到 LIKE。
+"""
+import sqlite3
+
+
+# 可以使用索引的最短检索词长度（trigram）
+MIN_TERM_LENGTH = 3
+
+
+class FullTextIndex:
+    """一个外部内容FTS5索引的定义"""
+
+    def __init__(self, name, table, rowid, columns):
+        self.name = name
+        self.table = table
+        self.rowid = rowid
+        self.columns = columns
+
+    def create_sql(self):
+        return (f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5("
+                f"{', '.join(self.columns)}, content='{self.table}', "
+                f"content_rowid='{self.rowid}', tokenize='trigram')")
+
+    def trigger_sql(self):
+        columns = ', '.join(self.columns)
+        new_values = ', '.join(f'NEW.{column}' for column in self.columns)
+        old_values = ', '.join(f'OLD.{column}' for column in self.columns)
+        insert = (f"INSERT INTO {self.name} (rowid, {columns}) "
+                  f"VALUES (NEW.{self.rowid}, {new_values});")
+        delete = (f"INSERT INTO {self.name} ({self.name}, rowid, {columns}) "
+                  f"VALUES ('delete', OLD.{self.rowid}, {old_values});")
+        return [
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.name}_ins AFTER INSERT ON {self.table} "
+            f"BEGIN {insert} END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.name}_del AFTER DELETE ON {self.table} "
+            f"BEGIN {delete} END",
+            f"CREATE TRIGGER IF NOT EXISTS trg_{self.name}_upd AFTER UPDATE OF {columns} ON {self.table} "
+            f"BEGIN {delete} {insert} END",
+        ]
+
+    def drop_sql(self):
+        return [
+            f"DROP TRIGGER IF EXISTS trg_{self.name}_ins",
+            f"DROP TRIGGER IF EXISTS trg_{self.name}_del",
+            f"DROP TRIGGER IF EXISTS trg_{self.name}_upd",
+            f"DROP TABLE IF EXISTS {self.name}",
+        ]
+
+    def rebuild_sql(self):
+        return f"INSERT INTO {self.name} ({self.name}) VALUES ('rebuild')"
+
+
+FULLTEXT_INDEXES = {
+    'youth': FullTextIndex('youth_fts', 'youth', 'rowid', (
+        'name', 'id_card', 'school', 'phone', 'personal_phone',
+        'household_address', 'residence_address', 'district', 'street',
+        'recruitment_place', 'company', 'platoon', 'squad',
+    )),
+    'town_interview': FullTextIndex('town_interview_fts', 'town_interview', 'id', (
+        'youth_name', 'youth_id_card', 'thoughts', 'spirit',
+    )),
+    'leader_interview': FullTextIndex('leader_interview_fts', 'leader_interview', 'id', (
+        'youth_name', 'youth_id_card', 'thoughts', 'spirit',
+    )),
+    'visit_survey': FullTextIndex('visit_survey_fts', 'visit_survey', 'id', (
+        'youth_name', 'youth_id_card',
+    )),
+    'medical_screening': FullTextIndex('medical_screening_fts', 'medical_screening', 'id', (
+        'name', 'id_card',
+    )),
+    'physical_examination': FullTextIndex('physical_examination_fts', 'physical_examination', 'id', (
+        'name', 'youth_id_card',
+    )),
+}
+
+
+def trigram_supported(cursor):
+    """当前SQLite是否支持 FTS5 trigram 分词（SQLite 3.34+）"""
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+        cursor.execute("DROP TABLE temp.fts_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_filter(index, alias, terms, enabled=True):
+    """生成子串检索条件
+
+    Args:
+        index: FullTextIndex
+        alias: 原表在查询中的别名
+        terms: [(字段名或字段名元组, 检索词)]，空检索词会被忽略
+        enabled: 索引是否可用，不可用时全部使用 LIKE
+
+    Returns:
+        (SQL条件片段列表, 参数列表)
+    """
+    conditions = []
+    params = []
+    match_terms = []
+    for column, term in terms:
+        if not term:
+            continue
+        # 字段可以是元组，表示在任一字段中匹配
+        columns = column if isinstance(column, tuple) else (column,)
+        if enabled and set(columns) <= set(index.columns) and len(term) >= MIN_TERM_LENGTH:
+            match_terms.append(f"{{{' '.join(columns)}}} : {_phrase(term)}")
+        else:
+            likes = [f"{alias}.{name} LIKE ?" for name in columns]
+            conditions.append(likes[0] if len(likes) == 1 else f"({' OR '.join(likes)})")
+            params.extend([f'%{term}%'] * len(likes))
+    if match_terms:
+        conditions.insert(0, f"{alias}.{index.rowid} IN (SELECT rowid FROM {index.name} WHERE {index.name} MATCH ?)")
+        params.insert(0, ' AND '.join(match_terms))
+    return conditions, params
@@ -0,0 +1,149 @@
+"""
+谈话内容异常关键字
+
+镇街、领导谈心谈话记录的思想、精神内容包含异常关键字时判定为异常。
+判定在写入时完成：本程序在提交前调用 anomaly_keywords() 函数（见 database/derived.py），
+用多模式匹配（Aho-Corasick）一次扫描文本，把命中的关键字和标记保存在
+<字段>_keywords、<字段>_flag 中，异常统计直接读取标记。
+
+关键字调整后用以下命令重新判定已有记录：
+    python -m database.keywords [数据库路径]
+"""
+import sqlite3
+import sys
+from collections import deque
+
+
+SQL_FUNCTION = 'anomaly_keywords'
+SEPARATOR = '、'
+
+# 谈话记录中判定为异常的关键字
+THOUGHT_KEYWORDS = ('异常', '问题', '消极', '抵触', '不良', '困难', '担心', '焦虑', '抑郁', '差')
+SPIRIT_KEYWORDS = ('异常', '问题', '抑郁', '焦虑', '不良', '困难', '担心', '差')
+
+# 需要判定的表及字段：字段 -> 关键字
+INTERVIEW_TABLES = ('town_interview', 'leader_interview')
+TEXT_COLUMNS = {
+    'thoughts': ('thought', THOUGHT_KEYWORDS),
+    'spirit': ('spirit', SPIRIT_KEYWORDS),
+}
+
+
+class KeywordMatcher:
+    """多关键字匹配器（Aho-Corasick），一次扫描找出文本中出现的全部关键字"""
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        # 每个节点：子节点 {字符: 节点号}、失败指针、在此结束的关键字序号
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        for index, keyword in enumerate(self.keywords):
+            node = 0
+            for char in keyword:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._output[node].add(index)
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def find(self, text):
+        """返回文本中出现的关键字，按关键字表的顺序排列"""
+        if not text:
+            return []
+        found = set()
+        node = 0
+        for char in str(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            found |= self._output[node]
+        return [self.keywords[index] for index in sorted(found)]
+
+
+MATCHERS = {kind: KeywordMatcher(keywords) for kind, keywords in TEXT_COLUMNS.values()}
+
+
+def anomaly_keywords(kind, text):
+    """命中的关键字（以顿号连接），没有命中时返回None"""
+    found = MATCHERS[kind].find(text)
+    return SEPARATOR.join(found) if found else None
+
+
+def keywords_column(column):
+    return f"{TEXT_COLUMNS[column][0]}_keywords"
+
+
+def flag_column(column):
+    return f"{TEXT_COLUMNS[column][0]}_flag"
+
+
+def register(conn):
+    """在连接上注册 anomaly_keywords() SQL函数"""
+    try:
+        conn.create_function(SQL_FUNCTION, 2, anomaly_keywords, deterministic=True)
+    except (sqlite3.NotSupportedError, TypeError):
+        # SQLite 3.8.3 以下不支持 deterministic
+        conn.create_function(SQL_FUNCTION, 2, anomaly_keywords)
+
+
+def assignments(row=''):
+    parts = []
+    for column, (kind, _) in TEXT_COLUMNS.items():
+        matched = f"{SQL_FUNCTION}('{kind}', {row}{column})"
+        parts.append(f"{keywords_column(column)} = {matched}")
+        parts.append(f"{flag_column(column)} = ({matched} IS NOT NULL)")
+    return ', '.join(parts)
+
+
+def trigger_sql(table):
+    """判定结果的维护触发器：插入时判定，修改谈话内容时重新判定
+
+    （迁移 8 使用；迁移 12 起改由 derived 模块的队列维护，这些触发器已删除）
+    """
+    updates = assignments('NEW.')
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_keywords_ins AFTER INSERT ON {table} "
+        f"BEGIN UPDATE {table} SET {updates} WHERE rowid = NEW.rowid; END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_{table}_keywords_upd AFTER UPDATE OF {', '.join(TEXT_COLUMNS)} ON {table} "
+        f"BEGIN UPDATE {table} SET {updates} WHERE rowid = NEW.rowid; END",
+    ]
+
+
+def backfill_sql(table):
+    """重新判定表中全部记录（只更新结果有变化的行）"""
+    changed = ' OR '.join(
+        f"{keywords_column(column)} IS NOT {SQL_FUNCTION}('{kind}', {column})"
+        for column, (kind, _) in TEXT_COLUMNS.items())
+    return f"UPDATE {table} SET {assignments('')} WHERE {changed} OR {flag_column('thoughts')} IS NULL"
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+
+    argv = sys.argv[1:] if argv is None else argv
+    db_manager = DatabaseManager(argv[0] if argv else 'youth_records.db')
+    counts = db_manager.reclassify_interview_keywords()
+    for table, count in counts.items():
+        print(f"{table}: 重新判定 {count} 条记录")
+    db_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+多站点数据库合并
+
+把其他站点的数据库复制一份只读副本，迁移升级后 ATTACH 为 src，按自然键（changelog.TRACKED_TABLES）逐表合并到本库，
+每张表只执行几条集合SQL：
+1. 来源记录（同一个键有多条时取最后写入的一条）复制到临时表 merge_rows，
+   daily_stat.youth_id 按身份证号换算为本库的青年 id
+2. 与本库键相同的记录写入 merge_pairs，内容不同的按冲突策略决定保留哪一方
+3. 按 merge_pairs 更新本库记录，再插入本库没有的记录
+
+冲突策略：
+    newest  以最后修改时间较新的一方为准（取自变更日志，没有时取 created_at；
+            两边都没有时间时保留本库）。合并写入的变更日志沿用来源记录的修改时间，
+            再合并其他站点时比较的仍是数据实际修改的时间
+    source  以来源库为准
+    target  以本库为准；多个来源库按优先级从高到低依次合并即为来源优先
+合并只新增和更新记录，不删除本库已有的记录；users 账户表不合并。
+
+用法：
+    python -m database.merge 目标数据库 来源数据库... [--policy newest] [--report 冲突报告.csv]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from urllib.request import pathname2url
+
+from . import changelog
+
+
+POLICIES = ('newest', 'source', 'target')
+SOURCE_SCHEMA = 'src'
+
+# 先合并青年，其他表引用的青年 id 才能换算
+MERGE_TABLES = ('youth',) + tuple(table for table in changelog.TRACKED_TABLES if table != 'youth')
+
+# 来源库中引用青年 id 的字段：表名 -> {字段: 换算为本库 id 的表达式}
+MAPPED_COLUMNS = {
+    'daily_stat': {
+        'youth_id': (f"(SELECT ty.id FROM main.youth ty JOIN {SOURCE_SCHEMA}.youth sy "
+                     f"ON sy.id_card = ty.id_card WHERE sy.id = s.youth_id)"),
+    },
+}
+
+# 不参与比较和更新的字段：各站点写入时间不同，只在新增记录时复制
+INSERT_ONLY_COLUMNS = ('created_at',)
+
+CREATE_TEMP_TABLES_SQL = [
+    "CREATE TEMP TABLE IF NOT EXISTS merge_src_times (row_id INTEGER PRIMARY KEY, changed_at TEXT)",
+    "CREATE TEMP TABLE IF NOT EXISTS merge_dst_times (row_id INTEGER PRIMARY KEY, changed_at TEXT)",
+    '''CREATE TEMP TABLE IF NOT EXISTS merge_pairs (
+        dst_rowid INTEGER PRIMARY KEY,
+        src_rowid INTEGER NOT NULL,
+        differs INTEGER NOT NULL,
+        source_wins INTEGER NOT NULL,
+        natural_key TEXT,
+        source_time TEXT,
+        target_time TEXT
+    )''',
+]
+
+CLEAR_TEMP_TABLES_SQL = [
+    "DROP TABLE IF EXISTS temp.merge_rows",
+    "DELETE FROM temp.merge_src_times",
+    "DELETE FROM temp.merge_dst_times",
+    "DELETE FROM temp.merge_pairs",
+]
+
+DROP_TEMP_TABLES_SQL = [
+    "DROP TABLE IF EXISTS temp.merge_rows",
+    "DROP TABLE IF EXISTS temp.merge_src_times",
+    "DROP TABLE IF EXISTS temp.merge_dst_times",
+    "DROP TABLE IF EXISTS temp.merge_pairs",
+]
+
+# 新合并的青年没有 id：接在本库最大 id 之后
+ASSIGN_YOUTH_ID_SQL = ("UPDATE main.youth SET id = (SELECT COALESCE(MAX(id), 0) FROM main.youth) + rowid "
+                       "WHERE id IS NULL")
+
+
+def merge_columns(table, source_columns, target_columns):
+    """两边都有的数据字段（不含自增 id 和派生字段）"""
+    derived = changelog.derived_columns(table)
+    return [column for column in target_columns
+            if column in source_columns and column != 'id' and column not in derived]
+
+
+def _key_match(table, left, right):
+    return ' AND '.join(f"{left}.{column} IS {right}.{column}" for column in changelog.TRACKED_TABLES[table])
+
+
+def times_sql(schema, side):
+    """各记录最后修改时间（参数为表名）"""
+    return (f"INSERT INTO temp.merge_{side}_times (row_id, changed_at) "
+            f"SELECT row_id, MAX(changed_at) FROM {schema}.change_log WHERE table_name = ? GROUP BY row_id")
+
+
+def _time_expr(alias, times_alias, columns):
+    if 'created_at' in columns:
+        return f"COALESCE({times_alias}.changed_at, {alias}.created_at)"
+    return f"{times_alias}.changed_at"
+
+
+def copy_rows_sql(table, columns, source_columns):
+    """把来源记录复制到 merge_rows，同一个键只取最后写入的一条，键无法换算的记录跳过"""
+    keys = changelog.TRACKED_TABLES[table]
+    mapped = MAPPED_COLUMNS.get(table, {})
+    selects = [f"{mapped.get(column, f's.{column}')} AS {column}" for column in columns]
+    conditions = [f"s.rowid IN (SELECT MAX(rowid) FROM {SOURCE_SCHEMA}.{table} GROUP BY {', '.join(keys)})"]
+    conditions.extend(f"{mapped[column]} IS NOT NULL" for column in keys if column in mapped)
+    return [
+        f"CREATE TEMP TABLE merge_rows AS "
+        f"SELECT s.rowid AS src_rowid, {', '.join(selects)}, "
+        f"{_time_expr('s', 'st', source_columns)} AS changed_at, NULL AS natural_key "
+        f"FROM {SOURCE_SCHEMA}.{table} s LEFT JOIN temp.merge_src_times st ON st.row_id = s.rowid "
+        f"WHERE {' AND '.join(conditions)}",
+        f"UPDATE temp.merge_rows SET natural_key = {changelog.key_sql(table, 'merge_rows')}",
+        f"CREATE INDEX temp.idx_merge_rows_key ON merge_rows({', '.join(keys)})",
+        "CREATE INDEX temp.idx_merge_rows_natural_key ON merge_rows(natural_key)",
+    ]
+
+
+def pairs_sql(table, columns, policy):
+    """本库中键相同的记录及冲突判定"""
+    compared = [column for column in columns
+                if column not in changelog.TRACKED_TABLES[table] and column not in INSERT_ONLY_COLUMNS]
+    differs = ' OR '.join(f"t.{column} IS NOT m.{column}" for column in compared) or '0'
+    target_time = _time_expr('t', 'dt', columns)
+    if policy == 'newest':
+        source_wins = f"COALESCE(m.changed_at > {target_time}, m.changed_at IS NOT NULL AND {target_time} IS NULL)"
+    else:
+        source_wins = '1' if policy == 'source' else '0'
+    return (f"INSERT OR IGNORE INTO temp.merge_pairs "
+            f"(dst_rowid, src_rowid, differs, source_wins, natural_key, source_time, target_time) "
+            f"SELECT t.rowid, m.src_rowid, ({differs}), ({source_wins}), "
+            f"m.natural_key, m.changed_at, {target_time} "
+            f"FROM main.{table} t JOIN temp.merge_rows m ON {_key_match(table, 't', 'm')} "
+            f"LEFT JOIN temp.merge_dst_times dt ON dt.row_id = t.rowid")
+
+
+def update_sql(table, columns):
+    """用来源记录覆盖冲突中来源方胜出的本库记录"""
+    updates = [column for column in columns
+               if column not in changelog.TRACKED_TABLES[table] and column not in INSERT_ONLY_COLUMNS]
+    if not updates:
+        return None
+    select = (f"SELECT {', '.join(f'm.{column}' for column in updates)} FROM temp.merge_rows m "
+              f"JOIN temp.merge_pairs p ON p.src_rowid = m.src_rowid WHERE p.dst_rowid = {table}.rowid")
+    target = updates[0] if len(updates) == 1 else f"({', '.join(updates)})"
+    return (f"UPDATE main.{table} SET {target} = ({select}) "
+            f"WHERE rowid IN (SELECT dst_rowid FROM temp.merge_pairs WHERE differs AND source_wins)")
+
+
+def insert_sql(table, columns):
+    """插入本库中没有对应键的来源记录"""
+    names = ', '.join(columns)
+    return (f"INSERT INTO main.{table} ({names}) "
+            f"SELECT {', '.join(f'm.{column}' for column in columns)} FROM temp.merge_rows m "
+            f"WHERE m.src_rowid NOT IN (SELECT src_rowid FROM temp.merge_pairs) ORDER BY m.src_rowid")
+
+
+# 本次合并写入的变更日志改用来源记录的修改时间（参数为合并前的最大序号、表名）
+LOG_TIMES_SQL = '''
+    UPDATE main.change_log
+    SET changed_at = (SELECT m.changed_at FROM temp.merge_rows m WHERE m.natural_key = change_log.natural_key)
+    WHERE seq > ? AND table_name = ? AND EXISTS (
+        SELECT 1 FROM temp.merge_rows m
+        WHERE m.natural_key = change_log.natural_key AND m.changed_at IS NOT NULL
+    )
+'''
+
+CONFLICTS_SQL = ("SELECT natural_key, CASE WHEN source_wins THEN 'source' ELSE 'target' END, "
+                 "source_time, target_time FROM temp.merge_pairs WHERE differs ORDER BY natural_key")
+
+
+def copy_read_only(source_path, target_path):
+    """以只读方式打开来源库，用在线备份接口复制到 target_path（含 -wal 中的内容，来源库文件不改动）"""
+    uri = f"file:{pathname2url(os.path.abspath(source_path))}?mode=ro"
+    # 没有 -wal 文件时库文件本身就是完整的；按不可变打开，WAL 模式的库也不会新建 -wal、-shm 文件
+    if not os.path.exists(source_path + '-wal'):
+        uri += '&immutable=1'
+    src = sqlite3.connect(uri, uri=True)
+    dst = sqlite3.connect(target_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+REPORT_HEADER = ('来源数据库', '表', '自然键', '保留', '来源修改时间', '本库修改时间')
+
+
+def write_report(path, conflicts):
+    """把冲突记录写入 CSV（Excel 可直接打开）"""
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADER)
+        for conflict in conflicts:
+            writer.writerow([conflict[column] for column in
+                             ('source', 'table', 'key', 'winner', 'source_time', 'target_time')])
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(prog='python -m database.merge', description='合并多个站点的数据库')
+    parser.add_argument('target', help='目标数据库')
+    parser.add_argument('sources', nargs='+', help='来源数据库，按优先级从高到低排列')
+    parser.add_argument('--policy', choices=POLICIES, default='newest', help='冲突策略')
+    parser.add_argument('--report', help='冲突报告 CSV 文件')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    db_manager = DatabaseManager(args.target)
+    conflicts = []
+    for source in args.sources:
+        result = db_manager.merge_database(source, args.policy)
+        for table, counts in result['tables'].items():
+            if any(counts.values()):
+                print(f"{source} {table}: 新增 {counts['inserted']}，更新 {counts['updated']}，"
+                      f"保留本库 {counts['kept']}，相同 {counts['unchanged']}")
+        conflicts.extend(result['conflicts'])
+    print(f"共 {len(conflicts)} 条冲突记录")
+    if args.report:
+        write_report(args.report, conflicts)
+        print(f"冲突报告已写入 {args.report}")
+    db_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+数据库结构版本迁移
+
+schema_version 表记录已执行的迁移版本。启动时只读取一次当前版本，
+已是最新版本则不再做任何表结构检查；否则按版本顺序执行尚未执行的迁移，
+每个迁移在独立事务中执行，失败时整体回滚。
+"""
+import sqlite3
+
+
+CREATE_VERSION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+
+class SchemaMigrator:
+    """按版本顺序执行迁移步骤
+
+    steps 为 [(版本号, 说明, 函数(cursor))]，版本号必须递增。
+    迁移函数应当是幂等的，以便兼容没有版本记录的旧数据库。
+    """
+
+    def __init__(self, connections, steps):
+        versions = [version for version, _, _ in steps]
+        if versions != sorted(set(versions)):
+            raise ValueError("迁移版本号必须唯一且递增")
+        self.connections = connections
+        self.steps = steps
+
+    @property
+    def latest_version(self):
+        return self.steps[-1][0] if self.steps else 0
+
+    def current_version(self):
+        conn = self.connections.acquire()
+        try:
+            row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+            return row[0] or 0
+        except sqlite3.OperationalError:
+            # 旧数据库没有版本表
+            return 0
+        finally:
+            conn.close()
+
+    def pending_steps(self):
+        current = self.current_version()
+        return [step for step in self.steps if step[0] > current]
+
+    def migrate(self):
+        """执行所有未执行的迁移，返回执行的版本号列表"""
+        applied = []
+        for version, description, step in self.pending_steps():
+            with self.connections.transaction() as cursor:
+                cursor.execute(CREATE_VERSION_TABLE_SQL)
+                step(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+            print(f"数据库已迁移到版本 {version}: {description}")
+            applied.append(version)
+        return applied
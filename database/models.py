@@ -1,9 +1,87 @@
 """
 数据模型定义
+
+各模型的字段保存在 __slots__ 中，对象不带 __dict__，大批量创建时占用内存少。
+模型的 row_factory 可以直接设为 sqlite3 游标的 row_factory，查询结果按字段名
+直接构造为模型对象；查询中没有的字段取构造函数的默认值，多余的列忽略。
 """
+import inspect
+
+
+class Record:
+    """模型基类，字段顺序即子类构造函数的参数顺序"""
+    __slots__ = ()
+    # 值为 NULL 的字段是否取默认值
+    NULL_AS_DEFAULT = False
+    # 字段 -> 旧版本数据库中的同名字段，字段为空时取该列的值
+    FALLBACK_COLUMNS = {}
+
+    @classmethod
+    def fields(cls):
+        """(字段名, 默认值) 列表"""
+        fields = cls.__dict__.get('_fields')
+        if fields is None:
+            parameters = list(inspect.signature(cls.__init__).parameters.values())[1:]
+            fields = cls._fields = tuple((parameter.name, parameter.default) for parameter in parameters)
+        return fields
+
+    @classmethod
+    def _plan_for(cls, description):
+        """按游标的列构造对象的方案：每个字段的 (列下标, 旧版本列下标, 默认值)"""
+        plan = cls.__dict__.get('_plan')
+        if plan is not None and plan[0] is description:
+            return plan[1]
+        columns = {column[0]: index for index, column in enumerate(description)}
+        steps = tuple((columns.get(name), columns.get(cls.FALLBACK_COLUMNS.get(name)), default)
+                      for name, default in cls.fields())
+        # 同一次查询的各行 description 是同一个对象，只计算一次
+        cls._plan = (description, steps)
+        return steps
+
+    @classmethod
+    def row_factory(cls, cursor, row):
+        values = []
+        for index, fallback, default in cls._plan_for(cursor.description):
+            value = row[index] if index is not None else default
+            if not value and fallback is not None:
+                value = row[fallback]
+            if value is None and cls.NULL_AS_DEFAULT:
+                value = default
+            values.append(value)
+        return cls(*values)
 
-class Youth:
+    def to_dict(self):
+        return {name: getattr(self, name) for name, _ in self.fields()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+
+class Youth(Record):
     """青年基本信息（完整版）"""
+    __slots__ = (
+        'id_card', 'name', 'gender', 'birth_date', 'nation', 'political_status', 'religion', 'native_place',
+        'education_level', 'study_status', 'study_type', 'camp_entry_time', 'recruitment_place',
+        'residence_address', 'household_address', 'postal_code', 'personal_phone', 'family_phone', 'school',
+        'major', 'enrollment_time', 'initial_hospital', 'initial_conclusion', 'initial_time',
+        'physical_conclusion', 'physical_time', 'physical_disqualification', 'chief_doctor_opinion',
+        'graduation_time', 'physical_examination', 'medical_history_survey', 'political_assessment',
+        'company', 'platoon', 'squad', 'squad_leader', 'information', 'item_verification',
+        'special_reexamination', 'camp_status', 'leave_time', 'leave_reason', 'district_positive',
+        'city_positive', 'special_screening_positive', 'psychological_test_type', 'tracking_opinion',
+        'implementation_status', 'district_medical_survey', 'city_medical_survey',
+        'province_medical_survey', 'family_member_info', 'visit_survey', 'political_assessment2',
+        'key_attention', 'items', 'usage', 'disposal_measures', 'reexamination_time', 'existing_situation',
+        'reexamination_conclusion', 'id',
+    )
+    NULL_AS_DEFAULT = True
+    FALLBACK_COLUMNS = {
+        'personal_phone': 'phone',
+        'family_phone': 'parent_phone',
+        'leave_reason': 'situation_note',
+        'family_member_info': 'family_info',
+    }
+
     def __init__(self, id_card='', name='', gender='', birth_date='', nation='',
                  political_status='', religion='', native_place='', education_level='', 
                  study_status='', study_type='', camp_entry_time='', recruitment_place='', 
@@ -84,8 +162,10 @@ class Youth:
         self.id = id  # 序号字段（保留但不显示）
 
 
-class MedicalHistory:
+class MedicalHistory(Record):
     """病史调查"""
+    __slots__ = ('id', 'youth_id', 'file_path', 'upload_date', 'notes')
+
     def __init__(self, id=None, youth_id=None, file_path='', upload_date='', notes=''):
         self.id = id
         self.youth_id = youth_id
@@ -94,8 +174,13 @@ class MedicalHistory:
         self.notes = notes
 
 
-class MedicalScreening:
+class MedicalScreening(Record):
     """病史筛查"""
+    __slots__ = (
+        'id', 'youth_id_card', 'name', 'gender', 'id_card', 'screening_result', 'screening_date',
+        'physical_status', 'mental_status', 'recruitment_place', 'company', 'platoon', 'squad', 'remark',
+    )
+
     def __init__(self, id=None, youth_id_card='', name='', gender='', id_card='',
                  screening_result='', screening_date='', physical_status='', mental_status='',
                  recruitment_place='', company='', platoon='', squad='', remark=''):
@@ -115,8 +200,13 @@ class MedicalScreening:
         self.remark = remark  # 备注
 
 
-class TownInterview:
+class TownInterview(Record):
     """镇街谈心谈话情况"""
+    __slots__ = (
+        'id', 'youth_id_card', 'youth_name', 'gender', 'interview_date', 'visit_survey_image', 'thoughts',
+        'spirit',
+    )
+
     def __init__(self, id=None, youth_id_card='', youth_name='', gender='', 
                  interview_date='', visit_survey_image=None, thoughts='', spirit=''):
         self.id = id  # 序号（自动生成）
@@ -129,8 +219,13 @@ class TownInterview:
         self.spirit = spirit  # 精神
 
 
-class LeaderInterview:
+class LeaderInterview(Record):
     """领导谈心谈话情况"""
+    __slots__ = (
+        'id', 'youth_id_card', 'youth_name', 'gender', 'interview_date', 'visit_survey_image', 'thoughts',
+        'spirit',
+    )
+
     def __init__(self, id=None, youth_id_card='', youth_name='', gender='', 
                  interview_date='', visit_survey_image=None, thoughts='', spirit=''):
         self.id = id  # 序号（自动生成）
@@ -143,8 +238,13 @@ class LeaderInterview:
         self.spirit = spirit  # 精神
 
 
-class VisitSurvey:
+class VisitSurvey(Record):
     """走访调查情况"""
+    __slots__ = (
+        'id', 'youth_id_card', 'youth_name', 'gender', 'survey_date', 'visit_survey_image', 'thoughts',
+        'spirit',
+    )
+
     def __init__(self, id=None, youth_id_card='', youth_name='', gender='', 
                  survey_date='', visit_survey_image=None, thoughts='', spirit=''):
         self.id = id  # 序号（自动生成）
@@ -157,8 +257,10 @@ class VisitSurvey:
         self.spirit = spirit  # 精神
 
 
-class DailyStat:
+class DailyStat(Record):
     """每日情况统计"""
+    __slots__ = ('id', 'youth_id', 'record_date', 'mood', 'physical_condition', 'training_status', 'notes')
+
     def __init__(self, id=None, youth_id=None, record_date='', mood='', 
                  physical_condition='', training_status='', notes=''):
         self.id = id
@@ -170,8 +272,10 @@ class DailyStat:
         self.notes = notes
 
 
-class AbnormalStat:
+class AbnormalStat(Record):
     """异常情况统计"""
+    __slots__ = ('id', 'youth_id', 'abnormal_type', 'description', 'record_date', 'handler', 'status')
+
     def __init__(self, id=None, youth_id=None, abnormal_type='', 
                  description='', record_date='', handler='', status=''):
         self.id = id
@@ -183,8 +287,10 @@ class AbnormalStat:
         self.status = status
 
 
-class HealthScreening:
+class HealthScreening(Record):
     """隐性疾病及心理问题筛查"""
+    __slots__ = ('id', 'youth_id', 'screening_type', 'result', 'screening_date', 'follow_up')
+
     def __init__(self, id=None, youth_id=None, screening_type='',
                  result='', screening_date='', follow_up=''):
         self.id = id
@@ -195,8 +301,10 @@ class HealthScreening:
         self.follow_up = follow_up
 
 
-class CampVerification:
+class CampVerification(Record):
     """入营点验情况"""
+    __slots__ = ('id', 'username', 'user_id', 'item', 'usage', 'Disposal', 'data')
+
     def __init__(self, id=None, username='', user_id='', item='', 
                  usage='', Disposal='', data=''):
         self.id = id
@@ -208,8 +316,13 @@ class CampVerification:
         self.data = data  # 日期
 
 
-class ExceptionStatistics:
+class ExceptionStatistics(Record):
     """异常情况统计"""
+    __slots__ = (
+        'id', 'name', 'gender', 'user_id', 'thought', 'body', 'Spirit', 'other', 'data', 'created_at',
+        'updated_at',
+    )
+
     def __init__(self, id=None, name='', gender='', user_id='', thought=False,
                  body=False, Spirit=False, other=False, data='', created_at='', updated_at=''):
         self.id = id
@@ -225,8 +338,13 @@ class ExceptionStatistics:
         self.updated_at = updated_at  # 更新时间
 
 
-class PoliticalAssessment:
+class PoliticalAssessment(Record):
     """政治考核情况统计表"""
+    __slots__ = (
+        'id', 'youth_id_card', 'name', 'gender', 'id_card', 'family_member_info', 'visit_survey',
+        'political_assessment', 'key_attention', 'assessment_date', 'thoughts', 'spirit',
+    )
+
     def __init__(self, id=None, youth_id_card='', name='', gender='', id_card='',
                  family_member_info='', visit_survey='', political_assessment='', 
                  key_attention='', assessment_date='', thoughts='', spirit=''):
@@ -244,8 +362,15 @@ class PoliticalAssessment:
         self.spirit = spirit  # 精神
 
 
-class PhysicalExamination:
+class PhysicalExamination(Record):
     """体检情况统计表"""
+    __slots__ = (
+        'id', 'youth_id_card', 'name', 'gender', 'district_exam', 'district_positive', 'district_date',
+        'city_exam', 'city_positive', 'city_date', 'special_exam', 'special_positive', 'special_date',
+        'body_status', 'psychological_test_type', 'tracking_opinion', 'implementation_status',
+        'recruitment_place', 'company', 'platoon', 'squad', 'squad_leader',
+    )
+
     def __init__(self, id=None, youth_id_card='', name='', gender='',
                  district_exam='', district_positive='', district_date='',
                  city_exam='', city_positive='', city_date='',
@@ -277,8 +402,10 @@ class PhysicalExamination:
         self.squad_leader = squad_leader  # 带训班长
 
 
-class User:
+class User(Record):
     """用户账户"""
+    __slots__ = ('id', 'username', 'password', 'role', 'unit')
+
     def __init__(self, id=None, username='', password='', role='', unit=''):
         self.id = id
         self.username = username
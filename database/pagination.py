@@ -0,0 +1,100 @@
+"""
+键集分页（keyset pagination）
+
+列表查询按固定的排序键排序，下一页从上一页最后一行的键之后开始读取，
+不使用 OFFSET，翻到后面的页也不会变慢。游标是把排序键编码后的字符串，
+调用方只需原样传回，不需要理解其内容。
+"""
+import base64
+import json
+
+
+class Keyset:
+    """分页排序键
+
+    columns 为 [(SQL表达式, 'ASC' 或 'DESC', 该值在结果行中的位置)]，
+    最后一列必须能唯一确定一行（通常是 id）。
+    """
+
+    def __init__(self, *columns):
+        self.columns = columns
+
+    def order_by(self):
+        return ', '.join(f"{expr} {direction}" for expr, direction, _ in self.columns)
+
+    def key_of(self, row):
+        return [row[index] for _, _, index in self.columns]
+
+    @staticmethod
+    def _after(expr, direction, value):
+        """按排序方向排在 value 之后的条件（SQLite 中 NULL 在升序最前、降序最后）"""
+        if direction == 'ASC':
+            if value is None:
+                return f"{expr} IS NOT NULL", []
+            return f"{expr} > ?", [value]
+        if value is None:
+            return "0", []
+        return f"({expr} < ? OR {expr} IS NULL)", [value]
+
+    def condition(self, key):
+        """排在 key 之后的所有行：(a 之后) OR (a 相等 AND b 之后) OR ..."""
+        branches = []
+        params = []
+        for position, (expr, direction, _) in enumerate(self.columns):
+            parts = []
+            for (equal_expr, _, _), value in zip(self.columns[:position], key[:position]):
+                parts.append(f"{equal_expr} IS ?")
+                params.append(value)
+            after_sql, after_params = self._after(expr, direction, key[position])
+            parts.append(after_sql)
+            params.extend(after_params)
+            branches.append(' AND '.join(parts))
+        return f"({' OR '.join(f'({branch})' for branch in branches)})", params
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor_token):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor_token.encode('ascii')).decode('utf-8'))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"无效的分页游标: {cursor_token}") from e
+
+
+def _fetchall(cursor, query, params, cache, tables):
+    if cache is not None:
+        return cache.fetchall(cursor, query, params, tables)
+    cursor.execute(query, params)
+    return cursor.fetchall()
+
+
+def fetch_page(cursor, query, params, keyset, page_size=None, after=None, cache=None, tables=()):
+    """执行分页查询
+
+    query 应以 WHERE 条件结尾（可以是 WHERE 1=1），排序由 keyset 决定。
+    page_size 为 None 时返回全部结果的列表（与原来的返回值一致）；
+    否则返回 (本页结果, 下一页游标)，没有下一页时游标为 None。
+    传入 cache（QueryCache）时结果按 tables 的版本号缓存。
+    """
+    params = list(params)
+    if after:
+        key = decode_cursor(after)
+        if len(key) != len(keyset.columns):
+            raise ValueError(f"无效的分页游标: {after}")
+        condition, condition_params = keyset.condition(key)
+        query += f" AND {condition}"
+        params.extend(condition_params)
+    query += f" ORDER BY {keyset.order_by()}"
+
+    if page_size is None:
+        return _fetchall(cursor, query, params, cache, tables)
+
+    query += " LIMIT ?"
+    params.append(page_size + 1)
+    rows = _fetchall(cursor, query, params, cache, tables)
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(keyset.key_of(rows[-1]))
+    return rows, None
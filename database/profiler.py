@@ -0,0 +1,242 @@
+"""
+数据库调用耗时统计
+
+记录 DatabaseManager 每个公开方法的调用次数、返回行数和耗时分布（p50/p95/p99）。
+最外层调用期间在当前线程、当前库（本库或归档库）的连接上设置 set_trace_callback
+收集执行的SQL（参数已展开），调用结束即取消，其他时间执行的语句不经过跟踪回调。
+耗时超过慢查询阈值时把方法名、SQL 和 EXPLAIN QUERY PLAN 写入日志，
+统计结果可以导出为 JSON 供离线分析。
+
+程序中在 config.py 中设置 PROFILE_QUERIES = True 启用，退出时导出到 PROFILE_FILE；
+也可以对常用查询单独统计：
+    python -m database.profiler [数据库路径] [输出JSON路径]
+"""
+import functools
+import inspect
+import json
+import logging
+import math
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOW_MS = 200
+# 每个方法保留的最近耗时样本数，百分位按这些样本计算
+SAMPLE_SIZE = 1000
+# 保留的最近慢查询记录数、每次调用最多记录的SQL条数
+SLOW_QUERY_LIMIT = 100
+STATEMENT_LIMIT = 20
+# 不统计的公开方法
+EXCLUDED_METHODS = ('get_connection', 'close', 'using_store')
+
+
+def row_count(result):
+    """方法返回的行数：列表返回长度，分页查询返回 (行, 游标)，其他返回None"""
+    if isinstance(result, tuple) and len(result) == 2 and isinstance(result[0], list):
+        return len(result[0])
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+def _percentile(samples, percent):
+    """最近邻秩法计算百分位，samples 已排序"""
+    if not samples:
+        return None
+    index = max(math.ceil(percent / 100 * len(samples)) - 1, 0)
+    return samples[index]
+
+
+class MethodStats:
+    """单个方法的统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+
+    def add(self, elapsed_ms, rows, failed):
+        self.calls += 1
+        self.errors += 1 if failed else 0
+        self.rows += rows or 0
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.samples.append(elapsed_ms)
+
+    def to_dict(self):
+        samples = sorted(self.samples)
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rows': self.rows,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.calls, 3) if self.calls else None,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': _percentile(samples, 50),
+            'p95_ms': _percentile(samples, 95),
+            'p99_ms': _percentile(samples, 99),
+        }
+
+
+class QueryProfiler:
+    """DatabaseManager 方法耗时统计，slow_ms 为慢查询阈值（毫秒）"""
+
+    def __init__(self, slow_ms=DEFAULT_SLOW_MS):
+        self.slow_ms = slow_ms
+        self.db_manager = None
+        self.stats = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LIMIT)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def attach(self, db_manager):
+        """包装 db_manager 的公开方法"""
+        self.db_manager = db_manager
+        for name, _ in inspect.getmembers(type(db_manager), inspect.isfunction):
+            if name.startswith('_') or name in EXCLUDED_METHODS:
+                continue
+            setattr(db_manager, name, self._wrap(name, getattr(db_manager, name)))
+
+    def _start_trace(self):
+        """在当前线程、当前库的连接上设置SQL跟踪，返回该连接"""
+        conn = self.db_manager.connections.raw_connection()
+        conn.set_trace_callback(self._on_statement)
+        return conn
+
+    def _frames(self):
+        frames = getattr(self._local, 'frames', None)
+        if frames is None:
+            frames = self._local.frames = []
+        return frames
+
+    def _on_statement(self, sql):
+        # 触发器内的语句以 "--" 注释或外层语句的形式报告，不重复记录
+        if sql.startswith('--'):
+            return
+        for statements in getattr(self._local, 'frames', ()):
+            if len(statements) < STATEMENT_LIMIT and sql not in statements:
+                statements.append(sql)
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            frames = self._frames()
+            # 只在最外层调用期间跟踪SQL
+            traced = None if frames else self._start_trace()
+            statements = []
+            frames.append(statements)
+            result = None
+            failed = True
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                frames.pop()
+                if traced is not None:
+                    traced.set_trace_callback(None)
+                self._record(name, elapsed_ms, row_count(result), failed, statements)
+        return wrapper
+
+    def _record(self, name, elapsed_ms, rows, failed, statements):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = MethodStats()
+            stats.add(round(elapsed_ms, 3), rows, failed)
+        # 嵌套调用时只在最外层记录慢查询，避免重复
+        if elapsed_ms >= self.slow_ms and not self._frames():
+            try:
+                self._log_slow_query(name, elapsed_ms, rows, statements)
+            except Exception as e:
+                print(f"记录慢查询出错: {e}")
+
+    def _log_slow_query(self, name, elapsed_ms, rows, statements):
+        entries = []
+        for sql in statements:
+            entries.append({'sql': ' '.join(sql.split()), 'plan': self.explain(sql)})
+        with self._lock:
+            self.slow_queries.append({
+                'method': name,
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'elapsed_ms': round(elapsed_ms, 3),
+                'rows': rows,
+                'statements': entries,
+            })
+        lines = [f"慢查询 {name}: {elapsed_ms:.1f}ms，返回 {rows if rows is not None else '-'} 行"]
+        for entry in entries:
+            lines.append(f"  SQL: {entry['sql']}")
+            lines.extend(f"    {detail}" for detail in entry['plan'])
+        logger.warning('\n'.join(lines))
+
+    def explain(self, sql):
+        """语句的 EXPLAIN QUERY PLAN，只对查询语句执行"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return []
+        conn = self.db_manager.connections.raw_connection()
+        try:
+            return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+        except sqlite3.Error as e:
+            return [f"无法获取查询计划: {e}"]
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.slow_queries.clear()
+
+    def report(self):
+        """统计结果：方法名 -> 调用次数、错误次数、返回行数、耗时（毫秒）"""
+        with self._lock:
+            methods = {name: stats.to_dict() for name, stats in sorted(self.stats.items())}
+            slow_queries = list(self.slow_queries)
+        return {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'slow_ms': self.slow_ms,
+            'methods': methods,
+            'slow_queries': slow_queries,
+        }
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+    from .query_plans import HOT_QUERIES
+
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    db_manager = DatabaseManager(argv[0] if argv else ':memory:')
+    profiler = QueryProfiler()
+    profiler.attach(db_manager)
+    for method_name, args in HOT_QUERIES:
+        try:
+            getattr(db_manager, method_name)(*args)
+        except Exception as e:
+            print(f"调用 {method_name} 时出错: {e}")
+
+    report = profiler.report()
+    for name, stats in report['methods'].items():
+        print(f"{name}: {stats['calls']} 次，{stats['rows']} 行，"
+              f"p50 {stats['p50_ms']}ms，p95 {stats['p95_ms']}ms，p99 {stats['p99_ms']}ms")
+    if len(argv) > 1:
+        profiler.export_json(argv[1])
+        print(f"统计结果已导出到 {argv[1]}")
+    db_manager.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
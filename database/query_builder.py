@@ -0,0 +1,152 @@
+"""
+查询条件构造
+
+用几种筛选条件描述搜索条件，统一编译为参数化的 WHERE 条件：
+- 值为空的条件不生成SQL；同一组有效条件总是生成相同的SQL文本，便于语句缓存
+- 值一律作为参数传入，不拼接进SQL
+- 日期范围使用规范化日期字段，前缀匹配转换为范围比较，都可以使用索引
+- 同一张表上的子串匹配合并为一次全文检索 MATCH（不支持时回退到 LIKE）
+- 单位条件在单位层级表中匹配名称，再按 youth.unit_id 查询
+
+用法：
+    where, params = Filters(
+        Contains('town_interview', 't', 'youth_name', name),
+        DateRange('t.interview_date', start, end),
+        Unit('y', company=company),
+    ).compile(fulltext_tables)
+    sql = f"SELECT ... WHERE {where}"
+"""
+from . import dates, fulltext, units
+
+
+def _is_empty(value):
+    return value is None or value == ''
+
+
+class Equals:
+    """字段等于指定值"""
+
+    def __init__(self, column, value):
+        self.column = column
+        self.value = value
+
+    def compile(self):
+        if _is_empty(self.value):
+            return None
+        return f"{self.column} = ?", [self.value]
+
+
+class Prefix:
+    """字段以指定文本开头，转换为范围比较以便使用索引"""
+
+    def __init__(self, column, value):
+        self.column = column
+        self.value = value
+
+    def compile(self):
+        if _is_empty(self.value):
+            return None
+        # 把最后一个字符加一作为上界：'abc' -> ['abc', 'abd')
+        upper = self.value[:-1] + chr(ord(self.value[-1]) + 1)
+        return f"({self.column} >= ? AND {self.column} < ?)", [self.value, upper]
+
+
+class Contains:
+    """字段包含指定文本；column 为元组时在任一字段中匹配
+
+    table 为字段所属的原表名，有全文检索索引时使用索引。
+    """
+
+    def __init__(self, table, alias, column, value):
+        self.table = table
+        self.alias = alias
+        self.column = column
+        self.value = value
+
+    def compile(self):
+        if _is_empty(self.value):
+            return None
+        columns = self.column if isinstance(self.column, tuple) else (self.column,)
+        likes = [f"{self.alias}.{name} LIKE ?" for name in columns]
+        sql = likes[0] if len(likes) == 1 else f"({' OR '.join(likes)})"
+        return sql, [f'%{self.value}%'] * len(likes)
+
+
+class DateRange:
+    """日期在 [start, end] 之间（任一端可以为空），比较规范化后的日期字段"""
+
+    def __init__(self, column, start=None, end=None):
+        self.column = column
+        self.start, self.end = dates.normalize_range(start, end)
+
+    @classmethod
+    def of(cls, column, date_range):
+        """date_range 为 (开始, 结束) 或 None"""
+        return cls(column, *(date_range or (None, None)))
+
+    def compile(self):
+        column = dates.iso_column(self.column)
+        if not _is_empty(self.start) and not _is_empty(self.end):
+            return f"({column} >= ? AND {column} <= ?)", [self.start, self.end]
+        if not _is_empty(self.start):
+            return f"{column} >= ?", [self.start]
+        if not _is_empty(self.end):
+            return f"{column} <= ?", [self.end]
+        return None
+
+
+class Unit:
+    """按应征地、连、排、班筛选青年（alias 为 youth 表的别名）
+
+    exact 为 False 时名称按包含匹配，为 True 时按相等匹配（用于下拉框选择）。
+    """
+
+    def __init__(self, alias, recruitment_place='', company='', platoon='', squad='', exact=False):
+        self.alias = alias
+        self.values = (recruitment_place, company, platoon, squad)
+        self.exact = exact
+
+    def compile(self):
+        return units.filter_sql(self.alias, self.values, self.exact)
+
+
+class Filters:
+    """以 AND 连接的一组筛选条件"""
+
+    def __init__(self, *filters):
+        self.filters = [item for item in filters if item is not None]
+
+    def compile(self, fulltext_tables=()):
+        """返回 (条件SQL, 参数)；没有有效条件时条件SQL为 '1=1'
+
+        fulltext_tables 为当前可用的全文检索索引名。
+        """
+        # 子串条件按 (表, 别名) 分组，在组内第一个条件的位置生成
+        parts = []
+        groups = {}
+        for item in self.filters:
+            if isinstance(item, Contains) and item.table in fulltext.FULLTEXT_INDEXES:
+                key = (item.table, item.alias)
+                if key not in groups:
+                    groups[key] = []
+                    parts.append(key)
+                groups[key].append((item.column, item.value))
+            else:
+                parts.append(item)
+
+        conditions = []
+        params = []
+        for part in parts:
+            if isinstance(part, tuple):
+                table, alias = part
+                index = fulltext.FULLTEXT_INDEXES[table]
+                group_conditions, group_params = fulltext.build_filter(
+                    index, alias, groups[part], index.name in fulltext_tables)
+                conditions.extend(group_conditions)
+                params.extend(group_params)
+            else:
+                compiled = part.compile()
+                if compiled is not None:
+                    conditions.append(compiled[0])
+                    params.extend(compiled[1])
+        return (' AND '.join(conditions) or '1=1'), params
@@ -0,0 +1,144 @@
+"""
+查询结果缓存
+
+按 (SQL, 参数, 行工厂) 缓存查询结果，按最近最少使用淘汰，总大小不超过上限。
+每张表有一个版本号：连接上的临时触发器在每次增删改时调用 cache_table_changed()
+把版本号加一，事务提交或回滚时再加一次（避免提交前读到的旧数据、
+回滚前读到的未提交数据被当作新版本缓存）。
+缓存项记录依赖表的版本号，任一表版本变化即失效。
+只有显式通过 fetchall() 查询的语句才会被缓存。
+
+缓存默认关闭（DatabaseManager 的 cache_bytes 为 0），关闭时不注册版本函数、
+不创建临时触发器，写入不产生额外开销；需要时传入 cache_bytes=DEFAULT_MAX_BYTES 开启。
+"""
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# 开启缓存时建议的大小
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+SQL_FUNCTION = 'cache_table_changed'
+
+# 估算结果大小时每行、每个值的固定开销（字节）
+_ROW_OVERHEAD = 64
+_VALUE_OVERHEAD = 16
+
+
+def _estimate_size(rows):
+    size = 0
+    for row in rows:
+        size += _ROW_OVERHEAD
+        for value in row:
+            if isinstance(value, (str, bytes)):
+                size += len(value) + _VALUE_OVERHEAD
+            else:
+                size += _VALUE_OVERHEAD
+    return size
+
+
+class QueryCache:
+    """带表版本号失效的LRU查询缓存，max_bytes 为 0 时不缓存"""
+
+    def __init__(self, max_bytes=0):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    # ---------- 表版本号 ----------
+
+    def table_changed(self, table_name):
+        """表被修改（由临时触发器调用）"""
+        with self._lock:
+            self._versions[table_name] = self._versions.get(table_name, 0) + 1
+        pending = getattr(self._local, 'pending', None)
+        if pending is None:
+            pending = self._local.pending = set()
+        pending.add(table_name)
+
+    def transaction_finished(self):
+        """当前线程的事务已提交或回滚"""
+        pending = getattr(self._local, 'pending', None)
+        if not pending:
+            return
+        self._local.pending = set()
+        with self._lock:
+            for table_name in pending:
+                self._versions[table_name] = self._versions.get(table_name, 0) + 1
+
+    def versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(table_name, 0) for table_name in tables)
+
+    def install(self, conn):
+        """在连接上注册版本函数，并为所有普通表创建临时触发器（缓存关闭时不安装）"""
+        if not self.enabled:
+            return
+        conn.create_function(SQL_FUNCTION, 1, self.table_changed)
+        virtual_tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND sql LIKE 'CREATE VIRTUAL TABLE%'")]
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")]
+        for table_name in tables:
+            # 跳过FTS虚拟表及其影子表，它们只随原表变化
+            if table_name in virtual_tables or any(table_name.startswith(f"{name}_") for name in virtual_tables):
+                continue
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                try:
+                    conn.execute(
+                        f"CREATE TEMP TRIGGER IF NOT EXISTS cache_{table_name}_{event.lower()} "
+                        f"AFTER {event} ON main.{table_name} "
+                        f"BEGIN SELECT {SQL_FUNCTION}('{table_name}'); END")
+                except sqlite3.DatabaseError as e:
+                    print(f"创建缓存触发器 {table_name} 时出错: {e}")
+
+    # ---------- 缓存 ----------
+
+    def fetchall(self, cursor, sql, params, tables):
+        """执行查询并缓存结果，tables 为查询依赖的表"""
+        if not self.enabled:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+        key = (sql, tuple(params), cursor.row_factory)
+        versions = self.versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == versions:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+        self._store(key, versions, rows)
+        return list(rows)
+
+    def _store(self, key, versions, rows):
+        size = _estimate_size(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            self._entries[key] = (versions, tuple(rows), size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
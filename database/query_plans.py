@@ -0,0 +1,132 @@
+"""
+查询计划检查
+
+实际调用 DatabaseManager 的常用查询方法，记录其执行的SQL，
+再用 EXPLAIN QUERY PLAN 检查是否对大表做了全表扫描。
+
+用法：python -m database.query_plans [数据库路径]
+不指定路径时在内存数据库上检查。存在全表扫描时以非零状态退出。
+"""
+import re
+import sys
+
+
+# 这些表在常用查询中不允许出现全表扫描
+INDEXED_TABLES = {
+    'youth', 'daily_stat', 'town_interview', 'leader_interview', 'visit_survey',
+    'medical_screening', 'political_assessment', 'physical_examination',
+    'camp_verification', 'exception_statistics', 'exception_rollup', 'change_log',
+}
+
+SAMPLE_ID_CARD = '110101200001010011'
+SAMPLE_DATE = '2025-01-01'
+SAMPLE_END_DATE = '2025-01-31'
+SAMPLE_COMPANY = '一连'
+
+# (方法名, 参数)
+HOT_QUERIES = [
+    ('get_youth_by_id_card', (SAMPLE_ID_CARD,)),
+    ('get_daily_stat_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_town_interview_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_leader_interview_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_medical_screening_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_political_assessment_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_physical_examination_by_id_card_and_date', (SAMPLE_ID_CARD, SAMPLE_DATE)),
+    ('get_political_assessments_by_id_card', (SAMPLE_ID_CARD,)),
+    ('check_political_assessment_exists', (SAMPLE_ID_CARD, '张三', SAMPLE_DATE)),
+    ('get_camp_verifications_by_user_id', (SAMPLE_ID_CARD,)),
+    ('check_camp_verification_exists', (SAMPLE_ID_CARD,)),
+    ('search_visit_surveys', (SAMPLE_ID_CARD,)),
+    ('get_daily_stats_for_chart', (1,)),
+    ('filter_daily_stats_by_date_range', (SAMPLE_DATE, SAMPLE_END_DATE)),
+    ('get_all_daily_stats_with_youth_info', ((SAMPLE_DATE, SAMPLE_END_DATE),)),
+    ('get_all_youth_detailed', ((SAMPLE_DATE, SAMPLE_END_DATE),)),
+    ('search_town_interviews', ('', '', '', '', '', '', (SAMPLE_DATE, SAMPLE_END_DATE))),
+    ('search_daily_stats_with_youth_info', ('', '', '', SAMPLE_COMPANY)),
+    ('get_youth_in_unit', ('', SAMPLE_COMPANY)),
+    ('get_exception_statistics_view_data', (SAMPLE_DATE, SAMPLE_END_DATE)),
+    ('get_exception_statistics_summary', (SAMPLE_DATE, SAMPLE_END_DATE)),
+    ('get_exception_rollup', (SAMPLE_DATE, SAMPLE_END_DATE)),
+    ('get_timeseries', ([SAMPLE_ID_CARD], SAMPLE_DATE, SAMPLE_END_DATE)),
+    ('get_changes_since', (0, ('youth',))),
+    ('get_changes_since', (0, None, True)),
+]
+
+# 全表扫描：SQLite 3.36 起为 "SCAN 别名"（没有别名时为表名），之前为 "SCAN TABLE 表名 AS 别名"
+_SCAN_PATTERN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS (\w+))?$')
+# FROM / JOIN 后的表名及别名
+_TABLE_REFERENCE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(?:\w+\.)?(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NOT_ALIASES = {
+    'WHERE', 'JOIN', 'LEFT', 'INNER', 'CROSS', 'NATURAL', 'OUTER', 'ON', 'USING', 'ORDER', 'GROUP',
+    'HAVING', 'LIMIT', 'UNION', 'EXCEPT', 'INTERSECT', 'WINDOW', 'SET', 'VALUES', 'SELECT', 'AS',
+}
+
+
+def collect_statements(db_manager, method_name, args):
+    """调用方法并返回其执行的SELECT语句（参数已展开），方法出错时异常照常抛出"""
+    statements = []
+    conn = db_manager.connections.raw_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        getattr(db_manager, method_name)(*args)
+    finally:
+        conn.set_trace_callback(None)
+    return [sql for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+
+def table_aliases(sql):
+    """语句中的名称（别名或表名） -> 可能对应的表名"""
+    aliases = {}
+    for table_name, alias in _TABLE_REFERENCE_PATTERN.findall(sql):
+        aliases.setdefault(table_name, set()).add(table_name)
+        if alias and alias.upper() not in _NOT_ALIASES:
+            aliases.setdefault(alias, set()).add(table_name)
+    return aliases
+
+
+def full_scans(db_manager, sql):
+    """返回语句查询计划中被全表扫描的表（别名按语句中的 FROM / JOIN 换回表名）"""
+    conn = db_manager.get_connection()
+    try:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    finally:
+        conn.close()
+    aliases = table_aliases(sql)
+    tables = []
+    for row in plan:
+        match = _SCAN_PATTERN.match(row[-1])
+        if not match:
+            continue
+        name, alias = match.groups()
+        names = {name} if alias else aliases.get(name, {name})
+        tables.extend(sorted(names & INDEXED_TABLES))
+    return tables
+
+
+def check_query_plans(db_manager, queries=HOT_QUERIES):
+    """检查常用查询，返回 [(方法名, SQL, 全表扫描的表)]"""
+    problems = []
+    for method_name, args in queries:
+        for sql in collect_statements(db_manager, method_name, args):
+            tables = full_scans(db_manager, sql)
+            if tables:
+                problems.append((method_name, ' '.join(sql.split()), tables))
+    return problems
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+
+    argv = sys.argv[1:] if argv is None else argv
+    db_manager = DatabaseManager(argv[0] if argv else ':memory:')
+    problems = check_query_plans(db_manager)
+    for method_name, sql, tables in problems:
+        print(f"[全表扫描] {method_name}: {', '.join(tables)}\n    {sql}")
+    if not problems:
+        print(f"已检查 {len(HOT_QUERIES)} 个常用查询，未发现全表扫描")
+    db_manager.close()
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
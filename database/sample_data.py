@@ -0,0 +1,274 @@
+"""
+模拟数据生成
+
+按指定规模生成一个可重复的测试数据库：N 名青年（分布在应征地 -> 连 -> 排 -> 班 四级单位中）、
+M 天的每日情况统计、带图片的镇街/领导谈话和走访调查、病史筛查、政治考核、
+体检和入营点验记录。每日统计按 anomaly_rate 出现异常，谈话内容按同样比例包含异常关键字。
+相同的参数和随机种子生成的数据完全相同，用于性能测试和容量评估。
+
+图片按内容寻址保存，只生成 image_pool 张不同的模拟图片，各记录随机引用。
+数据直接按表批量写入（触发器照常维护派生字段、单位、变更日志和异常统计），
+比逐条调用 DatabaseManager 的写入方法快得多。
+
+用法：
+    python -m database.sample_data 数据库路径 [--youths 1000] [--days 30] [--seed 0]
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+
+PLACES = ('东城区', '西城区', '朝阳区', '海淀区', '丰台区', '石景山区', '通州区', '顺义区')
+COMPANIES = ('一连', '二连', '三连', '四连')
+PLATOONS = ('一排', '二排', '三排')
+SQUADS = ('一班', '二班', '三班')
+
+SURNAMES = '王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗郑梁谢宋唐许韩冯邓曹彭曾肖田董袁潘'
+GIVEN_NAMES = '伟刚勇毅俊峰强军平保东文辉力明永健世广志义兴良海山仁波宁贵福生龙元全国胜学祥才发武新利清'
+NATIONS = ('汉族',) * 18 + ('回族', '满族')
+POLITICAL_STATUS = ('共青团员',) * 3 + ('群众', '中共党员')
+EDUCATION_LEVELS = ('高中', '大专', '本科', '本科', '硕士研究生')
+SCHOOLS = ('北京大学', '清华大学', '北京工业大学', '首都师范大学', '北京联合大学', '北京市第一中学')
+
+STATUS_COLUMNS = ('mood', 'physical_condition', 'mental_state', 'training', 'management')
+NORMAL_TEXTS = ('思想稳定，训练积极', '情绪良好，适应较快', '表现积极，团结战友', '精神饱满，状态良好')
+ABNORMAL_TEXTS = ('思想有波动，担心家里情况', '情绪焦虑，训练困难', '存在抵触情绪，表现消极', '睡眠差，精神不良')
+EXAM_RESULTS = ('合格',) * 9 + ('不合格',)
+CAMP_ITEMS = ('手机', '充电宝', '药品', '现金', '银行卡')
+
+DEFAULT_START_DATE = '2025-01-01'
+TOWN_INTERVIEW_DAYS = 7
+LEADER_INTERVIEW_DAYS = 14
+# 每个批次写入的行数，避免一次在内存中生成全部记录
+BATCH_SIZE = 10000
+
+_ID_CARD_WEIGHTS = (7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2)
+_ID_CARD_CHECKS = '10X98765432'
+
+
+def id_card_for(index, region='110101', first_birth_date=date(2000, 1, 1)):
+    """第 index 名青年的身份证号（含正确的校验位），每个出生日期最多 1000 人"""
+    birth = first_birth_date + timedelta(days=index // 1000)
+    body = f"{region}{birth:%Y%m%d}{index % 1000:03d}"
+    return body + _ID_CARD_CHECKS[sum(int(d) * w for d, w in zip(body, _ID_CARD_WEIGHTS)) % 11]
+
+
+def _batches(rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class SampleDataGenerator:
+    def __init__(self, db_manager, youths=1000, days=30, seed=0, start_date=DEFAULT_START_DATE,
+                 anomaly_rate=0.05, image_pool=64, image_bytes=4096):
+        self.db_manager = db_manager
+        self.youths = youths
+        self.days = days
+        self.start_date = date.fromisoformat(start_date)
+        self.anomaly_rate = anomaly_rate
+        self.image_pool = image_pool
+        self.image_bytes = image_bytes
+        self.random = random.Random(seed)
+        self.counts = {}
+
+    def generate(self):
+        """生成全部数据，返回各表写入的行数"""
+        conn = self.db_manager.get_connection()
+        try:
+            existing = conn.execute("SELECT COUNT(*) FROM youth").fetchone()[0]
+        finally:
+            conn.close()
+        if existing:
+            raise ValueError("数据库中已有青年信息，请使用新的数据库文件")
+
+        people = self._people()
+        images = self._images()
+        self._insert('youth', self._youth_rows(people))
+        self._insert('daily_stat', self._daily_rows(people))
+        self._insert('town_interview', self._interview_rows(people, images, TOWN_INTERVIEW_DAYS))
+        self._insert('leader_interview', self._interview_rows(people, images, LEADER_INTERVIEW_DAYS))
+        self._insert('visit_survey', self._visit_rows(people, images))
+        self._insert('medical_screening', self._screening_rows(people))
+        self._insert('political_assessment', self._assessment_rows(people))
+        self._insert('physical_examination', self._examination_rows(people))
+        self._insert('camp_verification', self._verification_rows(people))
+        # 异常统计按需刷新，生成后先整理好，测试时读到的是稳定状态
+        self.db_manager.refresh_exception_statistics()
+        return self.counts
+
+    def _insert(self, table_name, rows):
+        """rows 为 (字段列表, 行迭代器)"""
+        columns, values = rows
+        sql = (f"INSERT INTO {table_name} ({', '.join(columns)}) "
+               f"VALUES ({', '.join('?' * len(columns))})")
+        count = 0
+        with self.db_manager.transaction() as cursor:
+            for batch in _batches(values):
+                cursor.executemany(sql, batch)
+                count += len(batch)
+        self.counts[table_name] = count
+
+    def _date(self, day):
+        return (self.start_date + timedelta(days=day)).isoformat()
+
+    def _people(self):
+        """每名青年的 (id, 身份证号, 姓名, 性别, 单位)"""
+        rng = self.random
+        people = []
+        for index in range(self.youths):
+            name = rng.choice(SURNAMES) + ''.join(rng.choice(GIVEN_NAMES) for _ in range(rng.randint(1, 2)))
+            gender = '男' if rng.random() < 0.9 else '女'
+            unit = (rng.choice(PLACES), rng.choice(COMPANIES), rng.choice(PLATOONS), rng.choice(SQUADS))
+            people.append((index + 1, id_card_for(index), name, gender, unit))
+        return people
+
+    def _images(self):
+        """模拟图片池：(摘要, 大小)"""
+        rng = self.random
+        images = []
+        for _ in range(self.image_pool):
+            data = b'\x89PNG\r\n\x1a\n' + bytes(rng.getrandbits(8) for _ in range(self.image_bytes))
+            images.append(self.db_manager.store_image(data))
+        return images
+
+    def _youth_rows(self, people):
+        columns = ('id', 'id_card', 'name', 'gender', 'birth_date', 'nation', 'political_status',
+                   'education_level', 'school', 'personal_phone', 'camp_entry_time', 'camp_status',
+                   'recruitment_place', 'company', 'platoon', 'squad', 'squad_leader')
+        rng = self.random
+
+        def rows():
+            for youth_id, id_card, name, gender, unit in people:
+                birth_date = f"{id_card[6:10]}-{id_card[10:12]}-{id_card[12:14]}"
+                phone = f"1{rng.choice('3589')}{rng.randrange(10 ** 9):09d}"
+                yield (youth_id, id_card, name, gender, birth_date, rng.choice(NATIONS),
+                       rng.choice(POLITICAL_STATUS), rng.choice(EDUCATION_LEVELS), rng.choice(SCHOOLS),
+                       phone, self._date(0), '在营') + unit + (f"{unit[1]}{unit[3]}班长",)
+        return columns, rows()
+
+    def _daily_rows(self, people):
+        columns = ('youth_id', 'record_date') + STATUS_COLUMNS + ('notes',)
+        rng = self.random
+
+        def rows():
+            for day in range(self.days):
+                record_date = self._date(day)
+                for youth_id, _, _, _, _ in people:
+                    statuses = ['正常'] * len(STATUS_COLUMNS)
+                    notes = ''
+                    if rng.random() < self.anomaly_rate:
+                        statuses[rng.randrange(len(STATUS_COLUMNS))] = '异常'
+                        notes = rng.choice(ABNORMAL_TEXTS)
+                    yield (youth_id, record_date, *statuses, notes)
+        return columns, rows()
+
+    def _text(self):
+        if self.random.random() < self.anomaly_rate:
+            return self.random.choice(ABNORMAL_TEXTS)
+        return self.random.choice(NORMAL_TEXTS)
+
+    def _interview_rows(self, people, images, interval):
+        columns = ('youth_id_card', 'youth_name', 'gender', 'interview_date',
+                   'image_hash', 'image_size', 'thoughts', 'spirit')
+        rng = self.random
+
+        def rows():
+            for day in range(0, self.days, interval):
+                interview_date = self._date(day)
+                for _, id_card, name, gender, _ in people:
+                    yield (id_card, name, gender, interview_date) + rng.choice(images) + (self._text(), self._text())
+        return columns, rows()
+
+    def _visit_rows(self, people, images):
+        columns = ('youth_id_card', 'youth_name', 'gender', 'survey_date',
+                   'image_hash', 'image_size', 'thoughts', 'spirit')
+        rng = self.random
+        rows = ((id_card, name, gender, self._date(0)) + rng.choice(images) + (self._text(), self._text())
+                for _, id_card, name, gender, _ in people)
+        return columns, rows
+
+    def _screening_rows(self, people):
+        columns = ('youth_id_card', 'name', 'gender', 'id_card', 'screening_result', 'screening_date',
+                   'physical_status', 'mental_status', 'recruitment_place', 'company', 'platoon', 'squad')
+        rng = self.random
+
+        def rows():
+            for _, id_card, name, gender, unit in people:
+                abnormal = rng.random() < self.anomaly_rate
+                yield (id_card, name, gender, id_card, '阳性' if abnormal else '阴性', self._date(0),
+                       '异常' if abnormal else '正常', '正常') + unit
+        return columns, rows()
+
+    def _assessment_rows(self, people):
+        columns = ('youth_id_card', 'name', 'gender', 'id_card', 'family_member_info', 'visit_survey',
+                   'political_assessment', 'key_attention', 'assessment_date', 'thoughts', 'spirit')
+        rows = ((id_card, name, gender, id_card, '父母健在', '已走访', '合格', '', self._date(1),
+                 self._text(), self._text())
+                for _, id_card, name, gender, _ in people)
+        return columns, rows
+
+    def _examination_rows(self, people):
+        columns = ('youth_id_card', 'name', 'gender', 'district_exam', 'district_date', 'city_exam',
+                   'city_date', 'special_exam', 'special_date', 'body_status',
+                   'recruitment_place', 'company', 'platoon', 'squad', 'squad_leader')
+        rng = self.random
+
+        def rows():
+            for _, id_card, name, gender, unit in people:
+                results = [rng.choice(EXAM_RESULTS) for _ in range(3)]
+                body_status = '异常' if '不合格' in results else '正常'
+                yield (id_card, name, gender, results[0], self._date(-60), results[1], self._date(-30),
+                       results[2], self._date(-10), body_status) + unit + (f"{unit[1]}{unit[3]}班长",)
+        return columns, rows()
+
+    def _verification_rows(self, people):
+        columns = ('username', 'user_id', 'item', 'usage', 'Disposal', 'data')
+        rng = self.random
+
+        def rows():
+            for _, id_card, name, _, _ in people:
+                for item in rng.sample(CAMP_ITEMS, rng.randint(0, 2)):
+                    yield (name, id_card, item, '个人使用', '统一保管', self._date(0))
+        return columns, rows()
+
+
+def generate(db_manager, youths=1000, days=30, seed=0, **options):
+    """在 db_manager 的（空）数据库中生成模拟数据，返回各表写入的行数"""
+    return SampleDataGenerator(db_manager, youths, days, seed, **options).generate()
+
+
+def main(argv=None):
+    from .db_manager import DatabaseManager
+
+    parser = argparse.ArgumentParser(prog='python -m database.sample_data', description='生成模拟数据')
+    parser.add_argument('database', help='数据库路径（应为新文件）')
+    parser.add_argument('--youths', type=int, default=1000, help='青年人数')
+    parser.add_argument('--days', type=int, default=30, help='每日情况统计的天数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--start-date', default=DEFAULT_START_DATE, help='第一天的日期')
+    parser.add_argument('--anomaly-rate', type=float, default=0.05, help='异常记录比例')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    db_manager = DatabaseManager(args.database)
+    try:
+        counts = generate(db_manager, args.youths, args.days, args.seed,
+                          start_date=args.start_date, anomaly_rate=args.anomaly_rate)
+    except ValueError as e:
+        print(f"生成数据出错: {e}")
+        return 1
+    finally:
+        db_manager.close()
+    for table_name, count in counts.items():
+        print(f"{table_name}: {count} 行")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
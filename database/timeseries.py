@@ -0,0 +1,73 @@
+"""
+多名青年的异常时间序列
+
+按身份证号列表和日期范围一次查询 exception_statistics，为每个指标生成按日期对齐的
+稠密数组（青年 × 日期，异常为1，否则为0），个人、班、连的异常趋势图都只需一次调用；
+单位的趋势对各青年的行求和即可。
+安装了 NumPy 时返回二维 numpy 数组（int8），否则每名青年一个 array('b')，
+两种结果都可以按 matrix[青年][日期] 读取。
+
+身份证号列表作为一个 JSON 参数传入（json_each），不受SQL参数个数的限制；
+查询按 exception_statistics 的主键逐名青年查找，不扫描全表。
+"""
+import json
+from array import array
+from datetime import date, timedelta
+
+from .exception_statistics import ABNORMAL, SOURCE_LABELS, STATUS_COLUMNS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# 指标 -> 取值表达式（exception_statistics 别名为 e）；total 为当天是否有任一异常
+DIMENSIONS = {'total': '1'}
+DIMENSIONS.update((column, f"e.{column} = '{ABNORMAL}'") for column in STATUS_COLUMNS)
+DIMENSIONS.update((source, f"COALESCE(e.exception_sources LIKE '%{label}%', 0)")
+                  for source, label in SOURCE_LABELS.items())
+
+
+def select_sql(dimensions, where):
+    """查询各青年在范围内的异常记录，第一个参数为身份证号的 JSON 数组
+
+    结果为 (身份证号在列表中的下标, 规范日期, 各指标取值...)
+    """
+    values = ', '.join(DIMENSIONS[dimension] for dimension in dimensions)
+    return (f"SELECT j.key, e.date_iso, {values} "
+            # CROSS JOIN 固定以身份证号列表为外层，按主键逐名青年查找
+            f"FROM json_each(?) j CROSS JOIN exception_statistics e "
+            f"WHERE e.id_card = j.value AND {where}")
+
+
+def id_cards_param(id_cards):
+    return json.dumps([str(id_card) for id_card in id_cards])
+
+
+def date_axis(start_date, end_date):
+    """[start_date, end_date] 的每一天（YYYY-MM-DD）"""
+    first = date.fromisoformat(start_date)
+    days = (date.fromisoformat(end_date) - first).days + 1
+    return [(first + timedelta(days=offset)).isoformat() for offset in range(max(days, 0))]
+
+
+def _zeros(rows, columns):
+    if numpy is not None:
+        return numpy.zeros((rows, columns), dtype=numpy.int8)
+    return [array('b', bytes(columns)) for _ in range(rows)]
+
+
+def dense_arrays(rows, youth_count, dates, dimensions):
+    """把查询结果填入 {指标: 青年数 × 日期数的数组}"""
+    positions = {day: index for index, day in enumerate(dates)}
+    series = {dimension: _zeros(youth_count, len(dates)) for dimension in dimensions}
+    for row in rows:
+        column = positions.get(row[1])
+        if column is None:
+            continue
+        youth = row[0]
+        for offset, dimension in enumerate(dimensions, 2):
+            if row[offset]:
+                series[dimension][youth][column] = 1
+    return series
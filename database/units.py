@@ -0,0 +1,131 @@
+"""
+单位层级
+
+应征地、连、排、班在 youth 表中是录入的文本。unit 表把它们组织成
+应征地 -> 连 -> 排 -> 班 四级节点，每个节点有整数 id，youth.unit_id 指向所在的班节点。
+youth 的单位文本字段仍是录入来源，unit 表和 unit_id 由触发器在写入时维护。
+班节点上记录了各级上级节点的 id，某个单位下的青年按上级 id 等值查询即可，
+不再对 youth 表逐行做 LIKE 匹配。
+"""
+
+
+# 层级对应的 youth 字段，下标即层级（0 为应征地，3 为班）
+LEVELS = ('recruitment_place', 'company', 'platoon', 'squad')
+# 班节点上各级上级节点的字段（班本身为 id）
+ANCESTOR_COLUMNS = ('place_id', 'company_id', 'platoon_id', 'id')
+SQUAD_LEVEL = len(LEVELS) - 1
+
+# 查询中各级节点的表别名
+_ALIASES = ('up', 'uc', 'ut', 'us')
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS unit (
+        id INTEGER PRIMARY KEY,
+        parent_id INTEGER NOT NULL DEFAULT 0,
+        level INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        place_id INTEGER,
+        company_id INTEGER,
+        platoon_id INTEGER,
+        UNIQUE (parent_id, name)
+    )
+'''
+
+INDEX_SQL = [
+    "CREATE INDEX IF NOT EXISTS idx_unit_place ON unit(place_id)",
+    "CREATE INDEX IF NOT EXISTS idx_unit_company ON unit(company_id)",
+    "CREATE INDEX IF NOT EXISTS idx_unit_platoon ON unit(platoon_id)",
+    "CREATE INDEX IF NOT EXISTS idx_youth_unit ON youth(unit_id)",
+]
+
+
+def _node_sql(names, level):
+    """按各级名称查找第 level 级节点 id 的子查询"""
+    parent = '0' if level == 0 else _node_sql(names, level - 1)
+    return f"(SELECT id FROM unit WHERE parent_id = {parent} AND name = {names[level]})"
+
+
+def ensure_path_sql(names):
+    """逐级补齐节点的语句，names 为各级名称的SQL表达式"""
+    statements = [f"INSERT OR IGNORE INTO unit (parent_id, level, name) VALUES (0, 0, {names[0]})"]
+    for level in range(1, len(LEVELS)):
+        # 上级字段：更高层级沿用父节点的值，父节点这一级取父节点 id
+        ancestors = [f"p.{ANCESTOR_COLUMNS[index]}" for index in range(level - 1)] + ['p.id']
+        columns = ', '.join(ANCESTOR_COLUMNS[:level])
+        statements.append(
+            f"INSERT OR IGNORE INTO unit (parent_id, level, name, {columns}) "
+            f"SELECT p.id, {level}, {names[level]}, {', '.join(ancestors)} "
+            f"FROM unit p WHERE p.id = {_node_sql(names, level - 1)}")
+    return statements
+
+
+def trigger_sql():
+    """youth 写入单位字段时补齐节点并更新 unit_id"""
+    names = [f"IFNULL(NEW.{column}, '')" for column in LEVELS]
+    body = '; '.join(ensure_path_sql(names) + [
+        f"UPDATE youth SET unit_id = {_node_sql(names, SQUAD_LEVEL)} WHERE rowid = NEW.rowid"])
+    changed = ' OR '.join(f"NEW.{column} IS NOT OLD.{column}" for column in LEVELS)
+    return [
+        ('trg_youth_unit_ins',
+         f"CREATE TRIGGER IF NOT EXISTS trg_youth_unit_ins AFTER INSERT ON youth BEGIN {body}; END"),
+        ('trg_youth_unit_upd',
+         f"CREATE TRIGGER IF NOT EXISTS trg_youth_unit_upd AFTER UPDATE OF {', '.join(LEVELS)} ON youth "
+         f"WHEN {changed} OR NEW.unit_id IS NULL BEGIN {body}; END"),
+    ]
+
+
+def backfill_sql():
+    """为已有数据补齐节点（按 youth 中每种单位组合执行，参数为各级名称）和 unit_id"""
+    params = [f":{column}" for column in LEVELS]
+    names = [f"IFNULL(youth.{column}, '')" for column in LEVELS]
+    return ensure_path_sql(params), f"UPDATE youth SET unit_id = {_node_sql(names, SQUAD_LEVEL)}"
+
+
+def _squads_sql(levels, select='us.id'):
+    """从班节点联接所需的上级节点"""
+    joins = [f"SELECT {select} FROM unit us"]
+    for level in sorted(set(levels)):
+        if level < SQUAD_LEVEL:
+            alias = _ALIASES[level]
+            joins.append(f"JOIN unit {alias} ON {alias}.id = us.{ANCESTOR_COLUMNS[level]}")
+    return ' '.join(joins)
+
+
+def _name_conditions(values, exact):
+    conditions = []
+    params = []
+    levels = []
+    for level, value in enumerate(values):
+        if value is None or value == '':
+            continue
+        levels.append(level)
+        if exact:
+            conditions.append(f"{_ALIASES[level]}.name = ?")
+            params.append(value)
+        else:
+            conditions.append(f"{_ALIASES[level]}.name LIKE ?")
+            params.append(f'%{value}%')
+    return levels, conditions, params
+
+
+def filter_sql(alias, values, exact=False):
+    """按各级名称筛选青年（alias 为 youth 表的别名），没有有效条件时返回None
+
+    values 为 (应征地, 连, 排, 班)；exact 为 False 时名称按包含匹配。
+    """
+    levels, conditions, params = _name_conditions(values, exact)
+    if not conditions:
+        return None
+    sql = (f"{alias}.unit_id IN ({_squads_sql(levels)} "
+           f"WHERE us.level = {SQUAD_LEVEL} AND {' AND '.join(conditions)})")
+    return sql, params
+
+
+def options_sql(level, values):
+    """第 level 级中有青年的单位名称，values 为各上级名称（空值表示不限，按名称相等匹配）"""
+    levels, conditions, params = _name_conditions(values, exact=True)
+    conditions.insert(0, f"{_ALIASES[level]}.name != ''")
+    sql = (f"{_squads_sql(levels + [level], select=f'DISTINCT {_ALIASES[level]}.name')} "
+           f"WHERE us.level = {SQUAD_LEVEL} AND {' AND '.join(conditions)} "
+           f"AND EXISTS (SELECT 1 FROM youth WHERE youth.unit_id = us.id)")
+    return sql, params
@@ -0,0 +1,131 @@
+"""
+青年目录
+
+身份证号 -> (青年 id, 姓名, 性别, 单位) 的内存索引，用一条查询整体加载，
+导入校验、下拉选项等按身份证号查找青年时不再逐条查询数据库。
+
+数据按身份证号排序存放在几个平行数组中，按二分查找定位：
+id 为 array('q')；性别和单位（应征地、连、排、班）取值很少，
+只保存一份取值表，各行记录取值的下标。
+目录记录加载时 change_log 中 youth 最近一次变更的序号，youth 被修改
+（包括其他程序的修改）或切换到归档库后，下一次访问时重新加载。
+事务中加载的内容不保留：回滚后序号会被重新分配，无法据此判断内容是否过期。
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+from .changelog import LATEST_SEQ_SQL
+
+
+LOAD_SQL = '''
+    SELECT id_card, id, name, gender, recruitment_place, company, platoon, squad
+    FROM youth WHERE id IS NOT NULL
+'''
+
+
+class _Snapshot:
+    """某一时刻的目录内容，加载后不再修改，各线程可同时读取"""
+
+    def __init__(self, rows):
+        rows = sorted(rows)
+        genders = {}
+        units = {}
+        self.id_cards = [row[0] for row in rows]
+        self.ids = array('q', (row[1] for row in rows))
+        self.names = [row[2] for row in rows]
+        self.gender_codes = array('H', (genders.setdefault(row[3], len(genders)) for row in rows))
+        self.unit_codes = array('L', (units.setdefault(row[4:8], len(units)) for row in rows))
+        self.genders = tuple(genders)
+        self.units = tuple(units)
+        self.sorted_ids = array('q', sorted(self.ids))
+        self._by_name = None
+
+    def index(self, id_card):
+        id_card = str(id_card)
+        position = bisect_left(self.id_cards, id_card)
+        if position < len(self.id_cards) and self.id_cards[position] == id_card:
+            return position
+        return None
+
+    def entry(self, position):
+        return (self.ids[position], self.names[position],
+                self.genders[self.gender_codes[position]], self.units[self.unit_codes[position]])
+
+    def by_name(self):
+        """按姓名排序的下标（与 ORDER BY name 一致，NULL 在前）"""
+        if self._by_name is None:
+            names = self.names
+            self._by_name = array('L', sorted(range(len(names)),
+                                              key=lambda i: (names[i] is not None, names[i] or '')))
+        return self._by_name
+
+
+class YouthDirectory:
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._lock = threading.Lock()
+        # (连接管理器, youth 最近变更序号, 目录内容)
+        self._state = None
+
+    def _snapshot(self):
+        connections = self.db_manager.connections
+        conn = self.db_manager.get_connection()
+        try:
+            version = conn.execute(LATEST_SEQ_SQL, ('youth',)).fetchone()[0]
+            state = self._state
+            if state is not None and state[0] is connections and state[1] == version:
+                return state[2]
+            with self._lock:
+                state = self._state
+                if state is not None and state[0] is connections and state[1] == version:
+                    return state[2]
+                snapshot = _Snapshot(conn.execute(LOAD_SQL).fetchall())
+                if not conn.in_transaction:
+                    self._state = (connections, version, snapshot)
+                return snapshot
+        finally:
+            conn.close()
+
+    def invalidate(self):
+        """丢弃已加载的内容（外部程序修改了数据库时使用）"""
+        with self._lock:
+            self._state = None
+
+    def __len__(self):
+        return len(self._snapshot().id_cards)
+
+    def __contains__(self, id_card):
+        return self._snapshot().index(id_card) is not None
+
+    def get(self, id_card):
+        """(青年 id, 姓名, 性别, (应征地, 连, 排, 班))，不存在时返回None"""
+        snapshot = self._snapshot()
+        position = snapshot.index(id_card)
+        return None if position is None else snapshot.entry(position)
+
+    def youth_id(self, id_card):
+        snapshot = self._snapshot()
+        position = snapshot.index(id_card)
+        return None if position is None else snapshot.ids[position]
+
+    def lookup(self, id_cards):
+        """批量查找：{身份证号: (青年 id, 姓名, 性别, 单位)}，只包含存在的青年"""
+        snapshot = self._snapshot()
+        found = {}
+        for id_card in id_cards:
+            position = snapshot.index(id_card)
+            if position is not None:
+                found[id_card] = snapshot.entry(position)
+        return found
+
+    def has_youth_id(self, youth_id):
+        sorted_ids = self._snapshot().sorted_ids
+        position = bisect_left(sorted_ids, youth_id)
+        return position < len(sorted_ids) and sorted_ids[position] == youth_id
+
+    def options(self):
+        """按姓名排序的 (身份证号, 姓名, 性别)，用于选择青年的下拉框"""
+        snapshot = self._snapshot()
+        return [(snapshot.id_cards[i], snapshot.names[i], snapshot.genders[snapshot.gender_codes[i]])
+                for i in snapshot.by_name()]
@@ -1,26 +1,47 @@
 """
 一人一策记录本 - 主程序入口
 """
+import logging
 import sys
 from PyQt5.QtWidgets import QApplication
+from config import LOG_FILE, LOG_LEVEL, PROFILE_FILE, PROFILE_QUERIES, SLOW_QUERY_MS
 from database.db_manager import DatabaseManager
+from database.profiler import QueryProfiler
 from services.auth_service import AuthService
 from services.import_service import ImportService
 from services.export_service import ExportService
+from services.backup_service import BackupService
+from services.query_executor import QueryExecutor
 from ui.login_window import LoginWindow
 from ui.main_window import MainWindow
 
 
+def setup_logging():
+    """按配置把日志写入日志文件"""
+    handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(handler)
+
+
 class Application:
     def __init__(self):
         self.app = QApplication(sys.argv)
         self.app.setStyle('Fusion')
+        setup_logging()
         
         # 初始化服务
         self.db_manager = DatabaseManager()
+        self.profiler = None
+        if PROFILE_QUERIES:
+            self.profiler = QueryProfiler(SLOW_QUERY_MS)
+            self.profiler.attach(self.db_manager)
         self.auth_service = AuthService(self.db_manager)
         self.import_service = ImportService(self.db_manager)
         self.export_service = ExportService(self.db_manager)
+        self.query_executor = QueryExecutor(self.db_manager)
+        self.backup_service = BackupService(self.db_manager, compress=True)
         
         self.login_window = None
         self.main_window = None
@@ -28,7 +49,13 @@ class Application:
     def run(self):
         """运行应用"""
         self.show_login()
-        sys.exit(self.app.exec_())
+        exit_code = self.app.exec_()
+        # 先等待后台查询结束，再关闭数据库
+        self.query_executor.shutdown()
+        if self.profiler is not None:
+            self.profiler.export_json(PROFILE_FILE)
+        self.db_manager.close()
+        sys.exit(exit_code)
     
     def show_login(self):
         """显示登录窗口"""
@@ -42,7 +69,9 @@ class Application:
             self.db_manager,
             self.import_service,
             self.export_service,
-            user
+            user,
+            self.query_executor,
+            self.backup_service
         )
         self.main_window.show()
 
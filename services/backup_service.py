@@ -0,0 +1,167 @@
+"""
+数据库在线备份服务
+
+使用 sqlite3 的在线备份接口复制数据库，每步只复制有限的页数，步与步之间
+让出数据库锁，程序运行时也可以备份，不需要关闭程序复制数据库文件。
+备份保存为带时间戳的快照，只保留最近的若干份，可选 gzip 压缩；
+每份快照写完后对副本执行 PRAGMA integrity_check，校验不通过的不保留。
+
+图片文件按内容寻址保存，备份目录下的 blobs 目录由各快照共用，
+每次只复制新增的图片文件。
+
+用法：
+    service = BackupService(db_manager, keep=7, compress=True)
+    path = service.backup()
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from database.blob_store import BlobStore
+
+
+BACKUP_FOLDER = 'backups'
+SNAPSHOT_PREFIX = 'youth_records_'
+SNAPSHOT_SUFFIXES = ('.db', '.db.gz')
+# 每步复制的页数和步间休眠秒数：页数越小，对界面和写入的影响越小
+PAGES_PER_STEP = 256
+STEP_SLEEP = 0.005
+DEFAULT_KEEP = 7
+
+
+class BackupService:
+    def __init__(self, db_manager, backup_dir=None, keep=DEFAULT_KEEP, compress=False,
+                 pages_per_step=PAGES_PER_STEP):
+        self.db_manager = db_manager
+        if backup_dir is None:
+            backup_dir = os.path.join(os.path.dirname(os.path.abspath(db_manager.db_path)), BACKUP_FOLDER)
+        self.backup_dir = backup_dir
+        self.blob_backup = BlobStore(os.path.join(backup_dir, 'blobs'))
+        self.keep = keep
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+
+    def backup(self, progress=None):
+        """备份数据库并返回快照路径
+
+        progress(已复制页数, 总页数) 在每步复制后调用（在执行备份的线程中）。
+        """
+        if self.db_manager.db_path == ':memory:':
+            raise ValueError('内存数据库不能备份')
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = SNAPSHOT_PREFIX + datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+        fd, temp_path = tempfile.mkstemp(dir=self.backup_dir, suffix='.tmp')
+        os.close(fd)
+        try:
+            self._copy_database(temp_path, progress)
+            result = self.verify(temp_path)
+            if result != 'ok':
+                raise ValueError(f'备份副本校验不通过: {result}')
+            if self.compress:
+                path = os.path.join(self.backup_dir, name + '.db.gz')
+                with open(temp_path, 'rb') as src, gzip.open(path + '.tmp', 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                os.replace(path + '.tmp', path)
+            else:
+                path = os.path.join(self.backup_dir, name + '.db')
+                os.replace(temp_path, path)
+        finally:
+            for leftover in (temp_path, temp_path + '-journal', temp_path + '-wal', temp_path + '-shm'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        self._copy_blobs()
+        self.rotate()
+        return path
+
+    def _copy_database(self, target_path, progress):
+        # 使用独立连接读取，不占用界面线程和后台查询的连接
+        source = sqlite3.connect(self.db_manager.db_path, timeout=30)
+        target = sqlite3.connect(target_path)
+
+        def on_step(status, remaining, total):
+            if progress is not None:
+                progress(total - remaining, total)
+
+        try:
+            source.backup(target, pages=self.pages_per_step, progress=on_step, sleep=STEP_SLEEP)
+            # 副本改回回滚日志模式，快照是单个文件，只读打开时不需要 -wal/-shm 文件
+            target.execute('PRAGMA journal_mode=DELETE')
+        finally:
+            target.close()
+            source.close()
+
+    def _copy_blobs(self):
+        """复制备份目录中还没有的图片文件"""
+        store = self.db_manager.blob_store
+        copied = 0
+        for blob_hash in store.iter_hashes():
+            if self.blob_backup.exists(blob_hash):
+                continue
+            target = self.blob_backup.path_for(blob_hash)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(store.path_for(blob_hash), target + '.tmp')
+            os.replace(target + '.tmp', target)
+            copied += 1
+        return copied
+
+    def verify(self, path):
+        """对快照执行 PRAGMA integrity_check，通过时返回 'ok'，否则返回问题描述"""
+        if not path.endswith('.gz'):
+            return self._integrity_check(path)
+        fd, temp_path = tempfile.mkstemp(dir=self.backup_dir, suffix='.tmp')
+        try:
+            try:
+                with os.fdopen(fd, 'wb') as dst, gzip.open(path, 'rb') as src:
+                    shutil.copyfileobj(src, dst)
+            except (OSError, EOFError) as e:
+                return f'解压失败: {e}'
+            return self._integrity_check(temp_path)
+        finally:
+            os.remove(temp_path)
+
+    @staticmethod
+    def _integrity_check(path):
+        try:
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+            try:
+                rows = conn.execute('PRAGMA integrity_check').fetchall()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError as e:
+            return str(e)
+        return '; '.join(str(row[0]) for row in rows)
+
+    def list_backups(self):
+        """已有快照的路径，按时间从新到旧排列"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = [name for name in os.listdir(self.backup_dir)
+                 if name.startswith(SNAPSHOT_PREFIX) and name.endswith(SNAPSHOT_SUFFIXES)]
+        # 文件名中的时间戳按字典序即按时间排序
+        return [os.path.join(self.backup_dir, name) for name in sorted(names, reverse=True)]
+
+    def latest_backup_time(self):
+        """最近一次快照的修改时间（时间戳），没有快照时返回None"""
+        backups = self.list_backups()
+        return os.path.getmtime(backups[0]) if backups else None
+
+    def is_due(self, interval_hours=24):
+        """距离最近一次快照超过 interval_hours 小时时返回True"""
+        latest = self.latest_backup_time()
+        return latest is None or time.time() - latest >= interval_hours * 3600
+
+    def rotate(self):
+        """只保留最近 keep 份快照，返回删除的快照路径"""
+        removed = []
+        for path in self.list_backups()[self.keep:]:
+            try:
+                os.remove(path)
+                removed.append(path)
+            except OSError as e:
+                print(f"删除旧备份出错: {e}")
+        return removed
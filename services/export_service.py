@@ -371,7 +371,7 @@ class ExportService:
             y_position -= 0.8*cm
             
             cursor.execute('''
-                SELECT id, interview_date, thoughts, spirit, visit_survey_image
+                SELECT id, interview_date, thoughts, spirit
                 FROM town_interview 
                 WHERE youth_id_card = ?
                 ORDER BY interview_date DESC
@@ -396,14 +396,15 @@ class ExportService:
                     y_position -= 0.5*cm
                     
                     # 处理图片
-                    if record[4]:  # visit_survey_image
+                    image_data = self.db_manager.get_town_interview_image(record[0])
+                    if image_data:
                         try:
                             image_filename = f"镇街谈心谈话_{youth.name}_{record[0]}.jpg"
                             image_path = os.path.join(images_dir, image_filename)
                             
                             # 保存图片到文件（作为备份）
                             with open(image_path, 'wb') as img_file:
-                                img_file.write(record[4])
+                                img_file.write(image_data)
                             
                             # 在PDF中直接插入图片
                             c.drawString(3*cm, y_position, "图片:")
@@ -421,7 +422,7 @@ class ExportService:
                                 from io import BytesIO
                                 
                                 # 从BLOB数据创建图片对象
-                                img_data = BytesIO(record[4])
+                                img_data = BytesIO(image_data)
                                 img = ImageReader(img_data)
                                 
                                 # 获取图片尺寸并计算合适的显示尺寸
@@ -486,7 +487,7 @@ class ExportService:
             y_position -= 0.8*cm
             
             cursor.execute('''
-                SELECT id, interview_date, thoughts, spirit, visit_survey_image
+                SELECT id, interview_date, thoughts, spirit
                 FROM leader_interview 
                 WHERE youth_id_card = ?
                 ORDER BY interview_date DESC
@@ -511,14 +512,15 @@ class ExportService:
                     y_position -= 0.5*cm
                     
                     # 处理图片
-                    if record[4]:  # visit_survey_image
+                    image_data = self.db_manager.get_leader_interview_image(record[0])
+                    if image_data:
                         try:
                             image_filename = f"领导谈心谈话_{youth.name}_{record[0]}.jpg"
                             image_path = os.path.join(images_dir, image_filename)
                             
                             # 保存图片到文件（作为备份）
                             with open(image_path, 'wb') as img_file:
-                                img_file.write(record[4])
+                                img_file.write(image_data)
                             
                             # 在PDF中直接插入图片
                             c.drawString(3*cm, y_position, "图片:")
@@ -536,7 +538,7 @@ class ExportService:
                                 from io import BytesIO
                                 
                                 # 从BLOB数据创建图片对象
-                                img_data = BytesIO(record[4])
+                                img_data = BytesIO(image_data)
                                 img = ImageReader(img_data)
                                 
                                 # 获取图片尺寸并计算合适的显示尺寸
@@ -83,20 +83,13 @@ class ImportService:
             if not valid_data:
                 return 0, "没有有效的数据可以导入"
             
-            # 第二步：批量检查重复数据（一次数据库查询）
+            # 第二步：按青年目录检查重复数据
             conn = self.db_manager.get_connection()
             cursor = conn.cursor()
             
-            # 构建批量查询的身份证号列表
             id_cards = [data[1][0] for data in valid_data if data[1][0]]  # 提取所有身份证号
-            
-            if id_cards:
-                # 使用IN查询批量检查重复
-                placeholders = ','.join(['?' for _ in id_cards])
-                cursor.execute(f'SELECT id_card, name FROM youth WHERE id_card IN ({placeholders})', id_cards)
-                existing_youth_dict = {row[0]: row[1] for row in cursor.fetchall()}
-            else:
-                existing_youth_dict = {}
+            existing_youth_dict = {id_card: youth[1]
+                                   for id_card, youth in self.db_manager.youth_directory.lookup(id_cards).items()}
             
             # 分离新数据和重复数据
             new_data = []
@@ -240,12 +233,9 @@ class ImportService:
                     continue
                 
                 # 根据身份证号查找youth_id
-                cursor.execute("SELECT id FROM youth WHERE id_card=?", (row[0],))
-                result = cursor.fetchone()
-                if not result:
+                youth_id = self.db_manager.youth_directory.youth_id(row[0])
+                if youth_id is None:
                     continue
-                
-                youth_id = result[0]
                 cursor.execute('''
                     INSERT INTO abnormal_stat (youth_id, abnormal_type, description,
                                               record_date, handler, status)
@@ -273,12 +263,9 @@ class ImportService:
                 if not row[0]:
                     continue
                 
-                cursor.execute("SELECT id FROM youth WHERE id_card=?", (row[0],))
-                result = cursor.fetchone()
-                if not result:
+                youth_id = self.db_manager.youth_directory.youth_id(row[0])
+                if youth_id is None:
                     continue
-                
-                youth_id = result[0]
                 cursor.execute('''
                     INSERT INTO health_screening (youth_id, screening_type, result,
                                                  screening_date, follow_up)
@@ -339,10 +326,9 @@ class ImportService:
                         continue
                     
                     # 验证2：检查此人是否在基本信息库中存在
-                    cursor.execute('SELECT COUNT(*) FROM youth WHERE id_card = ?', (id_card,))
-                    exists_in_youth = cursor.fetchone()[0] > 0
+                    youth = self.db_manager.youth_directory.get(id_card)
                     
-                    if not exists_in_youth:
+                    if youth is None:
                         error_rows.append(f"第{row_num}行 ({name}, {id_card}): 此人在基本信息库中不存在")
                         continue
                     
@@ -358,16 +344,7 @@ class ImportService:
                         continue
                     
                     # 从基本信息中获取应征地、连、排、班
-                    cursor.execute("""
-                        SELECT recruitment_place, company, platoon, squad 
-                        FROM youth WHERE id_card = ?
-                    """, (id_card,))
-                    youth_info = cursor.fetchone()
-                    
-                    recruitment_place = youth_info[0] if youth_info and youth_info[0] else ''
-                    company = youth_info[1] if youth_info and youth_info[1] else ''
-                    platoon = youth_info[2] if youth_info and youth_info[2] else ''
-                    squad = youth_info[3] if youth_info and youth_info[3] else ''
+                    recruitment_place, company, platoon, squad = (value or '' for value in youth[3])
                     
                     # 插入病史筛查记录
                     cursor.execute('''
@@ -419,13 +396,12 @@ class ImportService:
             updated_count = 0
             skipped_count = 0
             error_rows = []
-            duplicate_records = []  # 存储重复的记录
             
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
+            youth_directory = self.db_manager.youth_directory
             
-            # 第一遍：收集所有数据并检查重复
+            # 第一遍：收集所有数据
             valid_data = []
+            row_info = {}  # (youth_id, record_date) -> (行号, 姓名)
             for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
                 if not row or not any(row):  # 跳过完全空行
                     continue
@@ -458,15 +434,11 @@ class ImportService:
                         continue
                     
                     # 数据校验：检查此人是否在基本信息库中存在
-                    cursor.execute('SELECT id FROM youth WHERE id_card = ?', (id_card,))
-                    youth_result = cursor.fetchone()
-                    
-                    if not youth_result:
+                    youth_id = youth_directory.youth_id(id_card)
+                    if youth_id is None:
                         error_rows.append(f"第{row_num}行 ({name}, {id_card}): 此人在基本信息库中不存在，无法导入")
                         continue
                     
-                    youth_id = youth_result[0]
-                    
                     # 日期处理：如果为空则使用系统当前日期
                     if not record_date:
                         from datetime import datetime
@@ -484,73 +456,41 @@ class ImportService:
                     if not management:
                         management = '正常'
                     
-                    # 检查是否已存在相同日期的记录
-                    cursor.execute('''
-                        SELECT id FROM daily_stat 
-                        WHERE youth_id = ? AND record_date = ?
-                    ''', (youth_id, record_date))
-                    
-                    existing_record = cursor.fetchone()
-                    if existing_record:
-                        duplicate_records.append({
-                            'row_num': row_num,
-                            'name': name,
-                            'youth_id': youth_id,
-                            'record_date': record_date,
-                            'data': (mood, physical_condition, mental_state, training, management, notes, youth_id, record_date)
-                        })
-                    else:
-                        valid_data.append({
-                            'row_num': row_num,
-                            'data': (youth_id, record_date, mood, physical_condition, mental_state, training, management, notes)
-                        })
+                    valid_data.append({
+                        'youth_id': youth_id, 'record_date': record_date, 'mood': mood,
+                        'physical_condition': physical_condition, 'mental_state': mental_state,
+                        'training': training, 'management': management, 'notes': notes,
+                    })
+                    row_info[(youth_id, record_date)] = (row_num, name)
                     
                 except Exception as e:
                     error_rows.append(f"第{row_num}行: {str(e)}")
                     continue
             
-            # 第二步：询问用户如何处理重复数据
-            overwrite_choice = None
-            if duplicate_records:
-                overwrite_choice = self._ask_overwrite_duplicates_daily(duplicate_records)
+            # 第二步：批量写入；有重复数据时不写入，询问用户如何处理后再写入
+            try:
+                result = self.db_manager.bulk_upsert('daily_stat', valid_data, 'report')
+                duplicate_records = []
+                for dup in result['conflicts']:
+                    row_num, name = row_info[(dup['youth_id'], dup['record_date'])]
+                    duplicate_records.append({'row_num': row_num, 'name': name, 'record_date': dup['record_date']})
                 
-                if overwrite_choice == 'cancel':
-                    conn.close()
-                    return 0, '用户取消导入操作'
-            
-            # 第三步：插入新数据
-            for item in valid_data:
-                try:
-                    cursor.execute('''
-                        INSERT INTO daily_stat (youth_id, record_date, mood, physical_condition, 
-                                              mental_state, training, management, notes)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', item['data'])
-                    imported_count += 1
-                except Exception as e:
-                    error_rows.append(f"第{item['row_num']}行: 插入失败 - {str(e)}")
-            
-            # 第四步：处理重复数据
-            if duplicate_records:
-                if overwrite_choice == 'overwrite_all':
-                    # 逐条更新重复数据
-                    for dup in duplicate_records:
-                        try:
-                            cursor.execute('''
-                                UPDATE daily_stat SET
-                                    mood=?, physical_condition=?, mental_state=?, training=?, management=?, notes=?
-                                WHERE youth_id=? AND record_date=?
-                            ''', dup['data'])
-                            updated_count += 1
-                        except Exception as e:
-                            error_rows.append(f"第{dup['row_num']}行: 更新失败 - {str(e)}")
-                elif overwrite_choice == 'skip_all':
-                    skipped_count = len(duplicate_records)
-                    for dup in duplicate_records:
-                        error_rows.append(f"第{dup['row_num']}行 ({dup['name']}): 该人员在 {dup['record_date']} 已有记录，跳过导入")
-            
-            conn.commit()
-            conn.close()
+                if duplicate_records:
+                    overwrite_choice = self._ask_overwrite_duplicates_daily(duplicate_records)
+                    if overwrite_choice == 'cancel':
+                        return 0, '用户取消导入操作'
+                    
+                    policy = 'overwrite' if overwrite_choice == 'overwrite_all' else 'skip'
+                    result = self.db_manager.bulk_upsert('daily_stat', valid_data, policy)
+                    if policy == 'skip':
+                        for dup in duplicate_records:
+                            error_rows.append(f"第{dup['row_num']}行 ({dup['name']}): 该人员在 {dup['record_date']} 已有记录，跳过导入")
+                
+                imported_count = result['inserted']
+                updated_count = result['updated']
+                skipped_count = result['skipped']
+            except Exception as e:
+                error_rows.append(f"写入数据库失败: {str(e)}")
             
             # 构建结果消息
             result_parts = []
@@ -649,57 +589,13 @@ class ImportService:
             updated_count = 0
             skipped_count = 0
             error_rows = []
-            duplicate_records = []  # 存储重复的记录
             
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
+            # 按青年目录校验身份证号，不再逐行查询
+            youth_directory = self.db_manager.youth_directory
             
-            # 第一遍：检查所有数据，找出重复记录
-            for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
-                if not row or not any(row):
-                    continue
-                
-                try:
-                    def safe_get_cell_value(row, index):
-                        if len(row) > index and row[index] is not None:
-                            return str(row[index]).strip()
-                        return ''
-                    
-                    name = safe_get_cell_value(row, 1)
-                    id_card = safe_get_cell_value(row, 3)
-                    assessment_date = safe_get_cell_value(row, 8)
-                    
-                    if not name or not id_card:
-                        continue
-                    
-                    # 日期处理
-                    if not assessment_date:
-                        from datetime import datetime
-                        assessment_date = datetime.now().strftime('%Y-%m-%d')
-                    
-                    # 检查是否已存在
-                    existing_id = self.db_manager.check_political_assessment_exists(id_card, name, assessment_date)
-                    if existing_id:
-                        duplicate_records.append({
-                            'row_num': row_num,
-                            'name': name,
-                            'id_card': id_card,
-                            'date': assessment_date,
-                            'row_data': row
-                        })
-                except Exception as e:
-                    continue
-            
-            # 如果有重复记录，询问用户如何处理
-            overwrite_choice = None
-            if duplicate_records:
-                overwrite_choice = self._ask_overwrite_duplicates_political(duplicate_records)
-                
-                if overwrite_choice == 'cancel':
-                    conn.close()
-                    return 0, '用户取消导入操作'
-            
-            # 第二遍：执行导入
+            # 第一遍：收集所有数据
+            valid_data = []
+            row_info = {}  # (身份证号, 日期) -> 行号
             for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
                 if not row or not any(row):
                     continue
@@ -729,10 +625,7 @@ class ImportService:
                         error_rows.append(f"第{row_num}行 ({name}): 公民身份号码错误，必须是18位")
                         continue
                     
-                    cursor.execute('SELECT COUNT(*) FROM youth WHERE id_card = ?', (id_card,))
-                    exists_in_youth = cursor.fetchone()[0] > 0
-                    
-                    if not exists_in_youth:
+                    if id_card not in youth_directory:
                         error_rows.append(f"第{row_num}行 ({name}, {id_card}): 此人在基本信息库中不存在")
                         continue
                     
@@ -740,41 +633,41 @@ class ImportService:
                         from datetime import datetime
                         assessment_date = datetime.now().strftime('%Y-%m-%d')
                     
-                    # 检查是否是重复记录
-                    existing_id = self.db_manager.check_political_assessment_exists(id_card, name, assessment_date)
-                    
-                    if existing_id:
-                        # 根据用户选择处理重复记录
-                        if overwrite_choice == 'overwrite_all':
-                            # 覆盖更新
-                            success = self.db_manager.update_political_assessment_by_unique_key(
-                                id_card, name, assessment_date, family_member_info, visit_survey,
-                                political_assessment, key_attention, thoughts, spirit
-                            )
-                            if success:
-                                updated_count += 1
-                        elif overwrite_choice == 'skip_all':
-                            # 跳过
-                            skipped_count += 1
-                            continue
-                    else:
-                        # 插入新记录
-                        cursor.execute('''
-                            INSERT INTO political_assessment (youth_id_card, name, gender, id_card,
-                                                            family_member_info, visit_survey, political_assessment,
-                                                            key_attention, assessment_date, thoughts, spirit)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (id_card, name, gender, id_card, family_member_info, visit_survey,
-                              political_assessment, key_attention, assessment_date, thoughts, spirit))
-                        
-                        imported_count += 1
+                    valid_data.append({
+                        'youth_id_card': id_card, 'name': name, 'gender': gender, 'id_card': id_card,
+                        'family_member_info': family_member_info, 'visit_survey': visit_survey,
+                        'political_assessment': political_assessment, 'key_attention': key_attention,
+                        'assessment_date': assessment_date, 'thoughts': thoughts, 'spirit': spirit,
+                    })
+                    row_info[(id_card, assessment_date)] = row_num
                     
                 except Exception as e:
                     error_rows.append(f"第{row_num}行: {str(e)}")
                     continue
             
-            conn.commit()
-            conn.close()
+            # 第二遍：批量写入；有重复记录时不写入，询问用户如何处理后再写入
+            try:
+                result = self.db_manager.bulk_upsert('political_assessment', valid_data, 'report')
+                duplicate_records = [{
+                    'row_num': row_info[(dup['youth_id_card'], dup['assessment_date'])],
+                    'name': dup['name'],
+                    'id_card': dup['youth_id_card'],
+                    'date': dup['assessment_date'],
+                } for dup in result['conflicts']]
+                
+                if duplicate_records:
+                    overwrite_choice = self._ask_overwrite_duplicates_political(duplicate_records)
+                    if overwrite_choice == 'cancel':
+                        return 0, '用户取消导入操作'
+                    
+                    policy = 'overwrite' if overwrite_choice == 'overwrite_all' else 'skip'
+                    result = self.db_manager.bulk_upsert('political_assessment', valid_data, policy)
+                
+                imported_count = result['inserted']
+                updated_count = result['updated']
+                skipped_count = result['skipped']
+            except Exception as e:
+                error_rows.append(f"写入数据库失败: {str(e)}")
             
             # 构建结果消息
             result_parts = []
@@ -811,7 +704,7 @@ class ImportService:
         
         msg_box = QMessageBox()
         msg_box.setWindowTitle("发现重复数据")
-        msg_box.setText(f"发现 {len(duplicate_records)} 条重复记录（身份证号、姓名和日期相同）：\n\n请选择处理方式：")
+        msg_box.setText(f"发现 {len(duplicate_records)} 条重复记录（身份证号和日期相同）：\n\n请选择处理方式：")
         msg_box.setDetailedText("\n".join(duplicate_info))
         msg_box.setIcon(QMessageBox.Icon.Question)
         
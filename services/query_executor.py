@@ -0,0 +1,150 @@
+"""
+后台数据库查询服务
+
+界面上的列表加载、搜索和导入提交到线程池执行，结果通过信号回到主线程，
+大表查询时窗口不会卡住。
+同一个 key 的新请求会取消还没完成的旧请求：尚未开始的直接移出队列，
+正在执行的通过连接的进度回调中断SQL，旧请求的结果不再回调。
+每个请求使用提交时的库（本库或归档库），之后切换归档库不影响已提交的请求。
+"""
+import itertools
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+# 每执行多少条SQLite虚拟机指令检查一次是否已取消
+PROGRESS_STEPS = 10000
+DEFAULT_MAX_THREADS = 2
+
+
+class _TaskSignals(QObject):
+    # 请求号, 结果, 异常（成功时为None）
+    done = pyqtSignal(int, object, object)
+
+
+class _QueryTask(QRunnable):
+    """在线程池中执行一次查询请求"""
+
+    def __init__(self, request_id, db_manager, func, args, kwargs):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.request_id = request_id
+        self.db_manager = db_manager
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        # 提交时使用的库
+        self.store = db_manager.store
+        self.cancelled = False
+        self.signals = _TaskSignals()
+
+    def _interrupt(self):
+        return 1 if self.cancelled else 0
+
+    def run(self):
+        result = error = None
+        if not self.cancelled:
+            with self.db_manager.using_store(self.store):
+                # 工作线程的长连接在请求期间可被取消；func 内部获取的是同一个连接
+                conn = self.db_manager.get_connection()
+                conn.set_progress_handler(self._interrupt, PROGRESS_STEPS)
+                try:
+                    result = self.func(*self.args, **self.kwargs)
+                except Exception as e:
+                    error = e
+                finally:
+                    conn.set_progress_handler(None, 0)
+                    conn.close()
+        self.signals.done.emit(self.request_id, result, error)
+
+
+class QueryExecutor(QObject):
+    """后台查询执行器
+
+    示例：
+        executor.submit('daily_stats', db_manager.get_all_daily_stats_with_youth_info,
+                        date_range=(start, end),
+                        on_result=self.display_daily_stats_data,
+                        on_error=lambda e: QMessageBox.warning(...))
+    """
+
+    # 有请求开始或全部完成时发出：当前未完成的请求数
+    pending_changed = pyqtSignal(int)
+
+    def __init__(self, db_manager, max_threads=DEFAULT_MAX_THREADS, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self._ids = itertools.count(1)
+        self._tasks = {}   # 请求号 -> (key, 任务, on_result, on_error)
+        self._latest = {}  # key -> 最新的请求号
+
+    def submit(self, key, func, *args, on_result=None, on_error=None, **kwargs):
+        """提交请求并返回请求号，func(*args, **kwargs) 在工作线程中执行
+
+        on_result(结果) / on_error(异常) 在主线程中回调；key 相同的未完成请求会被取消。
+        """
+        self.cancel(key)
+        request_id = next(self._ids)
+        task = _QueryTask(request_id, self.db_manager, func, args, kwargs)
+        task.signals.done.connect(self._on_done)
+        self._tasks[request_id] = (key, task, on_result, on_error)
+        self._latest[key] = request_id
+        self.pool.start(task)
+        self.pending_changed.emit(len(self._tasks))
+        return request_id
+
+    def cancel(self, key):
+        """取消 key 对应的未完成请求"""
+        request_id = self._latest.pop(key, None)
+        if request_id is not None:
+            self._cancel_request(request_id)
+
+    def cancel_all(self):
+        for request_id in list(self._tasks):
+            self._cancel_request(request_id)
+        self._latest.clear()
+
+    def _cancel_request(self, request_id):
+        entry = self._tasks.get(request_id)
+        if entry is None:
+            return
+        task = entry[1]
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            # 还没开始执行，直接移出队列
+            del self._tasks[request_id]
+            self.pending_changed.emit(len(self._tasks))
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._tasks)
+        return key in self._latest
+
+    def wait(self, msecs=-1):
+        """等待所有已开始的请求结束（退出程序前使用）"""
+        return self.pool.waitForDone(msecs)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.wait()
+
+    def _on_done(self, request_id, result, error):
+        entry = self._tasks.pop(request_id, None)
+        self.pending_changed.emit(len(self._tasks))
+        if entry is None:
+            return
+        key, task, on_result, on_error = entry
+        if task.cancelled:
+            return
+        if self._latest.get(key) == request_id:
+            del self._latest[key]
+
+        if error is not None:
+            if on_error is not None:
+                on_error(error)
+            else:
+                print(f"后台查询出错: {error}")
+        elif on_result is not None:
+            on_result(result)
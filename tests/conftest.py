@@ -0,0 +1,49 @@
+"""
+测试公共夹具
+
+在仓库根目录执行：python -m pytest -q
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import sample_data  # noqa: E402
+from database.db_manager import DatabaseManager  # noqa: E402
+
+
+SAMPLE_YOUTHS = 300
+SAMPLE_DAYS = 10
+
+
+def _open(directory):
+    # 迁移、建表的提示信息不输出到测试结果中
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DatabaseManager(os.path.join(str(directory), 'youth_records.db'),
+                               blob_dir=os.path.join(str(directory), 'blobs'))
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    """空数据库"""
+    manager = _open(tmp_path)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture(scope='session')
+def sample_db(tmp_path_factory):
+    """生成了模拟数据并执行过 ANALYZE 的数据库，各测试只读使用"""
+    manager = _open(tmp_path_factory.mktemp('sample'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        sample_data.generate(manager, youths=SAMPLE_YOUTHS, days=SAMPLE_DAYS, seed=1)
+    conn = manager.get_connection()
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+    yield manager
+    manager.close()
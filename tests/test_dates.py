@@ -0,0 +1,79 @@
+"""
+日期规范化
+"""
+from datetime import date, datetime
+
+import pytest
+
+from database import dates
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2025-08-08', '2025-08-08'),
+    ('2025/8/8', '2025-08-08'),
+    ('2025.8.8', '2025-08-08'),
+    ('2025年8月8日', '2025-08-08'),
+    (' 2025 - 8 - 8 ', '2025-08-08'),
+    ('2025-08-08 10:30:00', '2025-08-08'),
+    ('20250808', '2025-08-08'),
+    ('2025-09', '2025-09-01'),
+    ('2025年9月', '2025-09-01'),
+    ('2025', '2025-01-01'),
+    ('2025年', '2025-01-01'),
+    (2025, '2025-01-01'),
+    (datetime(2025, 8, 8, 10, 30), '2025-08-08'),
+    (date(2025, 8, 8), '2025-08-08'),
+])
+def test_normalize_date_formats(value, expected):
+    assert dates.normalize_date(value) == expected
+
+
+@pytest.mark.parametrize('value, expected', [
+    (45877, '2025-08-08'),
+    (45877.0, '2025-08-08'),
+    ('45877', '2025-08-08'),
+    (dates.EXCEL_MIN_SERIAL, '1927-05-18'),
+])
+def test_excel_serial_numbers(value, expected):
+    assert dates.normalize_date(value) == expected
+
+
+@pytest.mark.parametrize('value', [
+    None, '', '   ', '无', '2025-13-01', '2025-02-30', '20251301', 123, '0', dates.EXCEL_MAX_SERIAL + 1,
+])
+def test_unrecognized_dates(value):
+    assert dates.normalize_date(value) is None
+
+
+def test_parse_date_returns_period_bounds():
+    assert dates.parse_date('2024-02') == (date(2024, 2, 1), date(2024, 2, 29))
+    assert dates.parse_date('2025') == (date(2025, 1, 1), date(2025, 12, 31))
+    assert dates.parse_date('2025-08-08') == (date(2025, 8, 8), date(2025, 8, 8))
+
+
+def test_normalize_range_expands_partial_end():
+    assert dates.normalize_range('2025/9', '2025-09') == ('2025-09-01', '2025-09-30')
+    assert dates.normalize_range('2025', '2025年') == ('2025-01-01', '2025-12-31')
+    assert dates.normalize_range('2025年8月1日', '2025/8/8') == ('2025-08-01', '2025-08-08')
+
+
+def test_normalize_range_keeps_open_ends():
+    assert dates.normalize_range(None, '2025-08') == (None, '2025-08-31')
+    assert dates.normalize_range('2025-08-01', '') == ('2025-08-01', '')
+
+
+def test_normalize_range_rejects_unrecognized_dates():
+    with pytest.raises(ValueError):
+        dates.normalize_range('上个月', '2025-08-08')
+    with pytest.raises(ValueError):
+        dates.normalize_range('2025-08-01', '123')
+
+
+def test_iso_columns_are_filled_on_commit(db_manager):
+    conn = db_manager.get_connection()
+    conn.execute("INSERT INTO youth (id, id_card, name) VALUES (1, '110101200001010011', '张三')")
+    conn.execute("INSERT INTO daily_stat (youth_id, record_date) VALUES (1, '2025年8月8日')")
+    conn.commit()
+    row = conn.execute("SELECT record_date_iso FROM daily_stat").fetchone()
+    conn.close()
+    assert row[0] == '2025-08-08'
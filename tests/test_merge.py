@@ -0,0 +1,40 @@
+"""
+合并其他站点的数据库：来源库只读
+"""
+import contextlib
+import hashlib
+import io
+import os
+
+from database.db_manager import DatabaseManager
+
+
+ID_CARD = '110101199001011235'
+
+
+def _snapshot(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[os.path.relpath(path, directory)] = hashlib.sha256(f.read()).hexdigest()
+    return files
+
+
+def test_merge_does_not_write_to_source(db_manager, tmp_path):
+    site = tmp_path / 'site'
+    site.mkdir()
+    with contextlib.redirect_stdout(io.StringIO()):
+        source = DatabaseManager(str(site / 'youth_records.db'))
+        source.insert_visit_survey(ID_CARD, '李四', '男', '2025-01-02', b'image', '好', '好')
+        source.close()
+    before = _snapshot(str(site))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = db_manager.merge_database(str(site / 'youth_records.db'))
+
+    assert result['tables']['visit_survey']['inserted'] == 1
+    assert _snapshot(str(site)) == before
+    rows = db_manager.search_visit_surveys(ID_CARD)
+    assert db_manager.get_visit_survey_image(rows[0][0]) == b'image'
@@ -0,0 +1,87 @@
+"""
+键集分页
+"""
+import sqlite3
+
+import pytest
+
+from database.pagination import Keyset, decode_cursor, encode_cursor, fetch_page
+
+
+KEYSET = Keyset(('day', 'DESC', 1), ('name', 'ASC', 2), ('id', 'ASC', 0))
+ORDER_BY = "ORDER BY day DESC, name ASC, id ASC"
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, day TEXT, name TEXT)")
+    rows = []
+    for i in range(1, 58):
+        # 排序键有重复值和 NULL
+        day = None if i % 11 == 0 else f"2025-01-{i % 5 + 1:02d}"
+        name = None if i % 7 == 0 else f"n{i % 4}"
+        rows.append((i, day, name))
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)", rows)
+    yield conn.cursor()
+    conn.close()
+
+
+def _all_pages(cursor, page_size, where="WHERE 1=1", params=()):
+    pages = []
+    after = None
+    while True:
+        rows, after = fetch_page(cursor, f"SELECT id, day, name FROM t {where}", params, KEYSET, page_size, after)
+        pages.append(rows)
+        if after is None:
+            return pages
+
+
+@pytest.mark.parametrize('page_size', [1, 5, 10, 57, 100])
+def test_pages_cover_all_rows_in_order(cursor, page_size):
+    expected = cursor.execute(f"SELECT id, day, name FROM t {ORDER_BY}").fetchall()
+    pages = _all_pages(cursor, page_size)
+    assert [row for page in pages for row in page] == expected
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert len(pages) == max(-(-len(expected) // page_size), 1)
+
+
+def test_pages_respect_filter(cursor):
+    expected = cursor.execute(f"SELECT id, day, name FROM t WHERE name IS ? {ORDER_BY}", ('n1',)).fetchall()
+    pages = _all_pages(cursor, 3, "WHERE name IS ?", ('n1',))
+    assert [row for page in pages for row in page] == expected
+
+
+def test_without_page_size_returns_list(cursor):
+    rows = fetch_page(cursor, "SELECT id, day, name FROM t WHERE 1=1", (), KEYSET)
+    assert rows == cursor.execute(f"SELECT id, day, name FROM t {ORDER_BY}").fetchall()
+
+
+def test_last_page_has_no_cursor(cursor):
+    rows, after = fetch_page(cursor, "SELECT id, day, name FROM t WHERE id > 50", (), KEYSET, 10)
+    assert len(rows) == 7
+    assert after is None
+
+
+def test_cursor_round_trip():
+    key = ['2025-01-01', '张三', None, 12]
+    assert decode_cursor(encode_cursor(key)) == key
+
+
+@pytest.mark.parametrize('after', ['不是游标', encode_cursor(['2025-01-01', 'n1'])])
+def test_invalid_cursor(cursor, after):
+    with pytest.raises(ValueError):
+        fetch_page(cursor, "SELECT id, day, name FROM t WHERE 1=1", (), KEYSET, 10, after)
+
+
+def test_database_manager_pages_match_full_result(sample_db):
+    full = sample_db.get_all_daily_stats_with_youth_info(('2025-01-02', '2025-01-06'))
+    rows = []
+    after = None
+    while True:
+        page, after = sample_db.get_all_daily_stats_with_youth_info(('2025-01-02', '2025-01-06'),
+                                                                    page_size=97, after=after)
+        rows.extend(page)
+        if after is None:
+            break
+    assert full and rows == full
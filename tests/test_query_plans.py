@@ -0,0 +1,76 @@
+"""
+常用查询的查询计划：走索引，不对大表做全表扫描
+"""
+import pytest
+
+from database import query_plans, sample_data
+
+
+def _with_sample_id_card(args):
+    id_card = sample_data.id_card_for(0)
+    return tuple(id_card if arg == query_plans.SAMPLE_ID_CARD else arg for arg in args)
+
+
+HOT_QUERIES = [(method_name, _with_sample_id_card(args)) for method_name, args in query_plans.HOT_QUERIES]
+
+
+def _plan(db_manager, sql):
+    conn = db_manager.get_connection()
+    try:
+        return [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()]
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('method_name, args', HOT_QUERIES,
+                         ids=[f"{name}-{i}" for i, (name, _) in enumerate(HOT_QUERIES)])
+def test_hot_query_has_no_full_scan(sample_db, method_name, args):
+    statements = query_plans.collect_statements(sample_db, method_name, args)
+    assert statements, f"{method_name} 没有执行查询"
+    for sql in statements:
+        assert query_plans.full_scans(sample_db, sql) == [], sql
+
+
+@pytest.mark.parametrize('method_name, args', [
+    ('get_daily_stat_by_id_card_and_date', (sample_data.id_card_for(0), sample_data.DEFAULT_START_DATE)),
+    ('get_town_interview_by_id_card_and_date', (sample_data.id_card_for(0), sample_data.DEFAULT_START_DATE)),
+    ('get_political_assessments_by_id_card', (sample_data.id_card_for(0),)),
+    ('get_exception_statistics_view_data', ('2025-01-02', '2025-01-05')),
+])
+def test_point_and_range_queries_use_index(sample_db, method_name, args):
+    statements = query_plans.collect_statements(sample_db, method_name, args)
+    details = [detail for sql in statements for detail in _plan(sample_db, sql)]
+    assert any(detail.startswith('SEARCH') and 'USING' in detail for detail in details), details
+
+
+def test_full_scan_is_reported(sample_db):
+    assert query_plans.full_scans(sample_db, "SELECT * FROM daily_stat WHERE notes = 'x'") == ['daily_stat']
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT d.* FROM daily_stat d WHERE d.notes = 'x'",
+    "SELECT d.* FROM daily_stat AS d WHERE d.notes = 'x'",
+])
+def test_aliased_full_scan_is_reported(sample_db, sql):
+    assert query_plans.full_scans(sample_db, sql) == ['daily_stat']
+
+
+def test_aliased_join_scan_is_reported(db_manager):
+    sql = "SELECT y.name FROM youth y CROSS JOIN daily_stat d WHERE d.notes = 'x' AND y.id = d.youth_id"
+    assert 'youth' in query_plans.full_scans(db_manager, sql)
+
+
+def test_alias_resolves_to_table():
+    aliases = query_plans.table_aliases("SELECT * FROM youth AS y LEFT JOIN daily_stat d ON d.id_card = y.id_card WHERE 1")
+    assert aliases['y'] == {'youth'}
+    assert aliases['d'] == {'daily_stat'}
+    assert 'WHERE' not in aliases
+
+
+def test_failing_query_method_raises(db_manager):
+    with pytest.raises(TypeError):
+        query_plans.collect_statements(db_manager, 'get_youth_by_id_card', ())
+
+
+def test_empty_database_has_no_full_scan(db_manager):
+    assert query_plans.check_query_plans(db_manager) == []
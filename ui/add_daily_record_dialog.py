@@ -260,20 +260,14 @@ class AddDailyRecordDialog(QDialog):
                 return
             
             # 数据校验：验证青年是否存在于基本信息表中
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT id FROM youth WHERE id_card = ?', (youth_info['id_card'],))
-            youth_record = cursor.fetchone()
+            youth_id = self.db_manager.youth_directory.youth_id(youth_info['id_card'])
             
-            if not youth_record:
-                conn.close()
+            if youth_id is None:
                 QMessageBox.warning(self, '数据校验失败', 
                                   f'公民身份号码 {youth_info["id_card"]} 在基本信息表中不存在，无法添加每日记录。\n\n'
                                   f'请先在基本信息模块中添加该人员的基本信息。')
                 return
             
-            youth_id = youth_record[0]
-            
             # 获取表单数据
             record_date = self.date_edit.date().toString('yyyy-MM-dd')
             mood = self.mood_combo.currentText()
@@ -292,6 +286,8 @@ class AddDailyRecordDialog(QDialog):
                 return
             
             # 检查是否已存在相同日期的记录
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
             cursor.execute('''
                 SELECT id FROM daily_stat 
                 WHERE youth_id = ? AND record_date = ?
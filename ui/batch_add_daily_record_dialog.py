@@ -25,72 +25,57 @@ class BatchAddWorker(QThread):
         self.fail_count = 0
     
     def run(self):
-        """执行批量添加"""
+        """执行批量添加：校验后整批写入"""
         total = len(self.youth_list)
         
+        try:
+            # 数据校验：按青年目录找出所选青年中存在于基本信息表中的
+            youth_directory = self.db_manager.youth_directory
+            existing_ids = {youth_info['youth_id'] for youth_info in self.youth_list
+                            if youth_directory.has_youth_id(youth_info['youth_id'])}
+            
+            rows = []
+            for youth_info in self.youth_list:
+                if youth_info['youth_id'] in existing_ids:
+                    rows.append({
+                        'youth_id': youth_info['youth_id'],
+                        'record_date': self.record_data['date'],
+                        'mood': self.record_data['mood'],
+                        'physical_condition': self.record_data['physical_condition'],
+                        'mental_state': self.record_data['mental_state'],
+                        'training': self.record_data['training'],
+                        'management': self.record_data['management'],
+                        'notes': self.record_data['notes'],
+                    })
+            
+            # 已存在记录时按用户选择覆盖或跳过
+            policy = 'overwrite' if self.record_data.get('overwrite', False) else 'skip'
+            result = self.db_manager.bulk_upsert('daily_stat', rows, policy)
+            conflict_ids = {row['youth_id'] for row in result['conflicts']}
+            error = None
+        except Exception as e:
+            existing_ids = conflict_ids = set()
+            error = f"错误: {str(e)}"
+        
         for i, youth_info in enumerate(self.youth_list):
-            try:
-                youth_id = youth_info['youth_id']
-                youth_name = youth_info['name']
-                youth_id_card = youth_info.get('id_card', '')
-                
-                # 数据校验：验证青年是否存在于基本信息表中
-                conn = self.db_manager.get_connection()
-                cursor = conn.cursor()
-                cursor.execute('SELECT id FROM youth WHERE id = ?', (youth_id,))
-                youth_exists = cursor.fetchone()
-                
-                if not youth_exists:
-                    conn.close()
-                    self.record_processed.emit(youth_name, False, f"公民身份号码 {youth_id_card} 在基本信息表中不存在")
-                    self.fail_count += 1
-                    self.progress_updated.emit(i + 1, total)
-                    continue
-                
-                # 检查是否已存在记录
-                cursor.execute('''
-                    SELECT id FROM daily_stat 
-                    WHERE youth_id = ? AND record_date = ?
-                ''', (youth_id, self.record_data['date']))
-                
-                existing_record = cursor.fetchone()
-                
-                if existing_record:
-                    # 如果用户选择了覆盖，则更新记录
-                    if self.record_data.get('overwrite', False):
-                        cursor.execute('''
-                            UPDATE daily_stat 
-                            SET mood = ?, physical_condition = ?, mental_state = ?, 
-                                training = ?, management = ?, notes = ?
-                            WHERE youth_id = ? AND record_date = ?
-                        ''', (self.record_data['mood'], self.record_data['physical_condition'], 
-                              self.record_data['mental_state'], self.record_data['training'], 
-                              self.record_data['management'], self.record_data['notes'], 
-                              youth_id, self.record_data['date']))
-                        conn.commit()
-                        self.record_processed.emit(youth_name, True, "记录已更新")
-                        self.success_count += 1
-                    else:
-                        self.record_processed.emit(youth_name, False, "记录已存在，跳过")
-                        self.fail_count += 1
-                else:
-                    # 插入新记录
-                    cursor.execute('''
-                        INSERT INTO daily_stat (youth_id, record_date, mood, physical_condition, 
-                                              mental_state, training, management, notes)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (youth_id, self.record_data['date'], self.record_data['mood'], 
-                          self.record_data['physical_condition'], self.record_data['mental_state'], 
-                          self.record_data['training'], self.record_data['management'], 
-                          self.record_data['notes']))
-                    conn.commit()
-                    self.record_processed.emit(youth_name, True, "记录已添加")
-                    self.success_count += 1
-                
-                conn.close()
-                
-            except Exception as e:
-                self.record_processed.emit(youth_name, False, f"错误: {str(e)}")
+            youth_id = youth_info['youth_id']
+            youth_name = youth_info['name']
+            youth_id_card = youth_info.get('id_card', '')
+            
+            if error:
+                self.record_processed.emit(youth_name, False, error)
+                self.fail_count += 1
+            elif youth_id not in existing_ids:
+                self.record_processed.emit(youth_name, False, f"公民身份号码 {youth_id_card} 在基本信息表中不存在")
+                self.fail_count += 1
+            elif youth_id not in conflict_ids:
+                self.record_processed.emit(youth_name, True, "记录已添加")
+                self.success_count += 1
+            elif policy == 'overwrite':
+                self.record_processed.emit(youth_name, True, "记录已更新")
+                self.success_count += 1
+            else:
+                self.record_processed.emit(youth_name, False, "记录已存在，跳过")
                 self.fail_count += 1
             
             # 更新进度
@@ -98,11 +83,6 @@ class BatchAddWorker(QThread):
         
         # 完成
         self.finished.emit(self.success_count, self.fail_count)
-
-
-class BatchAddDailyRecordDialog(QDialog):
-    # 定义信号，用于通知父窗口数据已更新
-    data_updated = pyqtSignal()
     
     def __init__(self, db_manager, parent=None):
         super().__init__(parent)
@@ -370,11 +350,7 @@ class BatchAddDailyRecordDialog(QDialog):
     def load_recruitment_place_options(self):
         """加载应征地的选项"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute('SELECT DISTINCT recruitment_place FROM youth WHERE recruitment_place IS NOT NULL AND recruitment_place != ""')
-            recruitment_places = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            recruitment_places = self.db_manager.get_unit_options('recruitment_place')
             
             # 使用自然排序
             recruitment_places.sort(key=self.natural_sort_key)
@@ -390,16 +366,8 @@ class BatchAddDailyRecordDialog(QDialog):
     def load_company_options(self, recruitment_place_filter='全部'):
         """加载连的选项"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            if recruitment_place_filter == '全部':
-                cursor.execute('SELECT DISTINCT company FROM youth WHERE company IS NOT NULL AND company != ""')
-            else:
-                cursor.execute('SELECT DISTINCT company FROM youth WHERE recruitment_place = ? AND company IS NOT NULL AND company != ""', (recruitment_place_filter,))
-            
-            companies = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            companies = self.db_manager.get_unit_options(
+                'company', self.unit_filter(recruitment_place_filter))
             
             # 使用自然排序
             companies.sort(key=self.natural_sort_key)
@@ -415,27 +383,8 @@ class BatchAddDailyRecordDialog(QDialog):
     def load_platoon_options(self, recruitment_place_filter='全部', company_filter='全部'):
         """加载排的选项，根据应征地和连进行筛选"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            conditions = []
-            params = []
-            
-            if recruitment_place_filter != '全部':
-                conditions.append('recruitment_place = ?')
-                params.append(recruitment_place_filter)
-            
-            if company_filter != '全部':
-                conditions.append('company = ?')
-                params.append(company_filter)
-            
-            conditions.append('platoon IS NOT NULL AND platoon != ""')
-            
-            where_clause = ' AND '.join(conditions)
-            cursor.execute(f'SELECT DISTINCT platoon FROM youth WHERE {where_clause}', params)
-            
-            platoons = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            platoons = self.db_manager.get_unit_options(
+                'platoon', self.unit_filter(recruitment_place_filter), self.unit_filter(company_filter))
             
             # 使用自然排序
             platoons.sort(key=self.natural_sort_key)
@@ -451,31 +400,9 @@ class BatchAddDailyRecordDialog(QDialog):
     def load_squad_options(self, recruitment_place_filter='全部', company_filter='全部', platoon_filter='全部'):
         """加载班的选项，根据应征地、连和排进行筛选"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            conditions = []
-            params = []
-            
-            if recruitment_place_filter != '全部':
-                conditions.append('recruitment_place = ?')
-                params.append(recruitment_place_filter)
-            
-            if company_filter != '全部':
-                conditions.append('company = ?')
-                params.append(company_filter)
-            
-            if platoon_filter != '全部':
-                conditions.append('platoon = ?')
-                params.append(platoon_filter)
-            
-            sql = 'SELECT DISTINCT squad FROM youth WHERE squad IS NOT NULL AND squad != ""'
-            if conditions:
-                sql += ' AND ' + ' AND '.join(conditions)
-            
-            cursor.execute(sql, params)
-            squads = [row[0] for row in cursor.fetchall()]
-            conn.close()
+            squads = self.db_manager.get_unit_options(
+                'squad', self.unit_filter(recruitment_place_filter), self.unit_filter(company_filter),
+                self.unit_filter(platoon_filter))
             
             # 使用自然排序
             squads.sort(key=self.natural_sort_key)
@@ -488,6 +415,11 @@ class BatchAddDailyRecordDialog(QDialog):
             self.squad_combo.clear()
             self.squad_combo.addItem('全部')
     
+    @staticmethod
+    def unit_filter(value):
+        """下拉框的"全部"表示不限"""
+        return '' if value == '全部' else value
+    
     def on_recruitment_place_changed(self):
         """应征地选择改变时的处理"""
         recruitment_place = self.recruitment_place_combo.currentText()
@@ -518,42 +450,13 @@ class BatchAddDailyRecordDialog(QDialog):
     def get_filtered_youth_list(self):
         """根据筛选条件获取青年列表"""
         try:
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            # 构建查询条件
-            conditions = []
-            params = []
-            
-            # 应征地筛选
-            if self.recruitment_place_combo.currentText() != '全部':
-                conditions.append('recruitment_place = ?')
-                params.append(self.recruitment_place_combo.currentText())
-            
-            # 连筛选
-            if self.company_combo.currentText() != '全部':
-                conditions.append('company = ?')
-                params.append(self.company_combo.currentText())
-            
-            # 排筛选
-            if self.platoon_combo.currentText() != '全部':
-                conditions.append('platoon = ?')
-                params.append(self.platoon_combo.currentText())
-            
-            # 班筛选
-            if self.squad_combo.currentText() != '全部':
-                conditions.append('squad = ?')
-                params.append(self.squad_combo.currentText())
-            
-            # 构建SQL查询
-            sql = 'SELECT id, id_card, name FROM youth'
-            if conditions:
-                sql += ' WHERE ' + ' AND '.join(conditions)
-            sql += ' ORDER BY recruitment_place, company, platoon, squad, name'
-            
-            cursor.execute(sql, params)
-            results = cursor.fetchall()
-            conn.close()
+            # 按应征地、连、排、班在单位层级中查找
+            results = self.db_manager.get_youth_in_unit(
+                self.unit_filter(self.recruitment_place_combo.currentText()),
+                self.unit_filter(self.company_combo.currentText()),
+                self.unit_filter(self.platoon_combo.currentText()),
+                self.unit_filter(self.squad_combo.currentText()),
+            )
             
             # 转换为所需格式
             youth_list = []
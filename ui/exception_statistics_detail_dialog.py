@@ -430,6 +430,10 @@ class CustomChartView(QChartView):
 
 
 class ExceptionStatisticsDetailDialog(QDialog):
+    # 图表所需的异常序列：总异常情况和六个数据源
+    TIMESERIES_DIMENSIONS = ('total', 'medical_screening', 'political_assessment', 'physical_examination',
+                             'daily_stat', 'town_interview', 'leader_interview')
+    
     def __init__(self, db_manager, parent=None, user_id=None, name=None):
         super().__init__(parent)
         self.db_manager = db_manager
@@ -829,14 +833,10 @@ class ExceptionStatisticsDetailDialog(QDialog):
     def load_data_by_date_range(self, start_date, end_date):
         """根据日期范围加载数据并绘制折线图"""
         try:
-            # 从异常统计视图获取该用户在指定日期范围内的数据
-            view_records = self.db_manager.get_exception_statistics_view_data(
-                start_date=start_date,
-                end_date=end_date,
-                id_card=self.user_id
-            )
+            # 获取该用户在指定日期范围内按日期对齐的异常序列
+            dates, series = self.db_manager.get_timeseries([self.user_id], start_date, end_date, self.TIMESERIES_DIMENSIONS)
             
-            self.create_charts_from_view_data(view_records, start_date, end_date)
+            self.create_charts_from_timeseries(dates, series, start_date, end_date)
             
         except Exception as e:
             QMessageBox.warning(self, "加载错误", f"加载异常统计详情时发生错误：{str(e)}")
@@ -861,75 +861,25 @@ class ExceptionStatisticsDetailDialog(QDialog):
             start_date = (datetime.now() - timedelta(days=days-1)).strftime('%Y-%m-%d')
             end_date = datetime.now().strftime('%Y-%m-%d')
             
-            # 从异常统计视图获取该用户的数据
-            view_records = self.db_manager.get_exception_statistics_view_data(
-                start_date=start_date,
-                end_date=end_date,
-                id_card=self.user_id
-            )
+            # 获取该用户按日期对齐的异常序列
+            dates, series = self.db_manager.get_timeseries([self.user_id], start_date, end_date, self.TIMESERIES_DIMENSIONS)
             
-            self.create_charts_from_view_data(view_records, start_date, end_date, selected_range)
+            self.create_charts_from_timeseries(dates, series, start_date, end_date, selected_range)
             
         except Exception as e:
             QMessageBox.warning(self, "加载错误", f"加载异常统计详情时发生错误：{str(e)}")
     
-    def create_charts_from_view_data(self, view_records, start_date, end_date, time_range=None):
-        """基于视图数据创建图表"""
+    def create_charts_from_timeseries(self, dates, series, start_date, end_date, time_range=None):
+        """基于异常序列创建图表，series 为 {指标: [该用户按日期对齐的取值]}"""
         try:
-            from datetime import datetime, timedelta
-            
-            # 解析开始和结束日期
-            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-            end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
-            
-            # 生成完整的日期列表
-            dates = []
-            current_date = start_datetime
-            while current_date <= end_datetime:
-                date_str = current_date.strftime('%Y-%m-%d')
-                dates.append(date_str)
-                current_date += timedelta(days=1)
-            
-            # 将视图记录按日期组织
-            records_by_date = {}
-            for record in view_records:
-                record_date = record[14]  # 日期字段
-                records_by_date[record_date] = record
-            
-            # 计算每天各类异常状态
-            daily_exception_status = {}
-            for date_str in dates:
-                if date_str in records_by_date:
-                    record = records_by_date[date_str]
-                    # 视图字段索引：8=思想是否异常, 9=身体是否异常, 10=精神是否异常, 11=训练是否异常, 12=管理是否异常, 13=其他(异常来源)
-                    exception_sources = record[13] or ''
-                    
-                    # 根据异常来源字段判断各个数据源是否异常
-                    daily_exception_status[date_str] = {
-                        'medical_screening': 1 if ('病史筛查' in exception_sources) else 0,
-                        'political_assessment': 1 if ('政治考核' in exception_sources) else 0,
-                        'physical_examination': 1 if ('体检' in exception_sources) else 0,
-                        'daily_stat': 1 if ('每日统计' in exception_sources) else 0,
-                        'town_interview': 1 if ('镇街谈话' in exception_sources) else 0,
-                        'leader_interview': 1 if ('领导谈话' in exception_sources) else 0,
-                        'total': 1  # 如果有记录就说明有异常
-                    }
-                else:
-                    # 该日期没有异常记录，所有状态都是正常
-                    daily_exception_status[date_str] = {
-                        'medical_screening': 0,
-                        'political_assessment': 0,
-                        'physical_examination': 0,
-                        'daily_stat': 0,
-                        'town_interview': 0,
-                        'leader_interview': 0,
-                        'total': 0
-                    }
+            # 按日期整理各类异常状态（1为异常，0为正常）
+            daily_exception_status = {
+                date_str: {dimension: int(values[0][i]) for dimension, values in series.items()}
+                for i, date_str in enumerate(dates)
+            }
             
             # 保存异常状态供悬停使用
             self.current_daily_exception_status = daily_exception_status
-            # 保存视图记录供详情弹窗使用
-            self.current_view_records = records_by_date
             
             # 为每个数据源创建独立的图表
             for source_key, chart_info in self.chart_views.items():
@@ -1006,7 +956,7 @@ class ExceptionStatisticsDetailDialog(QDialog):
                 chart.legend().setAlignment(Qt.AlignTop)
                 
                 # 检查是否有数据
-                has_data = len(view_records) > 0
+                has_data = any(status['total'] for status in daily_exception_status.values())
                 if not has_data:
                     if time_range:
                         chart.setTitle(f"{chart_info['name']}异常情况趋势 ({time_range}) - 暂无数据")
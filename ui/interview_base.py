@@ -304,21 +304,13 @@ class InterviewBase:
         return button_layout
     
     def load_interview_data(self):
-        """加载谈心谈话数据到表格"""
-        try:
-            # 获取时间筛选条件
-            time_condition, time_params = self.main_window.get_time_filter_condition("interview_date")
-            
-            # 获取数据
-            db_method = getattr(self.db_manager, self.db_search_method)
-            records = db_method(time_condition=time_condition, time_params=time_params)
-            
-            # 显示数据
-            display_method = getattr(self.main_window, self.display_records_method)
-            display_method(records)
-            
-        except Exception as e:
-            QMessageBox.warning(self.main_window, "加载错误", f"加载{self.display_name}数据时发生错误：{str(e)}")
+        """加载谈心谈话数据到表格（后台查询，按年份、半年筛选）"""
+        self.main_window.query_executor.submit(
+            self.prefix + '_interview', getattr(self.db_manager, self.db_search_method),
+            date_range=self.main_window.get_time_range(),
+            on_result=getattr(self.main_window, self.display_records_method),
+            on_error=self.main_window.load_error_handler(
+                "加载错误", f"加载{self.display_name}数据时发生错误"))
     
     def search_interview(self):
         """搜索谈心谈话记录"""
@@ -347,12 +339,13 @@ class InterviewBase:
             platoon = platoon_input.text().strip()
             squad = squad_input.text().strip()
             
-            db_method = getattr(self.db_manager, self.db_search_method)
-            records = db_method(name=name, id_card=id_card, recruitment_place=recruitment_place, 
-                              company=company, platoon=platoon, squad=squad)
-            
-            display_method = getattr(self.main_window, self.display_records_method)
-            display_method(records)
+            self.main_window.query_executor.submit(
+                self.prefix + '_interview', getattr(self.db_manager, self.db_search_method),
+                name=name, id_card=id_card, recruitment_place=recruitment_place,
+                company=company, platoon=platoon, squad=squad,
+                on_result=getattr(self.main_window, self.display_records_method),
+                on_error=self.main_window.load_error_handler(
+                    "搜索错误", f"搜索{self.display_name}记录时发生错误"))
             
         except Exception as e:
             QMessageBox.warning(self.main_window, "搜索错误", f"搜索{self.display_name}记录时发生错误：{str(e)}")
@@ -9,10 +9,43 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QFont, QColor
 from datetime import datetime
+from database.query_builder import Contains, DateRange, Unit
+from services.backup_service import BackupService
+from services.query_executor import QueryExecutor
 
 
 class MainWindow(QMainWindow):
-    def __init__(self, db_manager, import_service, export_service, user):
+    # 病史筛查、体检情况列表查询（联表获取应征地、连、排、班、带训班长信息），后接 WHERE 条件
+    MEDICAL_SCREENING_QUERY = """
+        SELECT ms.id, ms.name, ms.gender, ms.id_card, 
+               COALESCE(y.recruitment_place, '') as recruitment_place,
+               COALESCE(y.company, '') as company,
+               COALESCE(y.platoon, '') as platoon,
+               COALESCE(y.squad, '') as squad,
+               COALESCE(y.squad_leader, '') as squad_leader,
+               ms.screening_result, ms.screening_date, 
+               ms.remark, ms.physical_status, ms.mental_status
+        FROM medical_screening ms
+        LEFT JOIN youth y ON ms.id_card = y.id_card
+    """
+    PHYSICAL_EXAMINATION_QUERY = """
+        SELECT pe.id, pe.youth_id_card, pe.name, pe.gender,
+               pe.district_exam, pe.district_positive, pe.district_date,
+               pe.city_exam, pe.city_positive, pe.city_date,
+               pe.special_exam, pe.special_positive, pe.special_date,
+               pe.body_status, pe.psychological_test_type, pe.tracking_opinion,
+               pe.implementation_status,
+               COALESCE(y.recruitment_place, '') as recruitment_place,
+               COALESCE(y.company, '') as company,
+               COALESCE(y.platoon, '') as platoon,
+               COALESCE(y.squad, '') as squad,
+               COALESCE(y.squad_leader, '') as squad_leader
+        FROM physical_examination pe
+        LEFT JOIN youth y ON pe.youth_id_card = y.id_card
+    """
+
+    def __init__(self, db_manager, import_service, export_service, user, query_executor=None,
+                 backup_service=None):
         super().__init__()
         self.db_manager = db_manager
         self.import_service = import_service
@@ -20,12 +53,17 @@ class MainWindow(QMainWindow):
         self.user = user
         self.current_youth_id = None
         
+        # 列表加载、搜索在后台线程执行，界面线程不直接查询数据库
+        self.query_executor = query_executor or QueryExecutor(db_manager, parent=self)
+        self.backup_service = backup_service or BackupService(db_manager)
+        
         # 创建谈心谈话基类实例
         from ui.interview_base import InterviewBase
         self.town_interview_base = InterviewBase(self, 'town')
         self.leader_interview_base = InterviewBase(self, 'leader')
         
         self.init_ui()
+        self.backup_database_if_due()
     
     def setup_table_style(self, table):
         """设置表格的统一样式，包括字体大小和行高"""
@@ -338,6 +376,8 @@ class MainWindow(QMainWindow):
         # 添加"全部"选项，然后是今年到之前的年份，总共10年，按时间倒序排列
         current_year = datetime.now().year
         years = ['全部'] + [str(year) for year in range(current_year, current_year - 10, -1)]
+        # 更早的已归档年份也可以选择
+        years += [str(year) for year in self.db_manager.archived_years() if str(year) not in years]
         self.year_combo.addItems(years)
         self.year_combo.setCurrentText(str(current_year))
         self.year_combo.setFixedWidth(100)  # 固定宽度确保显示完整
@@ -422,9 +462,55 @@ class MainWindow(QMainWindow):
         # 添加弹性空间
         nav_layout.addStretch()
         
+        # 底部备份按钮
+        self.backup_button = QPushButton('备份数据库')
+        self.backup_button.setStyleSheet("""
+            QPushButton {
+                background: #2c3e50;
+                color: #ecf0f1;
+                border: none;
+                border-top: 1px solid #1abc9c;
+                padding: 12px 15px;
+                font-size: 14px;
+            }
+            QPushButton:hover {
+                background: #3d566e;
+                color: white;
+            }
+            QPushButton:disabled {
+                color: #7f8c8d;
+            }
+        """)
+        self.backup_button.clicked.connect(self.backup_database)
+        nav_layout.addWidget(self.backup_button)
+        
         nav_widget.setLayout(nav_layout)
         return nav_widget
     
+    def backup_database(self):
+        """在后台线程中在线备份数据库，完成后提示结果"""
+        def on_result(path):
+            self.backup_button.setEnabled(True)
+            QMessageBox.information(self, '备份完成', f'数据库已备份到：\n{path}')
+        
+        def on_error(e):
+            self.backup_button.setEnabled(True)
+            QMessageBox.warning(self, '备份失败', f'备份数据库时发生错误：{str(e)}')
+        
+        self.backup_button.setEnabled(False)
+        self.query_executor.submit('backup', self.backup_service.backup,
+                                   on_result=on_result, on_error=on_error)
+    
+    def backup_database_if_due(self):
+        """距离上次备份超过一天时在后台自动备份"""
+        try:
+            if self.backup_service.is_due():
+                self.query_executor.submit(
+                    'backup', self.backup_service.backup,
+                    on_error=lambda e: print(f"自动备份数据库出错: {e}"))
+        except Exception as e:
+            print(f"检查数据库备份出错: {e}")
+    
     def switch_tab(self, index):
         """切换标签页"""
         # 取消其他按钮的选中状态
@@ -474,6 +560,13 @@ class MainWindow(QMainWindow):
     
     def on_time_filter_changed(self):
         """时间筛选条件改变时的处理"""
+        # 选择已归档的年份时切换到该年的归档库，其他年份使用本库
+        year = self.year_combo.currentText()
+        archive_year = int(year) if year.isdigit() and int(year) in self.db_manager.archived_years() else None
+        if archive_year != self.db_manager.archive_year:
+            self.db_manager.use_archive(archive_year)
+            # 其他标签页的数据来自原来的库，切换过去时重新加载
+            self._loaded_tabs.clear()
         # 重新加载当前标签页的数据
         self.refresh_current_tab_data()
     
@@ -495,34 +588,43 @@ class MainWindow(QMainWindow):
         elif current_index == 6:  # 体检情况统计表
             self.load_physical_examination_data()
     
-    def get_time_filter_condition(self, date_field):
-        """获取时间筛选条件的SQL语句片段
+    def query_rows(self, sql, params=()):
+        """执行查询并返回 sqlite3.Row 结果（通过 query_executor 在后台线程调用）"""
+        conn = self.db_manager.get_connection()
+        try:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    
+    def load_error_handler(self, title, message, table=None):
+        """后台查询失败时的回调：提示错误，并清空表格"""
+        def on_error(e):
+            QMessageBox.warning(self, title, f"{message}：{str(e)}")
+            if table is not None:
+                table.setRowCount(0)
+        return on_error
+    
+    def get_time_range(self):
+        """获取年份、半年选择对应的日期范围
         
-        Args:
-            date_field: 要筛选的日期字段名
-            
         Returns:
-            tuple: (where_condition, params) SQL条件和参数
+            tuple: (开始日期, 结束日期)，选择"全部"时返回 None
         """
         year = self.year_combo.currentText()
         
         # 如果选择了"全部"，则不添加时间筛选条件
         if year == '全部':
-            return "", []
+            return None
         
         half_year = self.half_year_combo.currentText()
         
         if half_year == '上半年':
-            start_date = f"{year}-01-01"
-            end_date = f"{year}-06-30"
-        else:  # 下半年
-            start_date = f"{year}-07-01"
-            end_date = f"{year}-12-31"
-        
-        condition = f"({date_field} >= ? AND {date_field} <= ?)"
-        params = [start_date, end_date]
-        
-        return condition, params
+            return f"{year}-01-01", f"{year}-06-30"
+        # 下半年
+        return f"{year}-07-01", f"{year}-12-31"
     
     def create_search_bar(self):
         layout = QHBoxLayout()
@@ -1129,43 +1231,10 @@ class MainWindow(QMainWindow):
     
     def load_all_youth_detailed(self):
         """加载所有青年详细信息（完整版，默认显示）（新结构）"""
-        try:
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # 获取时间筛选条件
-                time_condition, time_params = self.get_time_filter_condition("camp_entry_time")
-                
-                base_query = """
-                    SELECT id_card, name, gender, birth_date, nation, political_status,
-                           religion, native_place, education_level, study_status, study_type,
-                           camp_entry_time, recruitment_place, residence_address, household_address,
-                           postal_code, personal_phone, family_phone, school, major,
-                           enrollment_time, initial_hospital, initial_conclusion, initial_time,
-                           physical_conclusion, physical_time, physical_disqualification,
-                           chief_doctor_opinion, graduation_time, company, platoon, squad,
-                           squad_leader, camp_status, leave_time, leave_reason, id
-                    FROM youth
-                """
-                
-                if time_condition:
-                    query = base_query + f" WHERE {time_condition} ORDER BY id"
-                    cursor.execute(query, time_params)
-                else:
-                    query = base_query + " ORDER BY id"
-                    cursor.execute(query)
-                
-                results = cursor.fetchall()
-                self.display_detailed_results(results)
-            finally:
-                if conn:
-                    conn.close()
-        except Exception as e:
-            QMessageBox.warning(self, "加载错误", f"加载青年信息时发生错误：{str(e)}")
-            self.search_table.setRowCount(0)
+        self.query_executor.submit(
+            'youth', self.db_manager.get_all_youth_detailed, date_range=self.get_time_range(),
+            on_result=self.display_detailed_results,
+            on_error=self.load_error_handler("加载错误", "加载青年信息时发生错误", self.search_table))
     
     def search_youth(self):
         """搜索青年（新结构）"""
@@ -1185,59 +1254,23 @@ class MainWindow(QMainWindow):
             platoon = self.platoon_input.text().strip()
             squad = self.squad_input.text().strip()
 
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                sql = """
-                    SELECT id_card, name, gender, birth_date, nation, political_status,
-                           religion, native_place, education_level, study_status, study_type,
-                           camp_entry_time, recruitment_place, residence_address, household_address,
-                           postal_code, personal_phone, family_phone, school, major,
-                           enrollment_time, initial_hospital, initial_conclusion, initial_time,
-                           physical_conclusion, physical_time, physical_disqualification,
-                           chief_doctor_opinion, graduation_time, company, platoon, squad,
-                           squad_leader, camp_status, leave_time, leave_reason, id
-                    FROM youth WHERE 1=1
-                """
-                params = []
-
-                if name:
-                    sql += " AND name LIKE ?"
-                    params.append(f"%{name}%")
-
-                if id_card:
-                    sql += " AND id_card LIKE ?"
-                    params.append(f"%{id_card}%")
-
-                if recruitment_place:
-                    sql += " AND recruitment_place LIKE ?"
-                    params.append(f"%{recruitment_place}%")
-
-                if company:
-                    sql += " AND company LIKE ?"
-                    params.append(f"%{company}%")
-
-                if platoon:
-                    sql += " AND platoon LIKE ?"
-                    params.append(f"%{platoon}%")
-
-                if squad:
-                    sql += " AND squad LIKE ?"
-                    params.append(f"%{squad}%")
-
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                
+            def show_results(results):
                 self.search_table.setColumnCount(len(self.basic_info_headers))
                 self.search_table.setHorizontalHeaderLabels(self.basic_info_headers)
                 self.display_detailed_results(results)
-                    
-            finally:
-                if conn:
-                    conn.close()
+            
+            def show_error(e):
+                QMessageBox.critical(self, "搜索错误", f"搜索时发生错误：{str(e)}")
+                self.reset_search()
+            
+            self.query_executor.submit(
+                'youth', self.db_manager.get_all_youth_detailed,
+                filters=[
+                    Contains('youth', 'youth', 'name', name),
+                    Contains('youth', 'youth', 'id_card', id_card),
+                    Unit('youth', recruitment_place, company, platoon, squad),
+                ],
+                on_result=show_results, on_error=show_error)
                 
         except Exception as e:
             QMessageBox.critical(self, "搜索错误", f"搜索时发生错误：{str(e)}")
@@ -1515,25 +1548,16 @@ class MainWindow(QMainWindow):
             reply = QMessageBox.question(
                 self, 
                 '确认删除', 
-                '确定要删除这条青年信息吗？\n删除后无法恢复！',
+                '确定要删除这条青年信息吗？\n其每日情况、谈心谈话、体检等相关记录将一并删除，删除后无法恢复！',
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                conn = None
-                try:
-                    conn = self.db_manager.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM youth WHERE id_card = ?", (id_card,))
-                    conn.commit()
-                    
-                    QMessageBox.information(self, '删除成功', '青年信息已删除')
-                    self.load_all_youth_detailed()
-                    
-                finally:
-                    if conn:
-                        conn.close()
+                self.db_manager.delete_youths([id_card])
+                
+                QMessageBox.information(self, '删除成功', '青年信息已删除')
+                self.load_all_youth_detailed()
                         
         except Exception as e:
             QMessageBox.critical(self, '删除失败', f'删除青年信息时发生错误：{str(e)}')
@@ -1604,37 +1628,18 @@ class MainWindow(QMainWindow):
         try:
             selected_id_cards = []
             selected_names = []
-            selected_rows_data = []  # 保存原始数据用于调试
-            
-            # 先从当前显示的数据中获取
-            conn = self.db_manager.get_connection()
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id_card, name, gender, nation, political_status,
-                       school, education_level, major, study_status, study_type,
-                       phone, household_address, residence_address, family_info,
-                       district, street, parent_phone, personal_experience,
-                       reference_person, reference_phone, id
-                FROM youth ORDER BY id
-            """)
-            all_results = cursor.fetchall()
-            conn.close()
             
+            # 从当前显示的结果中获取勾选行的身份证号和姓名
+            current_results = getattr(self, 'current_results', [])
             for row in range(self.search_table.rowCount()):
                 checkbox_widget = self.search_table.cellWidget(row, 0)
                 if checkbox_widget:
                     checkbox = checkbox_widget.findChild(QCheckBox)
-                    if checkbox and checkbox.isChecked():
-                        # 从原始数据中获取id_card（第一个字段）
-                        if row < len(all_results):
-                            data = all_results[row]
-                            id_card = data['id_card'] if hasattr(data, 'keys') else data[0]
-                            name = data['name'] if hasattr(data, 'keys') else data[1]
-                            
-                            if id_card:
-                                selected_id_cards.append(id_card)
-                                selected_names.append(name)
+                    if checkbox and checkbox.isChecked() and row < len(current_results):
+                        id_card, name = current_results[row][0], current_results[row][1]
+                        if id_card:
+                            selected_id_cards.append(id_card)
+                            selected_names.append(name)
             
             if not selected_id_cards:
                 QMessageBox.information(self, '提示', '请先选择要删除的青年信息')
@@ -1647,37 +1652,22 @@ class MainWindow(QMainWindow):
             reply = QMessageBox.question(
                 self,
                 '确认批量删除',
-                f'确定要删除以下青年信息吗？\n{names_text}\n\n共{len(selected_id_cards)}条记录，删除后无法恢复！',
+                f'确定要删除以下青年信息吗？\n{names_text}\n\n共{len(selected_id_cards)}条记录，其每日情况、谈心谈话、体检等相关记录将一并删除，删除后无法恢复！',
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                 QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                conn = None
-                try:
-                    conn = self.db_manager.get_connection()
-                    cursor = conn.cursor()
-                    
-                    # 逐个删除以确保成功
-                    deleted_count = 0
-                    for id_card in selected_id_cards:
-                        cursor.execute("DELETE FROM youth WHERE id_card = ?", (id_card,))
-                        if cursor.rowcount > 0:
-                            deleted_count += 1
-                    
-                    conn.commit()
-                    
-                    QMessageBox.information(self, '删除成功', f'成功删除 {deleted_count} 条青年信息')
-                    
-                    # 取消全选
-                    if hasattr(self, 'select_all_checkbox'):
-                        self.select_all_checkbox.setChecked(False)
-                    
-                    self.load_all_youth_detailed()
-                    
-                finally:
-                    if conn:
-                        conn.close()
+                # 在一个事务中删除青年及其相关记录
+                deleted_count = self.db_manager.delete_youths(selected_id_cards)
+                
+                QMessageBox.information(self, '删除成功', f'成功删除 {deleted_count} 条青年信息')
+                
+                # 取消全选
+                if hasattr(self, 'select_all_checkbox'):
+                    self.select_all_checkbox.setChecked(False)
+                
+                self.load_all_youth_detailed()
                         
         except Exception as e:
             QMessageBox.critical(self, '批量删除失败', f'批量删除青年信息时发生错误：{str(e)}')
@@ -2957,114 +2947,35 @@ class MainWindow(QMainWindow):
     
     def load_medical_screening_data(self):
         """加载病史筛查数据"""
-        try:
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # 获取时间筛选条件
-                time_condition, time_params = self.get_time_filter_condition("ms.screening_date")
-                
-                # 使用联表查询从基本信息中获取应征地、连、排、班、带训班长信息
-                base_query = """
-                    SELECT ms.id, ms.name, ms.gender, ms.id_card, 
-                           COALESCE(y.recruitment_place, '') as recruitment_place,
-                           COALESCE(y.company, '') as company,
-                           COALESCE(y.platoon, '') as platoon,
-                           COALESCE(y.squad, '') as squad,
-                           COALESCE(y.squad_leader, '') as squad_leader,
-                           ms.screening_result, ms.screening_date, 
-                           ms.remark, ms.physical_status, ms.mental_status
-                    FROM medical_screening ms
-                    LEFT JOIN youth y ON ms.id_card = y.id_card
-                """
-                
-                if time_condition:
-                    query = base_query + f" WHERE {time_condition} ORDER BY ms.screening_date DESC, ms.id DESC"
-                    cursor.execute(query, time_params)
-                else:
-                    query = base_query + " ORDER BY ms.screening_date DESC, ms.id DESC"
-                    cursor.execute(query)
-                
-                results = cursor.fetchall()
-                self.display_medical_screening_results(results)
-            finally:
-                if conn:
-                    conn.close()
-        except Exception as e:
-            QMessageBox.warning(self, "加载错误", f"加载病史筛查数据时发生错误：{str(e)}")
-            self.medical_screening_table.setRowCount(0)
+        # 获取时间筛选条件
+        where, params = self.db_manager.build_where(
+            DateRange.of('ms.screening_date', self.get_time_range()))
+        query = f"{self.MEDICAL_SCREENING_QUERY} WHERE {where} ORDER BY ms.screening_date DESC, ms.id DESC"
+        self.query_executor.submit(
+            'medical_screening', self.query_rows, query, params,
+            on_result=self.display_medical_screening_results,
+            on_error=self.load_error_handler("加载错误", "加载病史筛查数据时发生错误",
+                                             self.medical_screening_table))
     
     def search_medical_screening(self):
         """搜索病史筛查记录"""
-        try:
-            name = self.medical_name_input.text().strip()
-            id_card = self.medical_id_card_input.text().strip()
-            recruitment_place = self.medical_recruitment_place_input.text().strip()
-            company = self.medical_company_input.text().strip()
-            platoon = self.medical_platoon_input.text().strip()
-            squad = self.medical_squad_input.text().strip()
-            
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # 使用联表查询，支持新增的搜索字段
-                sql = """
-                    SELECT ms.id, ms.name, ms.gender, ms.id_card, 
-                           COALESCE(y.recruitment_place, '') as recruitment_place,
-                           COALESCE(y.company, '') as company,
-                           COALESCE(y.platoon, '') as platoon,
-                           COALESCE(y.squad, '') as squad,
-                           COALESCE(y.squad_leader, '') as squad_leader,
-                           ms.screening_result, ms.screening_date, 
-                           ms.remark, ms.physical_status, ms.mental_status
-                    FROM medical_screening ms
-                    LEFT JOIN youth y ON ms.id_card = y.id_card
-                    WHERE 1=1
-                """
-                params = []
-                
-                if name:
-                    sql += " AND ms.name LIKE ?"
-                    params.append(f"%{name}%")
-                
-                if id_card:
-                    sql += " AND ms.id_card LIKE ?"
-                    params.append(f"%{id_card}%")
-                
-                if recruitment_place:
-                    sql += " AND y.recruitment_place LIKE ?"
-                    params.append(f"%{recruitment_place}%")
-                
-                if company:
-                    sql += " AND y.company LIKE ?"
-                    params.append(f"%{company}%")
-                
-                if platoon:
-                    sql += " AND y.platoon LIKE ?"
-                    params.append(f"%{platoon}%")
-                
-                if squad:
-                    sql += " AND y.squad LIKE ?"
-                    params.append(f"%{squad}%")
-                
-                sql += " ORDER BY ms.screening_date DESC, ms.id DESC"
-                
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                self.display_medical_screening_results(results)
-                
-            finally:
-                if conn:
-                    conn.close()
-                    
-        except Exception as e:
-            QMessageBox.warning(self, "搜索错误", f"搜索病史筛查记录时发生错误：{str(e)}")
+        name = self.medical_name_input.text().strip()
+        id_card = self.medical_id_card_input.text().strip()
+        recruitment_place = self.medical_recruitment_place_input.text().strip()
+        company = self.medical_company_input.text().strip()
+        platoon = self.medical_platoon_input.text().strip()
+        squad = self.medical_squad_input.text().strip()
+        
+        where, params = self.db_manager.build_where(
+            Contains('medical_screening', 'ms', 'name', name),
+            Contains('medical_screening', 'ms', 'id_card', id_card),
+            Unit('y', recruitment_place, company, platoon, squad),
+        )
+        query = f"{self.MEDICAL_SCREENING_QUERY} WHERE {where} ORDER BY ms.screening_date DESC, ms.id DESC"
+        self.query_executor.submit(
+            'medical_screening', self.query_rows, query, params,
+            on_result=self.display_medical_screening_results,
+            on_error=self.load_error_handler("搜索错误", "搜索病史筛查记录时发生错误"))
     
     def reset_medical_screening_search(self):
         """重置病史筛查搜索"""
@@ -3656,19 +3567,8 @@ class MainWindow(QMainWindow):
             squad = self.exception_squad_input.text().strip()
             
             # 使用视图数据进行筛选（同时应用日期范围和搜索条件）
-            view_records = self.db_manager.get_exception_statistics_view_data(
-                start_date=start_date,
-                end_date=end_date,
-                name=name if name else None,
-                id_card=id_card if id_card else None,
-                recruitment_place=recruitment_place if recruitment_place else None,
-                company=company if company else None,
-                platoon=platoon if platoon else None,
-                squad=squad if squad else None
-            )
-            
-            # 直接使用视图数据
-            self.display_exception_statistics_records(view_records)
+            self.query_exception_statistics(start_date, end_date, name, id_card, recruitment_place,
+                                            company, platoon, squad, "按日期范围筛选数据时发生错误")
             
         except Exception as e:
             QMessageBox.warning(self, "筛选错误", f"按日期范围筛选数据时发生错误：{str(e)}")
@@ -3775,19 +3675,8 @@ class MainWindow(QMainWindow):
                     end_date = today.strftime('%Y-%m-%d')
             
             # 使用视图数据进行搜索
-            view_records = self.db_manager.get_exception_statistics_view_data(
-                start_date=start_date,
-                end_date=end_date,
-                name=name if name else None,
-                id_card=id_card if id_card else None,
-                recruitment_place=recruitment_place if recruitment_place else None,
-                company=company if company else None,
-                platoon=platoon if platoon else None,
-                squad=squad if squad else None
-            )
-            
-            # 直接使用视图数据
-            self.display_exception_statistics_records(view_records)
+            self.query_exception_statistics(start_date, end_date, name, id_card, recruitment_place,
+                                            company, platoon, squad, "应用筛选条件时发生错误")
             
         except Exception as e:
             QMessageBox.warning(self, "筛选错误", f"应用筛选条件时发生错误：{str(e)}")
@@ -3798,6 +3687,22 @@ class MainWindow(QMainWindow):
             except:
                 pass
 
+    def query_exception_statistics(self, start_date, end_date, name, id_card, recruitment_place,
+                                   company, platoon, squad, error_message):
+        """在后台查询异常统计数据并显示（新的筛选会取消尚未完成的上一次查询）"""
+        self.query_executor.submit(
+            'exception_statistics', self.db_manager.get_exception_statistics_view_data,
+            start_date=start_date,
+            end_date=end_date,
+            name=name if name else None,
+            id_card=id_card if id_card else None,
+            recruitment_place=recruitment_place if recruitment_place else None,
+            company=company if company else None,
+            platoon=platoon if platoon else None,
+            squad=squad if squad else None,
+            on_result=self.display_exception_statistics_records,
+            on_error=self.load_error_handler("筛选错误", error_message))
+    
     def search_exception_statistics(self):
         """搜索异常情况统计记录"""
         # 直接调用统一的筛选方法
@@ -4365,13 +4270,11 @@ class MainWindow(QMainWindow):
 
     def load_daily_stats_data(self):
         """加载每日情况统计数据（新版本）"""
-        try:
-            # 获取时间筛选条件
-            time_condition, time_params = self.get_time_filter_condition("record_date")
-            results = self.db_manager.get_all_daily_stats_with_youth_info(time_condition, time_params)
-            self.display_daily_stats_data(results)
-        except Exception as e:
-            QMessageBox.warning(self, "加载错误", f"加载每日情况统计数据时发生错误：{str(e)}")
+        self.query_executor.submit(
+            'daily_stats', self.db_manager.get_all_daily_stats_with_youth_info,
+            date_range=self.get_time_range(),
+            on_result=self.display_daily_stats_data,
+            on_error=self.load_error_handler("加载错误", "加载每日情况统计数据时发生错误"))
 
     def display_daily_stats_data(self, results):
         """显示每日情况统计数据"""
@@ -4527,23 +4430,19 @@ class MainWindow(QMainWindow):
 
     def search_daily_stats(self):
         """搜索每日情况统计（新版本）"""
-        try:
-            name = self.daily_name_input.text().strip()
-            id_card = self.daily_id_card_input.text().strip()
-            recruitment_place = self.daily_recruitment_place_input.text().strip()
-            company = self.daily_company_input.text().strip()
-            platoon = self.daily_platoon_input.text().strip()
-            squad = self.daily_squad_input.text().strip()
-            
-            results = self.db_manager.search_daily_stats_with_youth_info(
-                name=name, id_card=id_card, recruitment_place=recruitment_place,
-                company=company, platoon=platoon, squad=squad
-            )
-            
-            self.display_daily_stats_data(results)
-            
-        except Exception as e:
-            QMessageBox.warning(self, "搜索错误", f"搜索每日情况统计时发生错误：{str(e)}")
+        name = self.daily_name_input.text().strip()
+        id_card = self.daily_id_card_input.text().strip()
+        recruitment_place = self.daily_recruitment_place_input.text().strip()
+        company = self.daily_company_input.text().strip()
+        platoon = self.daily_platoon_input.text().strip()
+        squad = self.daily_squad_input.text().strip()
+        
+        self.query_executor.submit(
+            'daily_stats', self.db_manager.search_daily_stats_with_youth_info,
+            name=name, id_card=id_card, recruitment_place=recruitment_place,
+            company=company, platoon=platoon, squad=squad,
+            on_result=self.display_daily_stats_data,
+            on_error=self.load_error_handler("搜索错误", "搜索每日情况统计时发生错误"))
 
     def reset_daily_stats_search(self):
         """重置每日情况统计搜索（新版本）"""
@@ -4570,17 +4469,17 @@ class MainWindow(QMainWindow):
 
     def filter_daily_stats(self):
         """按日期筛选每日情况统计（新版本）"""
-        try:
-            start_date = self.daily_start_date_input.date().toString('yyyy-MM-dd')
-            end_date = self.daily_end_date_input.date().toString('yyyy-MM-dd')
-            
-            results = self.db_manager.filter_daily_stats_by_date_range(start_date, end_date)
+        start_date = self.daily_start_date_input.date().toString('yyyy-MM-dd')
+        end_date = self.daily_end_date_input.date().toString('yyyy-MM-dd')
+        
+        def show_results(results):
             self.display_daily_stats_data(results)
-            
             QMessageBox.information(self, '筛选完成', f'找到 {len(results)} 条记录')
-            
-        except Exception as e:
-            QMessageBox.warning(self, "筛选错误", f"筛选每日情况统计数据时发生错误：{str(e)}")
+        
+        self.query_executor.submit(
+            'daily_stats', self.db_manager.filter_daily_stats_by_date_range, start_date, end_date,
+            on_result=show_results,
+            on_error=self.load_error_handler("筛选错误", "筛选每日情况统计数据时发生错误"))
 
     def reset_daily_stats_filter(self):
         """重置每日情况统计筛选（新版本）"""
@@ -4748,15 +4647,11 @@ class MainWindow(QMainWindow):
                                 name = name_item.text()
                                 
                                 # 获取youth_id
-                                conn = self.db_manager.get_connection()
-                                cursor = conn.cursor()
-                                cursor.execute('SELECT id FROM youth WHERE id_card = ?', (id_card,))
-                                result = cursor.fetchone()
-                                conn.close()
+                                youth_id = self.db_manager.youth_directory.youth_id(id_card)
                                 
-                                if result:
+                                if youth_id is not None:
                                     youth_info = {
-                                        'youth_id': result[0],
+                                        'youth_id': youth_id,
                                         'id_card': id_card,
                                         'name': name
                                     }
@@ -5066,11 +4961,10 @@ class MainWindow(QMainWindow):
                 cursor = conn.cursor()
                 
                 try:
-                    # 批量查询青年ID
+                    # 按青年目录查找青年ID
                     id_cards = [record['id_card'] for record in valid_records]
-                    placeholders = ','.join(['?' for _ in id_cards])
-                    cursor.execute(f'SELECT id_card, id FROM youth WHERE id_card IN ({placeholders})', id_cards)
-                    youth_id_map = {row[0]: row[1] for row in cursor.fetchall()}
+                    youth_id_map = {id_card: youth[0]
+                                    for id_card, youth in self.db_manager.youth_directory.lookup(id_cards).items()}
                     
                     # 过滤出存在的青年记录
                     existing_records = []
@@ -5504,16 +5398,11 @@ class MainWindow(QMainWindow):
                 QMessageBox.warning(self, '导入失败', '没有有效的文件可以导入')
                 return
             
-            # 批量验证身份证号是否存在
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
             try:
-                # 批量查询青年信息
+                # 按青年目录查找青年信息
                 id_cards = [file_info['id_card'] for file_info in valid_files]
-                placeholders = ','.join(['?' for _ in id_cards])
-                cursor.execute(f'SELECT id_card, name, gender FROM youth WHERE id_card IN ({placeholders})', id_cards)
-                youth_info_map = {row[0]: {'name': row[1], 'gender': row[2]} for row in cursor.fetchall()}
+                youth_info_map = {id_card: {'name': youth[1], 'gender': youth[2]}
+                                  for id_card, youth in self.db_manager.youth_directory.lookup(id_cards).items()}
                 
                 # 过滤出存在的青年记录
                 valid_records = []
@@ -5532,49 +5421,35 @@ class MainWindow(QMainWindow):
                         failed_files.append(f'{file_info["filename"]}: 身份证号 {id_card} 在基本信息表中不存在')
                 
                 if not valid_records:
-                    conn.close()
                     QMessageBox.warning(self, '导入失败', '没有找到对应的青年信息')
                     return
                 
-                # 检查是否有需要覆盖的数据
-                existing_records = []
-                new_records = []
-                
+                # 写入文件存储后整批写入；已有记录时先不写入，确认后再覆盖
+                table_name = 'town_interview' if interview_type == 'town' else 'leader_interview'
+                rows = []
                 for record in valid_records:
-                    # 检查是否已存在记录
-                    if interview_type == 'town':
-                        cursor.execute('''
-                            SELECT id, youth_name FROM town_interview 
-                            WHERE youth_id_card = ? AND interview_date = ?
-                        ''', (record['id_card'], interview_date))
-                    else:  # leader
-                        cursor.execute('''
-                            SELECT id, youth_name FROM leader_interview 
-                            WHERE youth_id_card = ? AND interview_date = ?
-                        ''', (record['id_card'], interview_date))
-                    
-                    existing_record = cursor.fetchone()
-                    if existing_record:
-                        existing_records.append({
-                            'record': record,
-                            'existing_name': existing_record[1]
-                        })
-                    else:
-                        new_records.append(record)
+                    image_hash, image_size = self.db_manager.store_image(record['image_data'])
+                    rows.append({
+                        'youth_id_card': record['id_card'], 'youth_name': record['name'],
+                        'gender': record['gender'], 'interview_date': interview_date,
+                        'visit_survey_image': None, 'image_hash': image_hash, 'image_size': image_size,
+                        'thoughts': '正常', 'spirit': '正常',
+                    })
+                
+                result = self.db_manager.bulk_upsert(table_name, rows, 'report')
+                existing_records = result['conflicts']
                 
                 # 如果有需要覆盖的数据，弹出确认框
                 if existing_records:
-                    conn.close()
-                    
                     # 构建确认消息
                     confirm_msg = f"检测到以下 {len(existing_records)} 条记录已存在，将被覆盖：\n\n"
-                    for i, item in enumerate(existing_records[:5]):  # 最多显示5条
-                        confirm_msg += f"{i+1}. {item['record']['name']} ({item['record']['id_card'][-4:]})\n"
+                    for i, row in enumerate(existing_records[:5]):  # 最多显示5条
+                        confirm_msg += f"{i+1}. {row['youth_name']} ({row['youth_id_card'][-4:]})\n"
                     
                     if len(existing_records) > 5:
                         confirm_msg += f"... 还有 {len(existing_records) - 5} 条记录\n"
                     
-                    confirm_msg += f"\n新增记录：{len(new_records)} 条"
+                    confirm_msg += f"\n新增记录：{len(rows) - len(existing_records)} 条"
                     confirm_msg += f"\n日期：{interview_date}"
                     confirm_msg += "\n\n是否继续导入并覆盖现有数据？"
                     
@@ -5587,75 +5462,12 @@ class MainWindow(QMainWindow):
                     if reply != QMessageBox.StandardButton.Yes:
                         return
                     
-                    # 重新连接数据库继续处理
-                    conn = self.db_manager.get_connection()
-                    cursor = conn.cursor()
+                    result = self.db_manager.bulk_upsert(table_name, rows, 'overwrite')
                 
-                # 批量处理数据
-                if interview_type == 'town':
-                    # 处理镇街谈心谈话记录
-                    for record in valid_records:
-                        # 检查是否已存在记录
-                        cursor.execute('''
-                            SELECT id FROM town_interview 
-                            WHERE youth_id_card = ? AND interview_date = ?
-                        ''', (record['id_card'], interview_date))
-                        existing_record = cursor.fetchone()
-                        
-                        if existing_record:
-                            # 更新现有记录
-                            cursor.execute('''
-                                UPDATE town_interview 
-                                SET youth_name = ?, gender = ?, visit_survey_image = ?, 
-                                    thoughts = ?, spirit = ?
-                                WHERE youth_id_card = ? AND interview_date = ?
-                            ''', (record['name'], record['gender'], record['image_data'], 
-                                  '正常', '正常', record['id_card'], interview_date))
-                        else:
-                            # 插入新记录
-                            cursor.execute('''
-                                INSERT INTO town_interview (youth_id_card, youth_name, gender, interview_date, 
-                                                           visit_survey_image, thoughts, spirit)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (record['id_card'], record['name'], record['gender'], interview_date, 
-                                  record['image_data'], '正常', '正常'))
-                        success_count += 1
-                else:  # leader
-                    # 处理领导谈心谈话记录
-                    for record in valid_records:
-                        # 检查是否已存在记录
-                        cursor.execute('''
-                            SELECT id FROM leader_interview 
-                            WHERE youth_id_card = ? AND interview_date = ?
-                        ''', (record['id_card'], interview_date))
-                        existing_record = cursor.fetchone()
-                        
-                        if existing_record:
-                            # 更新现有记录
-                            cursor.execute('''
-                                UPDATE leader_interview 
-                                SET youth_name = ?, gender = ?, visit_survey_image = ?, 
-                                    thoughts = ?, spirit = ?
-                                WHERE youth_id_card = ? AND interview_date = ?
-                            ''', (record['name'], record['gender'], record['image_data'], 
-                                  '正常', '正常', record['id_card'], interview_date))
-                        else:
-                            # 插入新记录
-                            cursor.execute('''
-                                INSERT INTO leader_interview (youth_id_card, youth_name, gender, interview_date, 
-                                                             visit_survey_image, thoughts, spirit)
-                                VALUES (?, ?, ?, ?, ?, ?, ?)
-                            ''', (record['id_card'], record['name'], record['gender'], interview_date, 
-                                  record['image_data'], '正常', '正常'))
-                        success_count += 1
-                
-                conn.commit()
+                success_count = result['inserted'] + result['updated']
                 
             except Exception as e:
-                conn.rollback()
                 failed_files.append(f'数据库操作失败: {str(e)}')
-            finally:
-                conn.close()
             
             # 刷新数据
             if interview_type == 'town':
@@ -5937,118 +5749,35 @@ class MainWindow(QMainWindow):
 
     def load_physical_examination_data(self):
         """加载体检情况数据"""
-        try:
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                # 获取时间筛选条件
-                time_condition, time_params = self.get_time_filter_condition("pe.district_date")
-                
-                base_query = """
-                    SELECT pe.id, pe.youth_id_card, pe.name, pe.gender,
-                           pe.district_exam, pe.district_positive, pe.district_date,
-                           pe.city_exam, pe.city_positive, pe.city_date,
-                           pe.special_exam, pe.special_positive, pe.special_date,
-                           pe.body_status, pe.psychological_test_type, pe.tracking_opinion,
-                           pe.implementation_status,
-                           COALESCE(y.recruitment_place, '') as recruitment_place,
-                           COALESCE(y.company, '') as company,
-                           COALESCE(y.platoon, '') as platoon,
-                           COALESCE(y.squad, '') as squad,
-                           COALESCE(y.squad_leader, '') as squad_leader
-                    FROM physical_examination pe
-                    LEFT JOIN youth y ON pe.youth_id_card = y.id_card
-                """
-                
-                if time_condition:
-                    query = base_query + f" WHERE {time_condition} ORDER BY pe.id"
-                    cursor.execute(query, time_params)
-                else:
-                    query = base_query + " ORDER BY pe.id"
-                    cursor.execute(query)
-                
-                results = cursor.fetchall()
-                self.display_physical_examination_results(results)
-            finally:
-                if conn:
-                    conn.close()
-        except Exception as e:
-            QMessageBox.warning(self, "加载错误", f"加载体检情况数据时发生错误：{str(e)}")
-            self.physical_examination_table.setRowCount(0)
+        # 获取时间筛选条件
+        where, params = self.db_manager.build_where(
+            DateRange.of('pe.district_date', self.get_time_range()))
+        query = f"{self.PHYSICAL_EXAMINATION_QUERY} WHERE {where} ORDER BY pe.id"
+        self.query_executor.submit(
+            'physical_examination', self.query_rows, query, params,
+            on_result=self.display_physical_examination_results,
+            on_error=self.load_error_handler("加载错误", "加载体检情况数据时发生错误",
+                                             self.physical_examination_table))
     
     def search_physical_examination(self):
         """搜索体检情况记录"""
-        try:
-            name = self.physical_name_input.text().strip()
-            id_card = self.physical_id_card_input.text().strip()
-            recruitment_place = self.physical_recruitment_place_input.text().strip()
-            company = self.physical_company_input.text().strip()
-            platoon = self.physical_platoon_input.text().strip()
-            squad = self.physical_squad_input.text().strip()
-            
-            conn = None
-            try:
-                conn = self.db_manager.get_connection()
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                
-                sql = """
-                    SELECT pe.id, pe.youth_id_card, pe.name, pe.gender,
-                           pe.district_exam, pe.district_positive, pe.district_date,
-                           pe.city_exam, pe.city_positive, pe.city_date,
-                           pe.special_exam, pe.special_positive, pe.special_date,
-                           pe.body_status, pe.psychological_test_type, pe.tracking_opinion,
-                           pe.implementation_status,
-                           COALESCE(y.recruitment_place, '') as recruitment_place,
-                           COALESCE(y.company, '') as company,
-                           COALESCE(y.platoon, '') as platoon,
-                           COALESCE(y.squad, '') as squad,
-                           COALESCE(y.squad_leader, '') as squad_leader
-                    FROM physical_examination pe
-                    LEFT JOIN youth y ON pe.youth_id_card = y.id_card
-                    WHERE 1=1
-                """
-                params = []
-                
-                if name:
-                    sql += " AND pe.name LIKE ?"
-                    params.append(f"%{name}%")
-                
-                if id_card:
-                    sql += " AND pe.youth_id_card LIKE ?"
-                    params.append(f"%{id_card}%")
-                
-                if recruitment_place:
-                    sql += " AND y.recruitment_place LIKE ?"
-                    params.append(f"%{recruitment_place}%")
-                
-                if company:
-                    sql += " AND y.company LIKE ?"
-                    params.append(f"%{company}%")
-                
-                if platoon:
-                    sql += " AND y.platoon LIKE ?"
-                    params.append(f"%{platoon}%")
-                
-                if squad:
-                    sql += " AND y.squad LIKE ?"
-                    params.append(f"%{squad}%")
-                
-                sql += " ORDER BY pe.id"
-                
-                cursor.execute(sql, params)
-                results = cursor.fetchall()
-                self.display_physical_examination_results(results)
-                
-            finally:
-                if conn:
-                    conn.close()
-                    
-        except Exception as e:
-            QMessageBox.warning(self, "搜索错误", f"搜索体检情况记录时发生错误：{str(e)}")
+        name = self.physical_name_input.text().strip()
+        id_card = self.physical_id_card_input.text().strip()
+        recruitment_place = self.physical_recruitment_place_input.text().strip()
+        company = self.physical_company_input.text().strip()
+        platoon = self.physical_platoon_input.text().strip()
+        squad = self.physical_squad_input.text().strip()
+        
+        where, params = self.db_manager.build_where(
+            Contains('physical_examination', 'pe', 'name', name),
+            Contains('physical_examination', 'pe', 'youth_id_card', id_card),
+            Unit('y', recruitment_place, company, platoon, squad),
+        )
+        query = f"{self.PHYSICAL_EXAMINATION_QUERY} WHERE {where} ORDER BY pe.id"
+        self.query_executor.submit(
+            'physical_examination', self.query_rows, query, params,
+            on_result=self.display_physical_examination_results,
+            on_error=self.load_error_handler("搜索错误", "搜索体检情况记录时发生错误"))
     
     def reset_physical_examination_search(self):
         """重置体检情况搜索"""
@@ -6393,231 +6122,175 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
         
-        try:
-            import openpyxl
-            wb = openpyxl.load_workbook(file_path)
-            ws = wb.active
-            
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            
-            count = 0
-            updated_count = 0
-            errors = []
-            
-            is_merged_format = False
-            # 检查第1行是否有"检查阶段"列（表头在第1行）
-            for cell in ws[1]:
+        # 读取Excel和写入数据库在后台执行
+        self.query_executor.submit(
+            'import_physical_examination', self.read_physical_examination_file, file_path,
+            on_result=self.show_physical_examination_import_result,
+            on_error=lambda e: QMessageBox.critical(self, '导入失败', f'导入体检情况数据时发生错误：{str(e)}'))
+    
+    def read_physical_examination_file(self, file_path):
+        """读取体检情况Excel并批量写入，返回 (处理条数, 覆盖更新条数, 错误信息列表)
+
+        在后台线程中执行，不能操作界面
+        """
+        import openpyxl
+        wb = openpyxl.load_workbook(file_path)
+        ws = wb.active
+        
+        # 按青年目录校验身份证号，不再逐行查询
+        youth_directory = self.db_manager.youth_directory
+        
+        rows = []
+        errors = []
+        
+        is_merged_format = False
+        # 检查第1行是否有"检查阶段"列（表头在第1行）
+        for cell in ws[1]:
+            if cell.value == '检查阶段':
+                is_merged_format = True
+                break
+        
+        # 如果第1行没有，检查第2行（可能有标题行）
+        if not is_merged_format:
+            for cell in ws[2]:
                 if cell.value == '检查阶段':
                     is_merged_format = True
                     break
+        
+        if is_merged_format:
+            # 确定数据起始行
+            data_start_row = 2 if ws[1][4].value == '检查阶段' else 3
             
-            # 如果第1行没有，检查第2行（可能有标题行）
-            if not is_merged_format:
-                for cell in ws[2]:
-                    if cell.value == '检查阶段':
-                        is_merged_format = True
-                        break
-            
-            if is_merged_format:
-                # 确定数据起始行
-                data_start_row = 2 if ws[1][4].value == '检查阶段' else 3
-                
-                row_idx = data_start_row
-                while row_idx <= ws.max_row:
-                    try:
-                        id_card_cell = ws[f'D{row_idx}']
-                        name_cell = ws[f'B{row_idx}']
-                        gender_cell = ws[f'C{row_idx}']
-                        
-                        youth_id_card = str(id_card_cell.value).strip() if id_card_cell.value else ''
-                        name = str(name_cell.value).strip() if name_cell.value else ''
-                        gender = str(gender_cell.value).strip() if gender_cell.value else ''
-                        
-                        if not youth_id_card:
-                            row_idx += 3
-                            continue
-                        
-                        district_positive = str(ws[f'F{row_idx}'].value).strip() if ws[f'F{row_idx}'].value else ''
-                        district_date = str(ws[f'G{row_idx}'].value).strip() if ws[f'G{row_idx}'].value else ''
-                        city_positive = str(ws[f'F{row_idx + 1}'].value).strip() if ws[f'F{row_idx + 1}'].value else ''
-                        city_date = str(ws[f'G{row_idx + 1}'].value).strip() if ws[f'G{row_idx + 1}'].value else ''
-                        special_positive = str(ws[f'F{row_idx + 2}'].value).strip() if ws[f'F{row_idx + 2}'].value else ''
-                        special_date = str(ws[f'G{row_idx + 2}'].value).strip() if ws[f'G{row_idx + 2}'].value else ''
-                        
-                        # 身体状况和检测类型从第一行读取（如果三行都有值，取第一行）
-                        body_status_1 = str(ws[f'H{row_idx}'].value).strip() if ws[f'H{row_idx}'].value else ''
-                        body_status_2 = str(ws[f'H{row_idx + 1}'].value).strip() if ws[f'H{row_idx + 1}'].value else ''
-                        body_status_3 = str(ws[f'H{row_idx + 2}'].value).strip() if ws[f'H{row_idx + 2}'].value else ''
-                        body_status = body_status_1 or body_status_2 or body_status_3
-                        
-                        test_type_1 = str(ws[f'I{row_idx}'].value).strip() if ws[f'I{row_idx}'].value else ''
-                        test_type_2 = str(ws[f'I{row_idx + 1}'].value).strip() if ws[f'I{row_idx + 1}'].value else ''
-                        test_type_3 = str(ws[f'I{row_idx + 2}'].value).strip() if ws[f'I{row_idx + 2}'].value else ''
-                        psychological_test_type = test_type_1 or test_type_2 or test_type_3
-                        
-                        tracking_opinion_cell = ws[f'J{row_idx}']
-                        implementation_status_cell = ws[f'K{row_idx}']
-                        
-                        tracking_opinion = str(tracking_opinion_cell.value).strip() if tracking_opinion_cell.value else ''
-                        implementation_status = str(implementation_status_cell.value).strip() if implementation_status_cell.value else ''
-                        
-                        district_exam = ''
-                        city_exam = ''
-                        special_exam = ''
-                        
-                        cursor.execute("SELECT id_card FROM youth WHERE id_card = ?", (youth_id_card,))
-                        if not cursor.fetchone():
-                            errors.append(f"第{row_idx}行：身份证号 {youth_id_card} 不存在于基本信息中")
-                            row_idx += 3
-                            continue
-                        
-                        cursor.execute("""
-                            SELECT id FROM physical_examination 
-                            WHERE youth_id_card = ? 
-                            AND district_date = ? 
-                            AND city_date = ? 
-                            AND special_date = ?
-                        """, (youth_id_card, district_date, city_date, special_date))
-                        existing_record = cursor.fetchone()
-                        
-                        if existing_record:
-                            cursor.execute("""
-                                UPDATE physical_examination 
-                                SET name = ?, gender = ?,
-                                    district_exam = ?, district_positive = ?,
-                                    city_exam = ?, city_positive = ?,
-                                    special_exam = ?, special_positive = ?,
-                                    body_status = ?, psychological_test_type = ?,
-                                    tracking_opinion = ?, implementation_status = ?
-                                WHERE id = ?
-                            """, (name, gender,
-                                  district_exam, district_positive,
-                                  city_exam, city_positive,
-                                  special_exam, special_positive,
-                                  body_status, psychological_test_type,
-                                  tracking_opinion, implementation_status,
-                                  existing_record[0]))
-                            updated_count += 1
-                        else:
-                            cursor.execute("""
-                                INSERT INTO physical_examination 
-                                (youth_id_card, name, gender, 
-                                 district_exam, district_positive, district_date,
-                                 city_exam, city_positive, city_date,
-                                 special_exam, special_positive, special_date,
-                                 body_status, psychological_test_type, tracking_opinion, implementation_status)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (youth_id_card, name, gender, 
-                                  district_exam, district_positive, district_date,
-                                  city_exam, city_positive, city_date,
-                                  special_exam, special_positive, special_date,
-                                  body_status, psychological_test_type, tracking_opinion, implementation_status))
-                        
-                        count += 1
+            row_idx = data_start_row
+            while row_idx <= ws.max_row:
+                try:
+                    id_card_cell = ws[f'D{row_idx}']
+                    name_cell = ws[f'B{row_idx}']
+                    gender_cell = ws[f'C{row_idx}']
+                    
+                    youth_id_card = str(id_card_cell.value).strip() if id_card_cell.value else ''
+                    name = str(name_cell.value).strip() if name_cell.value else ''
+                    gender = str(gender_cell.value).strip() if gender_cell.value else ''
+                    
+                    if not youth_id_card:
                         row_idx += 3
-                        
-                    except Exception as e:
-                        errors.append(f"第{row_idx}行：{str(e)}")
+                        continue
+                    
+                    district_positive = str(ws[f'F{row_idx}'].value).strip() if ws[f'F{row_idx}'].value else ''
+                    district_date = str(ws[f'G{row_idx}'].value).strip() if ws[f'G{row_idx}'].value else ''
+                    city_positive = str(ws[f'F{row_idx + 1}'].value).strip() if ws[f'F{row_idx + 1}'].value else ''
+                    city_date = str(ws[f'G{row_idx + 1}'].value).strip() if ws[f'G{row_idx + 1}'].value else ''
+                    special_positive = str(ws[f'F{row_idx + 2}'].value).strip() if ws[f'F{row_idx + 2}'].value else ''
+                    special_date = str(ws[f'G{row_idx + 2}'].value).strip() if ws[f'G{row_idx + 2}'].value else ''
+                    
+                    # 身体状况和检测类型从第一行读取（如果三行都有值，取第一行）
+                    body_status_1 = str(ws[f'H{row_idx}'].value).strip() if ws[f'H{row_idx}'].value else ''
+                    body_status_2 = str(ws[f'H{row_idx + 1}'].value).strip() if ws[f'H{row_idx + 1}'].value else ''
+                    body_status_3 = str(ws[f'H{row_idx + 2}'].value).strip() if ws[f'H{row_idx + 2}'].value else ''
+                    body_status = body_status_1 or body_status_2 or body_status_3
+                    
+                    test_type_1 = str(ws[f'I{row_idx}'].value).strip() if ws[f'I{row_idx}'].value else ''
+                    test_type_2 = str(ws[f'I{row_idx + 1}'].value).strip() if ws[f'I{row_idx + 1}'].value else ''
+                    test_type_3 = str(ws[f'I{row_idx + 2}'].value).strip() if ws[f'I{row_idx + 2}'].value else ''
+                    psychological_test_type = test_type_1 or test_type_2 or test_type_3
+                    
+                    tracking_opinion_cell = ws[f'J{row_idx}']
+                    implementation_status_cell = ws[f'K{row_idx}']
+                    
+                    tracking_opinion = str(tracking_opinion_cell.value).strip() if tracking_opinion_cell.value else ''
+                    implementation_status = str(implementation_status_cell.value).strip() if implementation_status_cell.value else ''
+                    
+                    district_exam = ''
+                    city_exam = ''
+                    special_exam = ''
+                    
+                    if youth_id_card not in youth_directory:
+                        errors.append(f"第{row_idx}行：身份证号 {youth_id_card} 不存在于基本信息中")
                         row_idx += 3
-            else:
-                for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                    try:
-                        if not row[0]:
-                            continue
-                        
-                        youth_id_card = str(row[0]).strip()
-                        name = str(row[1]).strip() if row[1] else ''
-                        gender = str(row[2]).strip() if row[2] else ''
-                        district_exam = str(row[3]).strip() if row[3] else ''
-                        district_positive = str(row[4]).strip() if row[4] else ''
-                        district_date = str(row[5]).strip() if row[5] else ''
-                        city_exam = str(row[6]).strip() if row[6] else ''
-                        city_positive = str(row[7]).strip() if row[7] else ''
-                        city_date = str(row[8]).strip() if row[8] else ''
-                        special_exam = str(row[9]).strip() if row[9] else ''
-                        special_positive = str(row[10]).strip() if row[10] else ''
-                        special_date = str(row[11]).strip() if row[11] else ''
-                        body_status = str(row[12]).strip() if row[12] else ''
-                        psychological_test_type = str(row[13]).strip() if row[13] else ''
-                        tracking_opinion = str(row[14]).strip() if row[14] else ''
-                        implementation_status = str(row[15]).strip() if row[15] else ''
-                        
-                        cursor.execute("SELECT id_card FROM youth WHERE id_card = ?", (youth_id_card,))
-                        if not cursor.fetchone():
-                            errors.append(f"第{row_idx}行：身份证号 {youth_id_card} 不存在于基本信息中")
-                            continue
-                        
-                        cursor.execute("""
-                            SELECT id FROM physical_examination 
-                            WHERE youth_id_card = ? 
-                            AND district_date = ? 
-                            AND city_date = ? 
-                            AND special_date = ?
-                        """, (youth_id_card, district_date, city_date, special_date))
-                        existing_record = cursor.fetchone()
-                        
-                        if existing_record:
-                            cursor.execute("""
-                                UPDATE physical_examination 
-                                SET name = ?, gender = ?,
-                                    district_exam = ?, district_positive = ?,
-                                    city_exam = ?, city_positive = ?,
-                                    special_exam = ?, special_positive = ?,
-                                    body_status = ?, psychological_test_type = ?,
-                                    tracking_opinion = ?, implementation_status = ?
-                                WHERE id = ?
-                            """, (name, gender,
-                                  district_exam, district_positive,
-                                  city_exam, city_positive,
-                                  special_exam, special_positive,
-                                  body_status, psychological_test_type,
-                                  tracking_opinion, implementation_status,
-                                  existing_record[0]))
-                            updated_count += 1
-                        else:
-                            cursor.execute("""
-                                INSERT INTO physical_examination 
-                                (youth_id_card, name, gender, 
-                                 district_exam, district_positive, district_date,
-                                 city_exam, city_positive, city_date,
-                                 special_exam, special_positive, special_date,
-                                 body_status, psychological_test_type, tracking_opinion, implementation_status)
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            """, (youth_id_card, name, gender, 
-                                  district_exam, district_positive, district_date,
-                                  city_exam, city_positive, city_date,
-                                  special_exam, special_positive, special_date,
-                                  body_status, psychological_test_type, tracking_opinion, implementation_status))
-                        
-                        count += 1
-                        
-                    except Exception as e:
-                        errors.append(f"第{row_idx}行：{str(e)}")
-            
-            conn.commit()
-            conn.close()
-            
-            new_count = count - updated_count
-            result_parts = []
-            if new_count > 0:
-                result_parts.append(f"新增 {new_count} 条记录")
-            if updated_count > 0:
-                result_parts.append(f"覆盖更新 {updated_count} 条记录（日期相同）")
-            result_msg = "、".join(result_parts) if result_parts else "未导入任何记录"
-            
-            if errors:
-                error_msg = f"成功处理 {count} 条记录（{result_msg}）\n\n以下记录导入失败：\n" + "\n".join(errors[:10])
-                if len(errors) > 10:
-                    error_msg += f"\n... 还有 {len(errors) - 10} 条错误"
-                QMessageBox.warning(self, '导入完成（有错误）', error_msg)
-            else:
-                QMessageBox.information(self, '导入成功', f'成功处理 {count} 条记录\n{result_msg}')
-            
-            self.load_physical_examination_data()
-            
-        except Exception as e:
-            QMessageBox.critical(self, '导入失败', f'导入体检情况数据时发生错误：{str(e)}')
+                        continue
+                    
+                    # 检查日期都相同的记录覆盖更新，由批量写入处理
+                    rows.append({
+                        'youth_id_card': youth_id_card, 'name': name, 'gender': gender,
+                        'district_exam': district_exam, 'district_positive': district_positive,
+                        'district_date': district_date,
+                        'city_exam': city_exam, 'city_positive': city_positive, 'city_date': city_date,
+                        'special_exam': special_exam, 'special_positive': special_positive,
+                        'special_date': special_date,
+                        'body_status': body_status, 'psychological_test_type': psychological_test_type,
+                        'tracking_opinion': tracking_opinion, 'implementation_status': implementation_status,
+                    })
+                    row_idx += 3
+                    
+                except Exception as e:
+                    errors.append(f"第{row_idx}行：{str(e)}")
+                    row_idx += 3
+        else:
+            for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+                try:
+                    if not row[0]:
+                        continue
+                    
+                    youth_id_card = str(row[0]).strip()
+                    name = str(row[1]).strip() if row[1] else ''
+                    gender = str(row[2]).strip() if row[2] else ''
+                    district_exam = str(row[3]).strip() if row[3] else ''
+                    district_positive = str(row[4]).strip() if row[4] else ''
+                    district_date = str(row[5]).strip() if row[5] else ''
+                    city_exam = str(row[6]).strip() if row[6] else ''
+                    city_positive = str(row[7]).strip() if row[7] else ''
+                    city_date = str(row[8]).strip() if row[8] else ''
+                    special_exam = str(row[9]).strip() if row[9] else ''
+                    special_positive = str(row[10]).strip() if row[10] else ''
+                    special_date = str(row[11]).strip() if row[11] else ''
+                    body_status = str(row[12]).strip() if row[12] else ''
+                    psychological_test_type = str(row[13]).strip() if row[13] else ''
+                    tracking_opinion = str(row[14]).strip() if row[14] else ''
+                    implementation_status = str(row[15]).strip() if row[15] else ''
+                    
+                    if youth_id_card not in youth_directory:
+                        errors.append(f"第{row_idx}行：身份证号 {youth_id_card} 不存在于基本信息中")
+                        continue
+                    
+                    # 检查日期都相同的记录覆盖更新，由批量写入处理
+                    rows.append({
+                        'youth_id_card': youth_id_card, 'name': name, 'gender': gender,
+                        'district_exam': district_exam, 'district_positive': district_positive,
+                        'district_date': district_date,
+                        'city_exam': city_exam, 'city_positive': city_positive, 'city_date': city_date,
+                        'special_exam': special_exam, 'special_positive': special_positive,
+                        'special_date': special_date,
+                        'body_status': body_status, 'psychological_test_type': psychological_test_type,
+                        'tracking_opinion': tracking_opinion, 'implementation_status': implementation_status,
+                    })
+                    
+                except Exception as e:
+                    errors.append(f"第{row_idx}行：{str(e)}")
+        
+        result = self.db_manager.bulk_upsert('physical_examination', rows, 'overwrite')
+        return result['inserted'] + result['updated'], result['updated'], errors
+    
+    def show_physical_examination_import_result(self, result):
+        """显示体检情况导入结果并刷新列表"""
+        count, updated_count, errors = result
+        
+        new_count = count - updated_count
+        result_parts = []
+        if new_count > 0:
+            result_parts.append(f"新增 {new_count} 条记录")
+        if updated_count > 0:
+            result_parts.append(f"覆盖更新 {updated_count} 条记录（日期相同）")
+        result_msg = "、".join(result_parts) if result_parts else "未导入任何记录"
+        
+        if errors:
+            error_msg = f"成功处理 {count} 条记录（{result_msg}）\n\n以下记录导入失败：\n" + "\n".join(errors[:10])
+            if len(errors) > 10:
+                error_msg += f"\n... 还有 {len(errors) - 10} 条错误"
+            QMessageBox.warning(self, '导入完成（有错误）', error_msg)
+        else:
+            QMessageBox.information(self, '导入成功', f'成功处理 {count} 条记录\n{result_msg}')
+        
+        self.load_physical_examination_data()
     
     def export_physical_examination_data(self):
         """导出体检情况数据（合并单元格格式）"""
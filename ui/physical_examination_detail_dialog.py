@@ -231,18 +231,12 @@ class PhysicalExaminationDetailDialog(QDialog):
             return
         
         try:
-            # 查询基本信息数据库
-            conn = self.db_manager.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name, gender FROM youth WHERE id_card = ?
-            """, (id_card,))
-            result = cursor.fetchone()
-            conn.close()
+            # 按青年目录查找基本信息
+            youth = self.db_manager.youth_directory.get(id_card)
             
-            if result:
+            if youth:
                 # 找到对应的青年信息，自动填充
-                name, gender = result
+                _, name, gender, _ = youth
                 self.name_input.setText(name or '')
                 if gender in ['男', '女']:
                     self.gender_input.setCurrentText(gender)